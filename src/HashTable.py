@@ -1,61 +1,278 @@
 from __future__ import annotations
 
-from typing import Generic, TypeVar
+from typing import Callable, Generic, TextIO, TypeVar
+from functools import lru_cache
+from array import array
 import hashlib
+import io
+import zlib
 
 T = TypeVar("T")
 U = TypeVar("U")
 
+_EMPTY = object() # Marks a slot that was never used in openhashtable
+_DELETED = object() # Marks a slot whose key was removed in openhashtable
+_HASH_MASK = (1 << 64) - 1
+
+def crc32_hash(key: any) -> int:
+    """Fast non-cryptographic hash, stable between processes.
+    Args:
+        key (any): key to hash, it is converted to string first.
+    Returns:
+        int: the hash of the key.
+    """
+    return zlib.crc32(str(key).encode())
+
+def sha1_hash(key: any) -> int:
+    """Stable SHA-1 hash, the one used by the token_dict.txt files of actividad_13.
+    Args:
+        key (any): key to hash, it is converted to string first.
+    Returns:
+        int: the hash of the key.
+    """
+    return int.from_bytes(hashlib.sha1(str(key).encode()).digest(), 'big')
+
+def cached_hash(hash_function: Callable[[any], int], max_size: int = 65536) -> Callable[[any], int]:
+    """Wrap a hash function so repeated keys are only hashed once.
+    Args:
+        hash_function (Callable[[any], int]): the hash function to wrap.
+        max_size (int): max number of hashes kept in memory.
+    Returns:
+        Callable[[any], int]: the cached hash function.
+    """
+    return lru_cache(maxsize=max_size)(hash_function)
+
 class hashtable(Generic[T, U]):
     data: list[dict[T,U]]
     size: int
-    
-    def __init__(self, table_size: int) -> None:
+    hash_function: Callable[[T], int]
+    shared: bytearray # Buckets shared with a snapshot, they are copied before the first write
+
+    def __init__(self, table_size: int, hash_function: Callable[[T], int] = crc32_hash) -> None:
         super().__init__()
         self.data = [{} for _ in range(table_size)]
         self.size = table_size
-        
+        self.hash_function = hash_function
+        self.shared = bytearray(table_size)
+
+    def index(self, key: T) -> int:
+        return self.hash_function(key) % self.size
+
+    def writable_bucket(self, index: int) -> dict[T, U]:
+        bucket = self.data[index]
+        if self.shared[index]:
+            bucket = bucket.copy()
+            self.data[index] = bucket
+            self.shared[index] = 0
+        return bucket
+
     def add(self, key: T, input: U):
-        hash = hashlib.sha1(str(key).encode()).hexdigest()
-        hashKey = int(hash, 16) % self.size
-        self.data[hashKey][key] = input
-        
+        self.writable_bucket(self.index(key))[key] = input
+
     def get(self, key: T) -> U:
-        hash = hashlib.sha1(str(key).encode()).hexdigest()
-        hashKey = int(hash, 16) % self.size
-        if not key in self.data[hashKey]:
-            return None
-        return self.data[hashKey][key]
-    
+        return self.data[self.index(key)].get(key)
+
     def remove(self, key: T) -> U:
-        hash = hashlib.sha1(str(key).encode()).hexdigest()
-        hashKey = int(hash, 16) % self.size
-        if not key in self.data[hashKey]:
+        index = self.index(key)
+        if not key in self.data[index]:
             return None
-        return self.data[hashKey].pop(key)
-    
+        return self.writable_bucket(index).pop(key)
+
     def haskey(self, key: T) -> bool:
-        hash = hashlib.sha1(str(key).encode()).hexdigest()
-        hashKey = int(hash, 16) % self.size
-        return key in self.data[hashKey]
-    
+        return key in self.data[self.index(key)]
+
+    def increment(self, key: T, delta: U = 1) -> U:
+        """Add delta to the value of the key (or set it if the key is new), hashing the key only once.
+        Args:
+            key (T): key to increment.
+            delta (U): amount to add.
+        Returns:
+            U: the new value of the key.
+        """
+        bucket = self.writable_bucket(self.index(key))
+        value = bucket[key] + delta if key in bucket else delta
+        bucket[key] = value
+        return value
+
+    def upsert(self, key: T, update: Callable[[U], U], default: U) -> U:
+        """Update the value of the key with a function, or set the default if the key is new.
+        Args:
+            key (T): key to update.
+            update (Callable[[U], U]): receives the actual value and returns the new one.
+            default (U): value for new keys.
+        Returns:
+            U: the new value of the key.
+        """
+        bucket = self.writable_bucket(self.index(key))
+        value = update(bucket[key]) if key in bucket else default
+        bucket[key] = value
+        return value
+
     def clone(self) -> hashtable[T, U]:
-        newHastTable = hashtable(self.size)
+        newHastTable = hashtable(self.size, self.hash_function)
         newHastTable.data = [dict.copy() for dict in self.data]
         return newHastTable
-    
+
+    def snapshot(self) -> hashtable[T, U]:
+        """Copy the hashtable without copying the buckets, each table copies a bucket only before writing in it.
+        Returns:
+            hashtable[T, U]: the copy-on-write copy.
+        """
+        newHashTable = hashtable(self.size, self.hash_function)
+        newHashTable.data = self.data.copy()
+        newHashTable.shared = bytearray(b'\x01') * self.size
+        self.shared = bytearray(b'\x01') * self.size
+        return newHashTable
+
     def keys(self) -> list[T]:
         keys = []
         for dict in self.data:
             keys.extend(list(dict.keys()))
         return keys
-    
+
+    def dump(self, fp: TextIO):
+        """Write the table to a text file one bucket at a time, without building the whole text.
+        Args:
+            fp (TextIO): file opened for writing.
+        """
+        for index, bucket in enumerate(self.data):
+            fp.write(f"Index{index}$%i{''.join(f'{key}$%g{value}$%c' for key, value in bucket.items())}\n")
+
     def tostring(self) -> str:
-        text = ""
-        for index, dict in enumerate(self.data):
-            text += f"Index{index}$%i"
-            for key in list(dict.keys()):
-                text += f"{key}$%g{dict[key]}$%c"
-            text += "\n"
-        return text
-        
+        text = io.StringIO()
+        self.dump(text)
+        return text.getvalue()
+
+
+class openhashtable(Generic[T, U]):
+    """Open addressing hash table over parallel flat arrays (keys, values and cached hashes).
+    It has the same surface as hashtable, but grows by load factor instead of using a fixed number of buckets.
+    """
+    __slots__ = ('key_slots', 'value_slots', 'hash_slots', 'capacity', 'count', 'used', 'hash_function')
+    key_slots: list[T]
+    value_slots: list[U]
+    hash_slots: array
+    capacity: int # Always a power of 2
+    count: int # Number of keys
+    used: int # Number of keys plus deleted slots
+    hash_function: Callable[[T], int]
+
+    def __init__(self, initial_capacity: int = 8, hash_function: Callable[[T], int] = crc32_hash) -> None:
+        self.hash_function = hash_function
+        self.clear(initial_capacity)
+
+    def clear(self, min_capacity: int = 8):
+        capacity = 8
+        while capacity < min_capacity:
+            capacity *= 2
+        self.key_slots = [_EMPTY] * capacity
+        self.value_slots = [None] * capacity
+        self.hash_slots = array('Q', bytes(8 * capacity))
+        self.capacity = capacity
+        self.count = 0
+        self.used = 0
+
+    def find(self, key: T, key_hash: int) -> int:
+        """Find the slot of a key, or the slot where it should be inserted.
+        Args:
+            key (T): key to find.
+            key_hash (int): hash of the key (already masked to 64 bits).
+        Returns:
+            int: the slot of the key, or the first free slot of its probe sequence.
+        """
+        mask = self.capacity - 1
+        index = key_hash & mask
+        perturb = key_hash
+        free_slot = -1
+        key_slots = self.key_slots
+        while True:
+            slot_key = key_slots[index]
+            if slot_key is _EMPTY:
+                return index if free_slot < 0 else free_slot
+            if slot_key is _DELETED:
+                if free_slot < 0: free_slot = index
+            elif self.hash_slots[index] == key_hash and slot_key == key:
+                return index
+            perturb >>= 5
+            index = (5 * index + 1 + perturb) & mask
+
+    def resize(self, min_capacity: int):
+        old_keys, old_values, old_hashes = self.key_slots, self.value_slots, self.hash_slots
+        self.clear(min_capacity)
+        for index, key in enumerate(old_keys):
+            if key is _EMPTY or key is _DELETED:
+                continue
+            slot = self.find(key, old_hashes[index])
+            self.key_slots[slot] = key
+            self.value_slots[slot] = old_values[index]
+            self.hash_slots[slot] = old_hashes[index]
+            self.count += 1
+        self.used = self.count
+
+    def store(self, slot: int, key: T, key_hash: int, input: U):
+        slot_key = self.key_slots[slot]
+        if slot_key is _EMPTY or slot_key is _DELETED:
+            self.key_slots[slot] = key
+            self.hash_slots[slot] = key_hash
+            self.count += 1
+            if slot_key is _EMPTY:
+                self.used += 1
+        self.value_slots[slot] = input
+        # Keep the load factor under 2/3, deleted slots are dropped when resizing
+        if self.used * 3 >= self.capacity * 2:
+            self.resize(self.count * (4 if self.count < 50000 else 2))
+
+    def add(self, key: T, input: U):
+        key_hash = self.hash_function(key) & _HASH_MASK
+        self.store(self.find(key, key_hash), key, key_hash, input)
+
+    def get(self, key: T) -> U:
+        slot = self.find(key, self.hash_function(key) & _HASH_MASK)
+        return self.value_slots[slot]
+
+    def remove(self, key: T) -> U:
+        slot = self.find(key, self.hash_function(key) & _HASH_MASK)
+        slot_key = self.key_slots[slot]
+        if slot_key is _EMPTY or slot_key is _DELETED:
+            return None
+        value = self.value_slots[slot]
+        self.key_slots[slot] = _DELETED
+        self.value_slots[slot] = None
+        self.count -= 1
+        return value
+
+    def haskey(self, key: T) -> bool:
+        slot_key = self.key_slots[self.find(key, self.hash_function(key) & _HASH_MASK)]
+        return not (slot_key is _EMPTY or slot_key is _DELETED)
+
+    def increment(self, key: T, delta: U = 1) -> U:
+        key_hash = self.hash_function(key) & _HASH_MASK
+        slot = self.find(key, key_hash)
+        slot_key = self.key_slots[slot]
+        value = delta if slot_key is _EMPTY or slot_key is _DELETED else self.value_slots[slot] + delta
+        self.store(slot, key, key_hash, value)
+        return value
+
+    def upsert(self, key: T, update: Callable[[U], U], default: U) -> U:
+        key_hash = self.hash_function(key) & _HASH_MASK
+        slot = self.find(key, key_hash)
+        slot_key = self.key_slots[slot]
+        value = default if slot_key is _EMPTY or slot_key is _DELETED else update(self.value_slots[slot])
+        self.store(slot, key, key_hash, value)
+        return value
+
+    def clone(self) -> openhashtable[T, U]:
+        newHashTable = openhashtable(hash_function=self.hash_function)
+        newHashTable.key_slots = self.key_slots.copy()
+        newHashTable.value_slots = self.value_slots.copy()
+        newHashTable.hash_slots = array('Q', self.hash_slots)
+        newHashTable.capacity = self.capacity
+        newHashTable.count = self.count
+        newHashTable.used = self.used
+        return newHashTable
+
+    def keys(self) -> list[T]:
+        return [key for key in self.key_slots if not (key is _EMPTY or key is _DELETED)]
+
+    def __len__(self) -> int:
+        return self.count
@@ -1,5 +1,9 @@
 import os
+import sys
 import time
+from corpus_reader import CorpusReader
+from pipeline import strip_tags
+from tokenizer import tokenize_text
 
 """Funcion para abrir un archivo html y leerlo"""
 def open_file(file_path):
@@ -32,5 +36,34 @@ def loop_through_html_files():
         process_end_time = time.time()
         f.write(f"\n\nTiempo total de ejecución: {(process_end_time - process_start_time):.20f} segundos")
 
+"""Funcion que mide cuantos archivos por segundo se leen y procesan con distintas profundidades de prefetch"""
+def prefetch_benchmark(depths=(0, 1, 2, 4, 8, 16), mode='bytes'):
+    main_path = os.getcwd()
+    full_path = os.path.join(main_path, 'src/html')
+    result_path = os.path.join(main_path, 'src/results/times', 'a1_prefetch_al02883272.txt')
+    file_paths = [os.path.join(full_path, file) for file in sorted(os.listdir(full_path))]
+    with open(result_path, 'w', encoding='utf-8') as f:
+        for depth in depths:
+            start_time = time.time()
+            total_bytes = 0
+            corrupt_files = 0
+            with CorpusReader(file_paths, prefetch=depth, mode=mode) as reader:
+                for file_path, content in reader:
+                    total_bytes += len(content)
+                    # El trabajo de cada archivo: decodificar, quitar las etiquetas y tokenizar
+                    try:
+                        text = bytes(content).decode('utf-8')
+                    except UnicodeDecodeError:
+                        corrupt_files += 1
+                        continue
+                    sum(1 for _ in tokenize_text(strip_tags(text), 'word_chars'))
+            execution_time = time.time() - start_time
+            f.write(f"Prefetch: {depth}\t\tArchivos por segundo: {len(file_paths) / execution_time:.1f}\t\tMB por segundo: {total_bytes / execution_time / 1e6:.2f}\t\tArchivos corruptos: {corrupt_files}\n")
+    with open(result_path, 'r', encoding='utf-8') as f:
+        print(f.read())
+
 if __name__ == "__main__":
-    loop_through_html_files()
\ No newline at end of file
+    if '--prefetch' in sys.argv:
+        prefetch_benchmark(mode='mmap' if '--mmap' in sys.argv else 'bytes')
+    else:
+        loop_through_html_files()
\ No newline at end of file
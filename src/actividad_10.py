@@ -1,6 +1,7 @@
 import time
 import os
-import re
+from tokenizer import tokenize_file
+from document_stats import update_document_stats
 
 def get_total_token_count(file_path: str) -> float:
     """Get the total token count of a file.
@@ -9,12 +10,8 @@ def get_total_token_count(file_path: str) -> float:
     Returns:
         number: the total number of tokens in the file.
     """
-    # Read file content
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
-    separated_words = re.split('[\n|,| |.|:|;|(|)]', content) # Separate the words of the files
-    filtered_words = [word for word in separated_words if word.isalnum()] # Remove any word with special symbols
-    return float(len(filtered_words)) # return token count
+    token_count = sum(1 for _ in tokenize_file(file_path, 'separators')) # Words without special symbols
+    return float(token_count) # return token count
 
 def get_loading_bar(actual_number: int, total_number: int, bar_size: int) -> str:
     """Generate a loading bar.
@@ -41,31 +38,25 @@ def main():
     posting_file = os.path.join(main_path, 'src/results/token_posting.txt')
     output_posting_file = os.path.join(main_path, 'src/results/token_posting_weights.txt')
     output_file_times = os.path.join(main_path, 'src/results/times/a10_al02883272.txt')
+    stats_file = os.path.join(main_path, 'src/results/document_stats.txt')
     
-    # Get posting contents
+    # Token count of each file, only new or modified files are read
+    files_token_count = { file_name: float(stats.token_count) for file_name, stats in update_document_stats(files_path, stats_file).items() }
     with open(posting_file, 'r', encoding='utf-8', errors='replace') as file:
-        posting_content = file.read()
-    posting_rows = posting_content.split('\n')
-    posting_data = []
-    for row in posting_rows:
-        row_data = row.split(';')
-        if len(row_data) < 2: continue
-        posting_data.append({
-            'file': row_data[0],
-            'token_count': float(row_data[1])
-        })
+        row_quantity = sum(1 for _ in file)
     
-    # Get the posting weights
-    files_token_count: dict[str, float] = {}
-    with open(output_posting_file, 'w', encoding='utf-8', errors='replace') as file:
-        for index, posting in enumerate(posting_data):
-            print(f'Processing row {index + 1} of {len(posting_data)} {get_loading_bar(index + 1, len(posting_data), 20)}', end='\r', flush=True)
-            if posting['file'] in list(files_token_count.keys()):
-                token_count = files_token_count[posting['file']]
-            else:
-                token_count = get_total_token_count(os.path.join(files_path, posting['file']))
-                files_token_count[posting['file']] = token_count
-            file.write(f"{posting['file']};{round((posting['token_count'] * 100.) / token_count, 2)}\n")
+    # Get the posting weights, one row at a time
+    with open(posting_file, 'r', encoding='utf-8', errors='replace') as input_file, open(output_posting_file, 'w', encoding='utf-8', errors='replace') as file:
+        for index, row in enumerate(input_file):
+            if index % 1000 == 0 or index + 1 == row_quantity:
+                print(f'Processing row {index + 1} of {row_quantity} {get_loading_bar(index + 1, row_quantity, 20)}', end='\r', flush=True)
+            row_data = row.rstrip('\n').split(';')
+            if len(row_data) < 2: continue
+            token_count = files_token_count.get(row_data[0])
+            if token_count == None:
+                token_count = get_total_token_count(os.path.join(files_path, row_data[0]))
+                files_token_count[row_data[0]] = token_count
+            file.write(f"{row_data[0]};{round((float(row_data[1]) * 100.) / token_count, 2)}\n")
     
     process_end_time = time.time()
     print('Finished process.')
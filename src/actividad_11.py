@@ -1,6 +1,7 @@
 import os
-import re
 import time
+from tokenizer import tokenize_file
+from word_count import count_words
 
 def get_total_token_count(file_path: str) -> float:
     """Get the total token count of a file.
@@ -9,12 +10,8 @@ def get_total_token_count(file_path: str) -> float:
     Returns:
         number: the total number of tokens in the file.
     """
-    # Read file content
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
-    separated_words = re.split('[\n|,| |.|:|;|(|)]', content) # Separate the words of the files
-    filtered_words = [word for word in separated_words if word.isalnum()] # Remove any word with special symbols
-    return float(len(filtered_words)) # return token count
+    token_count = sum(1 for _ in tokenize_file(file_path, 'separators')) # Words without special symbols
+    return float(token_count) # return token count
 
 def create_posting_file(files_path: str, output_file: str, document_ids: dict):
     """Create a posting file for all HTML files in the given directory.
@@ -27,25 +24,16 @@ def create_posting_file(files_path: str, output_file: str, document_ids: dict):
     html_files = [file for file in os.listdir(files_path) if file.endswith('.html')]
     for file_name in html_files:
         file_path = os.path.join(files_path, file_name)
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-            content = file.read()
-            words = re.findall(r'\w+', content.lower())  # Extract words
-            total_tokens = len(words)
-            token_count = {}
-            for word in words:
-                if word in token_count:
-                    token_count[word] += 1
+        token_count = count_words(tokenize_file(file_path, 'word_chars'))  # Extract and count words
+        total_tokens = sum(token_count.values())
+        for word, count in token_count.items():
+            if word in posting:
+                if document_ids[file_name] in posting[word]:
+                    posting[word][document_ids[file_name]] += count / total_tokens
                 else:
-                    token_count[word] = 1
-            
-            for word, count in token_count.items():
-                if word in posting:
-                    if document_ids[file_name] in posting[word]:
-                        posting[word][document_ids[file_name]] += count / total_tokens
-                    else:
-                        posting[word][document_ids[file_name]] = count / total_tokens
-                else:
-                    posting[word] = {document_ids[file_name]: count / total_tokens}
+                    posting[word][document_ids[file_name]] = count / total_tokens
+            else:
+                posting[word] = {document_ids[file_name]: count / total_tokens}
     
     with open(output_file, 'w') as file:
         for word, doc_weights in posting.items():
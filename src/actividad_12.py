@@ -1,7 +1,10 @@
 import os
-import re
 import sys
 import time
+from tokenizer import tokenize_file, tokenize_text
+from word_count import count_words
+from binary_index import write_binary_index
+from query_engine import QueryEngine
 
 def get_total_token_count(file_path: str) -> float:
     """Get the total token count of a file.
@@ -10,12 +13,8 @@ def get_total_token_count(file_path: str) -> float:
     Returns:
         number: the total number of tokens in the file.
     """
-    # Read file content
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
-    separated_words = re.split('[\n|,| |.|:|;|(|)]', content) # Separate the words of the files
-    filtered_words = [word for word in separated_words if word.isalnum()] # Remove any word with special symbols
-    return float(len(filtered_words)) # return token count
+    token_count = sum(1 for _ in tokenize_file(file_path, 'separators')) # Words without special symbols
+    return float(token_count) # return token count
 
 def create_posting_file(files_path: str, output_file: str, document_ids: dict):
     """Create a posting file for all HTML files in the given directory.
@@ -28,25 +27,16 @@ def create_posting_file(files_path: str, output_file: str, document_ids: dict):
     html_files = [file for file in os.listdir(files_path) if file.endswith('.html')]
     for file_name in html_files:
         file_path = os.path.join(files_path, file_name)
-        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-            content = file.read()
-            words = re.findall(r'\w+', content.lower())  # Extract words
-            total_tokens = len(words)
-            token_count = {}
-            for word in words:
-                if word in token_count:
-                    token_count[word] += 1
+        token_count = count_words(tokenize_file(file_path, 'word_chars'))  # Extract and count words
+        total_tokens = sum(token_count.values())
+        for word, count in token_count.items():
+            if word in posting:
+                if document_ids[file_name] in posting[word]:
+                    posting[word][document_ids[file_name]] += count / total_tokens
                 else:
-                    token_count[word] = 1
-            
-            for word, count in token_count.items():
-                if word in posting:
-                    if document_ids[file_name] in posting[word]:
-                        posting[word][document_ids[file_name]] += count / total_tokens
-                    else:
-                        posting[word][document_ids[file_name]] = count / total_tokens
-                else:
-                    posting[word] = {document_ids[file_name]: count / total_tokens}
+                    posting[word][document_ids[file_name]] = count / total_tokens
+            else:
+                posting[word] = {document_ids[file_name]: count / total_tokens}
     
     with open(output_file, 'w') as file:
         for word, doc_weights in posting.items():
@@ -54,8 +44,64 @@ def create_posting_file(files_path: str, output_file: str, document_ids: dict):
             for doc_id, weight in doc_weights.items():
                 file.write(f"    Document ID: {doc_id}, Weight: {weight}\n")
 
-def search_word(word: str, dictionary_file: str, posting_file: str, documents_file: str):
+def read_document_ids(documents_file: str) -> dict[str, str]:
+    """Read the ID of each HTML document of Documents.txt.
+    Args:
+        documents_file (str): Path to the documents file (ID and file name separated by a tab).
+    Returns:
+        dict: The ID of each file name, in the order of the file.
+    """
+    document_ids = {}
+    with open(documents_file, 'r') as file:
+        for line in file:
+            parts = line.strip().split('\t')
+            if len(parts) == 2:
+                document_ids[parts[1]] = parts[0]
+    return document_ids
+
+def create_document_index(files_path: str, documents_file: str, dict_path: str, post_path: str):
+    """Create the binary index of the HTML documents of Documents.txt, the doc ids follow the order of the file.
+    Args:
+        files_path (str): Path to the directory containing HTML files.
+        documents_file (str): Path to the documents file.
+        dict_path (str): Path to the binary dictionary.
+        post_path (str): Path to the binary postings.
+    """
+    document_names = [file_name for file_name in read_document_ids(documents_file).keys() if file_name.lower().endswith('.html')]
+    terms = {}
+    for doc_id, file_name in enumerate(document_names):
+        for word, count in count_words(tokenize_file(os.path.join(files_path, file_name), 'word_chars')).items():
+            terms.setdefault(word, []).append((doc_id, count))
+    write_binary_index(terms.items(), document_names, dict_path, post_path)
+
+def search_word(word: str, engine: QueryEngine, document_ids: dict[str, str], files_path: str) -> list[tuple[str, str]]:
+    """Search for a word in the binary index of the HTML documents, without reading the documents.
+    The word is tokenized like the documents, if it has more than one token the documents need all of them.
+    Args:
+        word (str): The word to search for.
+        engine (QueryEngine): Engine of the index created by create_document_index.
+        document_ids (dict): ID of each file name.
+        files_path (str): Path to the directory containing HTML files.
+    Returns:
+        list: ID and path of the documents containing the word, in the order of Documents.txt.
+    """
+    token_counts: list[tuple[str, int]] = [] # Posting count of each token, each term is looked up once
+    for token in dict.fromkeys(tokenize_text(word, 'word_chars')):
+        term_data = engine.find_term(token)
+        if term_data == None:
+            return []
+        token_counts.append((token, term_data[1]))
+    if not token_counts:
+        return []
+    token_counts.sort(key=lambda token_count: token_count[1]) # Rarest first
+    doc_ids = list(engine.postings(token_counts[0][0])[0])
+    for token, _ in token_counts[1:]:
+        doc_ids = engine.filter_documents(token, doc_ids)
+    return [(document_ids[engine.document_names[doc_id]], os.path.join(files_path, engine.document_names[doc_id])) for doc_id in doc_ids]
+
+def legacy_search_word(word: str, dictionary_file: str, posting_file: str, documents_file: str):
     """Search for a word in the dictionary, posting, and documents files, then print documents containing the word.
+    Reads every HTML document of Documents.txt, it is kept to compare it with search_word.
     Args:
         word (str): The word to search for.
         dictionary_file (str): Path to the dictionary file.
@@ -132,13 +178,11 @@ def main():
     posting_txt_file = os.path.join(main_path, 'results/posting.txt')  # Posting file for all HTML documents
     dictionary_file = os.path.join(main_path, 'results/token_dictionary.txt')  # Dictionary file
     
+    index_dict_file = os.path.join(main_path, 'results/data/html_dict.bin')  # Binary index of the HTML documents
+    index_post_file = os.path.join(main_path, 'results/data/html_post.bin')
+    
     # Generate document IDs for all HTML files in the directory
-    document_ids = {}
-    with open(document_index_file, 'r') as index_file:
-        for line in index_file:
-            parts = line.strip().split('\t')
-            if len(parts) == 2:
-                document_ids[parts[1]] = parts[0]
+    document_ids = read_document_ids(document_index_file)
     
     # # Create posting file
     # create_posting_file(files_path, posting_txt_file, document_ids)
@@ -171,7 +215,17 @@ def main():
     
     # Check if a word is provided as a command-line argument
     if len(sys.argv) > 1:
-        search_word(sys.argv[1], dictionary_file, posting_txt_file, document_index_file)
+        # Create the index if it doesn't exist or the documents changed
+        if any(not os.path.exists(path) or os.path.getmtime(path) < max(os.path.getmtime(files_path), os.path.getmtime(document_index_file)) for path in (index_dict_file, index_post_file)):
+            create_document_index(files_path, document_index_file, index_dict_file, index_post_file)
+        with QueryEngine(index_dict_file, index_post_file) as engine:
+            found_in_documents = search_word(sys.argv[1], engine, document_ids, files_path)
+        if found_in_documents:
+            print("Word found in the following documents:")
+            for document_id, document in found_in_documents:
+                print(f"{document_id}\t{document}")
+        else:
+            print("Word not found in any documents.")
 
 if __name__ == '__main__':
     main()
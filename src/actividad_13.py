@@ -1,51 +1,61 @@
 import os
 import time
+import heapq
 import argparse
-import hashlib
 import linecache
-from HashTable import hashtable
+from HashTable import hashtable, sha1_hash
+from binary_index import convert_index_file, convert_text_files, write_weights_file
+from query_engine import QueryEngine
+from document_stats import read_document_stats, read_stats_profile
+from evidencia_1_times import INDEX_PROFILE
+from incremental_index import update_index, update_segments
+from segmented_index import SegmentedIndex
+from boolean_query import QUERY_TOKEN_PATTERN, search_boolean
+from positional_index import PositionalIndex, build_positional_index
+from term_dictionary import TermDictionary, write_term_dictionary
+from query_cache import get_generation_path, write_generation
 
 def generate_main_files(input_index_path: str, output_dict_path: str, output_post_path: str):
-    with open(input_index_path, 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
-        
-    content_rows = content.split("\n")
+    """Create token_dict.txt and token_post.txt from indexed_tokens.txt. The index is read one row at a time and
+    the posting rows are written as they are read, only the dictionary of terms is kept in memory.
+    Args:
+        input_index_path (str): path of indexed_tokens.txt (word;file;frec sorted by word).
+        output_dict_path (str): path of token_dict.txt.
+        output_post_path (str): path of token_post.txt.
+    """
     actual_word = None
     file_quantity = 0
     posting_id = 0
-    dict_hashtable = hashtable[str, dict[str, int]](73369)
-    post_content = ""
-    for index, row in enumerate(content_rows):
-        row_data = row.split(";")
-        if (len(row_data) < 3): 
-            continue
-        if row_data[0] != actual_word and actual_word != None:
-            dict_hashtable.add(actual_word, {
-                'file_quantity': file_quantity,
-                'posting_id': posting_id
-            })
-            posting_id += file_quantity
-            file_quantity = 0
-        actual_word = row_data[0]
-        file_quantity += 1
-        
-        post_content += f"{row_data[1]};{row_data[2]}\n"
+    dict_hashtable = hashtable[str, dict[str, int]](73369, sha1_hash) # SHA-1 keeps the layout that get_dict_data expects
+    with open(input_index_path, 'r', encoding='utf-8', errors='replace') as input_file, open(output_post_path, 'w', encoding='utf-8', errors='replace') as post_file:
+        for row in input_file:
+            row_data = row.rstrip('\n').split(";")
+            if (len(row_data) < 3): 
+                continue
+            if row_data[0] != actual_word and actual_word != None:
+                dict_hashtable.add(actual_word, {
+                    'file_quantity': file_quantity,
+                    'posting_id': posting_id
+                })
+                posting_id += file_quantity
+                file_quantity = 0
+            actual_word = row_data[0]
+            file_quantity += 1
+            
+            post_file.write(f"{row_data[1]};{row_data[2]}\n")
     dict_hashtable.add(actual_word, {
         'file_quantity': file_quantity,
         'posting_id': posting_id
     })
     
     with open(output_dict_path, 'w', encoding='utf-8', errors='replace') as file:
-        file.write(dict_hashtable.tostring())
-    with open(output_post_path, 'w', encoding='utf-8', errors='replace') as file:
-        file.write(post_content)
+        dict_hashtable.dump(file)
 
 
 def get_dict_data(dict_path: str, post_path: str, token: str) -> list[dict[str, any]]:
     with open(dict_path, 'r', encoding='utf-8', errors='replase') as file:
         line_count = sum(1 for _ in file)
-    tokenHash = hashlib.sha1(token.lower().encode()).hexdigest()
-    hashKey = int(tokenHash, 16) % (line_count)
+    hashKey = sha1_hash(token.lower()) % (line_count)
     
     token_data: list[dict[str, any]] = []
     
@@ -67,49 +77,193 @@ def get_dict_data(dict_path: str, post_path: str, token: str) -> list[dict[str,
     return token_data
 
 
+def is_stale(path: str, source_path: str) -> bool:
+    """Check if a generated file is missing or older than the file it was generated from."""
+    if not os.path.exists(path):
+        return True
+    return os.path.exists(source_path) and os.path.getmtime(path) < os.path.getmtime(source_path)
+
+def prepare_index_files(main_path: str) -> tuple[str, str, str]:
+    """Create the text and binary index files that don't exist or are older than indexed_tokens.txt.
+    Args:
+        main_path (str): repository folder.
+    Returns:
+        tuple[str, str, str]: paths of the binary dictionary, postings and weights.
+    """
+    index_tokens_path = os.path.join(main_path, 'src/results/data/indexed_tokens.txt')
+    token_dict_path = os.path.join(main_path, 'src/results/data/token_dict.txt')
+    token_post_path = os.path.join(main_path, 'src/results/data/token_post.txt')
+    binary_dict_path = os.path.join(main_path, 'src/results/data/token_dict.bin')
+    binary_post_path = os.path.join(main_path, 'src/results/data/token_post.bin')
+    binary_weights_path = os.path.join(main_path, 'src/results/data/token_weights.bin')
+    stats_path = os.path.join(main_path, 'src/results/document_stats.txt')
+    index_changed = False
+    # If main files don't exists or the index changed, create them
+    if is_stale(token_dict_path, index_tokens_path) or is_stale(token_post_path, index_tokens_path):
+        generate_main_files(index_tokens_path, token_dict_path, token_post_path)
+    if is_stale(binary_dict_path, token_dict_path) or is_stale(binary_post_path, token_post_path):
+        if os.path.exists(index_tokens_path):
+            convert_index_file(index_tokens_path, binary_dict_path, binary_post_path)
+        else:
+            convert_text_files(token_dict_path, token_post_path, binary_dict_path, binary_post_path)
+        index_changed = True
+        if os.path.exists(binary_weights_path):
+            os.remove(binary_weights_path) # The weights belong to the old index
+    if is_stale(binary_weights_path, stats_path):
+        # Document lengths of the statistics table if it was counted like the postings (evidencia_1_commands index
+        # --stats), or the sum of the frecs if some document is missing
+        doc_lengths = None
+        if os.path.exists(stats_path) and read_stats_profile(stats_path) == INDEX_PROFILE:
+            document_stats = read_document_stats(stats_path)
+            with QueryEngine(binary_dict_path, binary_post_path) as engine:
+                if all(name in document_stats for name in engine.document_names):
+                    doc_lengths = [document_stats[name].token_count for name in engine.document_names]
+        write_weights_file(binary_dict_path, binary_post_path, binary_weights_path, doc_lengths)
+        index_changed = True # The scores change with the document lengths
+    if index_changed:
+        # The binary files of the new generation are ready, the cached engines open them again
+        write_generation(get_generation_path(token_dict_path))
+    return binary_dict_path, binary_post_path, binary_weights_path
+
+def prepare_term_dictionary(main_path: str, binary_dict_path: str, binary_post_path: str) -> str:
+    """Create the sorted term dictionary of the binary index if it doesn't exist or the index changed.
+    Args:
+        main_path (str): repository folder.
+        binary_dict_path (str): path of the binary dictionary.
+        binary_post_path (str): path of the binary postings.
+    Returns:
+        str: path of the sorted term dictionary.
+    """
+    terms_path = os.path.join(main_path, 'src/results/data/token_terms.bin')
+    if is_stale(terms_path, binary_dict_path):
+        with QueryEngine(binary_dict_path, binary_post_path) as engine:
+            write_term_dictionary(engine.terms(), terms_path)
+    return terms_path
+
+def expand_wildcards(term_dictionary: TermDictionary, tokens: list[str], boolean: bool = False) -> tuple[list[str], list[str]]:
+    """Replace the tokens with * (prefix*, *infix*, *suffix) by the terms of the index that match them.
+    Outside of a boolean query the patterns without any term are left out of the search.
+    Args:
+        term_dictionary (TermDictionary): sorted term dictionary of the index.
+        tokens (list[str]): input tokens.
+        boolean (bool): the tokens are a boolean query, the terms of a pattern are joined with OR.
+    Returns:
+        tuple[list[str], list[str]]: the tokens with the patterns expanded and the patterns without any term.
+    """
+    if boolean:
+        tokens = QUERY_TOKEN_PATTERN.findall(' '.join(tokens)) # "(priv*" is "(" and "priv*"
+    expanded_tokens: list[str] = []
+    empty_patterns: list[str] = []
+    for token in tokens:
+        if not '*' in token:
+            expanded_tokens.append(token)
+            continue
+        terms = term_dictionary.expand(token)
+        if not terms:
+            empty_patterns.append(token)
+        if boolean and terms:
+            expanded_tokens.append(f"( {' OR '.join(terms)} )")
+        elif boolean:
+            expanded_tokens.append(token) # Not in the index, it matches no document
+        else:
+            expanded_tokens.extend(terms)
+    return expanded_tokens, empty_patterns
+
+def prepare_positional_files(main_path: str) -> tuple[str, str, str]:
+    """Create the positional index of src/results/texts if it doesn't exist or a document was added or removed.
+    Args:
+        main_path (str): repository folder.
+    Returns:
+        tuple[str, str, str]: paths of the binary dictionary, postings and positions.
+    """
+    texts_path = os.path.join(main_path, 'src/results/texts')
+    positional_dict_path = os.path.join(main_path, 'src/results/data/positional_dict.bin')
+    positional_post_path = os.path.join(main_path, 'src/results/data/positional_post.bin')
+    positions_path = os.path.join(main_path, 'src/results/data/positional_pos.bin')
+    if any(is_stale(path, texts_path) for path in (positional_dict_path, positional_post_path, positions_path)):
+        build_positional_index(texts_path, positional_dict_path, positional_post_path, positions_path)
+    return positional_dict_path, positional_post_path, positions_path
+
 def main():
     # Declare input parser
     parser = argparse.ArgumentParser(description='Search for files with the tokens of the input')
-    parser.add_argument('inputs', nargs='+', type=str, help='Input tokens separated by spaces')
+    parser.add_argument('inputs', nargs='+', type=str, help='Input tokens separated by spaces, * matches any characters (prefix*, *infix*, *suffix)')
+    parser.add_argument('--top-k', type=int, default=10, help='Number of files shown')
+    parser.add_argument('--daat', action='store_true', help='Merge the postings document at a time with early termination (ties by doc id)')
+    parser.add_argument('--update', action='store_true', help='Update the index with the added, changed and deleted files of src/results/alphabetically first, with --segments only the changed files are written')
+    parser.add_argument('--segments', type=str, default=None, help='Search in the live segments of this folder (segmented_index.py), only with the default ranking')
+    parser.add_argument('--boolean', action='store_true', help='Read the inputs as a boolean query with AND, OR, NOT and parentheses')
+    parser.add_argument('--phrase', action='store_true', help='Search the inputs as an exact phrase, or two phrases joined by NEAR/k, in the positional index of src/results/texts')
+    parser.add_argument('--score', type=str, choices=['bm25', 'tfidf'], default=None, help='Rank by BM25 or TF-IDF instead of diversity and quantity')
     args = parser.parse_args()
     input_tokens: list[str] = args.inputs
+    if args.segments != None:
+        # The segments only have the lookup of get_dict_data, the other modes need the files of one index
+        unsupported = [option for option, used in (('--boolean', args.boolean), ('--score', args.score != None), ('--daat', args.daat), ('--phrase', args.phrase)) if used]
+        if any('*' in token for token in input_tokens):
+            unsupported.append('*')
+        if unsupported:
+            parser.error(f"--segments can not be used with {', '.join(unsupported)}")
     
     # Get paths
     main_path = os.getcwd()
-    index_tokens_path = os.path.join(main_path, 'src/results/data/indexed_tokens.txt')
-    token_dict_path = os.path.join(main_path, 'src/results/data/token_dict.txt')
-    token_post_path = os.path.join(main_path, 'src/results/data/token_post.txt')
     output_search_log_path = os.path.join(main_path, 'src/results/times/a13_al02883272.txt')
-    # If main files don't exists, create them
-    if (not os.path.exists(token_dict_path)) or (not os.path.exists(token_post_path)):
-        generate_main_files(index_tokens_path, token_dict_path, token_post_path)
-    
-    # Take time of the process
-    process_start_time = time.time()
-    
-    # Get the files data for each word
-    token_data: dict[list[dict[str, any]]] = {}
-    for token in input_tokens:
-        token_data[token] = get_dict_data(token_dict_path, token_post_path, token)
+    if args.segments != None:
+        if args.update:
+            update_segments(os.path.join(main_path, 'src/results/alphabetically'), args.segments)
+        with SegmentedIndex(args.segments) as segmented_index:
+            process_start_time = time.time()
+            for index, (file_name, word_diversity, word_quantity) in enumerate(segmented_index.search(input_tokens, limit=args.top_k)):
+                print(f"{index + 1}. {file_name} - diversity: {word_diversity}  quantity: {word_quantity}")
+            process_end_time = time.time()
+        with open(output_search_log_path, 'a', encoding='utf-8', errors='replace') as file:
+            file.write(f"Búsqueda: \"{' '.join(input_tokens)}\"\t-\tTiempo: {process_end_time - process_start_time} segundos\n")
+        return
+    if args.phrase:
+        with PositionalIndex(*prepare_positional_files(main_path)) as positional_index:
+            process_start_time = time.time()
+            # Most matches first, nlargest keeps the name order of the results for the ties
+            files_top = heapq.nlargest(args.top_k, positional_index.search(' '.join(input_tokens)), key=lambda x: x[1])
+            for index, (file_name, matches) in enumerate(files_top):
+                print(f"{index + 1}. {file_name} - matches: {matches}")
+            process_end_time = time.time()
+        with open(output_search_log_path, 'a', encoding='utf-8', errors='replace') as file:
+            file.write(f"Búsqueda: \"{' '.join(input_tokens)}\"\t-\tTiempo: {process_end_time - process_start_time} segundos\n")
+        return
+    if args.update:
+        update_index(os.path.join(main_path, 'src/results/alphabetically'), os.path.join(main_path, 'src/results/data/indexed_tokens.txt'))
+    binary_dict_path, binary_post_path, binary_weights_path = prepare_index_files(main_path)
+    query_text = ' '.join(input_tokens)
+    if any('*' in token for token in input_tokens):
+        term_dictionary = TermDictionary(prepare_term_dictionary(main_path, binary_dict_path, binary_post_path))
+        input_tokens, empty_patterns = expand_wildcards(term_dictionary, input_tokens, args.boolean)
+        for pattern in empty_patterns:
+            print(f"{pattern}: 0 terminos")
+        if not input_tokens:
+            return # Every pattern was reported without terms, there is nothing to search
     
-    file_data: dict[str, dict[str, any]] = {}
-    for token in list(token_data.keys()):
-        for file in token_data[token]:
-            if not file["name"] in file_data:
-                file_data[file["name"]] = { "word_diversity": 0, "word_quantity": 0 }
-            file_data[file["name"]]["word_diversity"] += 1
-            file_data[file["name"]]["word_quantity"] += file["quant"]
-    file_names = list(file_data.keys())
-    files_sorted = sorted(file_names, key=lambda x: (file_data[x]["word_diversity"], file_data[x]["word_quantity"]), reverse=True)
-    
-    for index in range(0, min(len(files_sorted), 10)):
-        print(f"{index + 1}. {files_sorted[index]} - diversity: {file_data[files_sorted[index]]['word_diversity']}  quantity: {file_data[files_sorted[index]]['word_quantity']}")
+    with QueryEngine(binary_dict_path, binary_post_path, weights_path=binary_weights_path) as engine:
+        # Take time of the process
+        process_start_time = time.time()
         
-    # End time of the process
-    process_end_time = time.time()
+        # Get the best files for the tokens
+        if args.boolean:
+            for index, file_name in enumerate(search_boolean(engine, ' '.join(input_tokens))[:args.top_k]):
+                print(f"{index + 1}. {file_name}")
+        elif args.score != None:
+            for index, (file_name, score) in enumerate(engine.search_scored(input_tokens, limit=args.top_k, scheme=args.score)):
+                print(f"{index + 1}. {file_name} - {args.score}: {score:.4f}")
+        else:
+            search = engine.search_daat if args.daat else engine.search
+            files_sorted = search(input_tokens, limit=args.top_k)
+            for index, (file_name, word_diversity, word_quantity) in enumerate(files_sorted):
+                print(f"{index + 1}. {file_name} - diversity: {word_diversity}  quantity: {word_quantity}")
+            
+        # End time of the process
+        process_end_time = time.time()
     
     with open(output_search_log_path, 'a', encoding='utf-8', errors='replace') as file:
-        file.write(f"Búsqueda: \"{' '.join(input_tokens)}\"\t-\tTiempo: {process_end_time - process_start_time} segundos\n")
+        file.write(f"Búsqueda: \"{query_text}\"\t-\tTiempo: {process_end_time - process_start_time} segundos\n")
     
         
             
@@ -1,12 +1,15 @@
+import argparse
 import os
 import re
 import time
+from corpus_reader import CorpusReader
 
 
-def get_html_file_text(file_path: str) -> str:
+def get_html_file_text(file_path: str, content: str = None) -> str:
     """Gets the content of an html file without the tags
     Args:
         file_path (str): Path to the html file.
+        content (str): Content of the file if it was already read, the file is read if it is None.
     Raises:
         Exception: The path does not lead to an html file.
     Returns:
@@ -15,12 +18,18 @@ def get_html_file_text(file_path: str) -> str:
     if not file_path.endswith('.html'):
         raise Exception('File must be html')
     # Read file contents
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
+    if content == None:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+            content = file.read()
     text_content = re.sub(r'<(\S?\d+)[^>]>(.?)|<.*?\>', '', content, flags=re.S)
     return text_content
 
 def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Write the text without tags of each html file')
+    parser.add_argument('--prefetch', type=int, default=0, help='Files read ahead in a thread pool while the current one is processed')
+    args = parser.parse_args()
+
     process_start_time = time.time()
     # Generate folder path
     main_path = os.getcwd()
@@ -30,13 +39,14 @@ def main():
     # Get files names
     files = sorted(os.listdir(html_path))
     # For each file create a new one without 
-    with open(time_result_path, 'w', encoding='utf-8') as f:
+    with open(time_result_path, 'w', encoding='utf-8') as f, CorpusReader([os.path.join(html_path, file) for file in files], args.prefetch) as reader:
         total_time = 0
-        for file in files:
+        start_time = time.time()
+        for file_path, html_content in reader:
+            file = os.path.basename(file_path)
             try:
                 # Calculate time to open file
-                start_time = time.time()
-                content = get_html_file_text(os.path.join(html_path, file))
+                content = get_html_file_text(file_path, html_content)
                 # Write the content in a new .txt file
                 with open(os.path.join(result_path, re.sub(r'\.[^.]+$', '.txt', file)), 'w', encoding='utf-8') as file_result:
                     file_result.write(content)
@@ -44,6 +54,7 @@ def main():
                 pass
             end_time = time.time()
             execution_time = end_time - start_time
+            start_time = end_time # The next file is read while it is taken from the reader
             # Write the time in the file
             f.write(f"{file}\t\t\t{execution_time:.20f}\n")
             total_time += execution_time
@@ -2,6 +2,7 @@ from collections import defaultdict
 import os
 import re
 import time
+from tokenizer import tokenize_text
 
 def get_html_file_text(file_path: str) -> str:
     """Gets the content of an html file without the tags
@@ -32,7 +33,7 @@ def order_words(file_path: str) -> list:
     """
     text_content = get_html_file_text(file_path)
     # Split the content into words
-    words = re.findall(r'\b(?![0-9]+\b)\w+(?:-\w+)*\b', text_content.lower())
+    words = list(tokenize_text(text_content, 'no_numbers'))
     # Order the words alphabetically
     words.sort()
     return words 
@@ -1,6 +1,10 @@
+import argparse
 import time
 import os
-import re
+from word_count import count_words, add_word_counts
+from tokenizer import tokenize_file
+from posting_store import PostingStore, write_dictionary_posting
+from external_sort import ExternalIndexBuilder
 
 def get_unique_words(folder_path: str, file_name: str) -> list[dict[str, any]]:
     """Get every unique word of a file.
@@ -10,12 +14,8 @@ def get_unique_words(folder_path: str, file_name: str) -> list[dict[str, any]]:
     Returns:
         dict[str, int]: an array with every word of the file.
     """
-    # Read file content
-    with open(os.path.join(folder_path, file_name), 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
-    separated_words = re.split('\n', content) # Separate the words of the files
-    filtered_words = [word for word in separated_words if word.isalnum()] # Remove any word with special symbols
-    word_dictionary = add_words_to_dictionary({}, filtered_words) # Return every unique word
+    filtered_words = tokenize_file(os.path.join(folder_path, file_name), 'lines') # One word per line, without special symbols
+    word_dictionary = count_words(filtered_words) # Return every unique word
     # return word_dictionary
     return [{ 'word': word, 'file': file_name, 'frec': word_dictionary[word] } for word in list(word_dictionary.keys())]
 
@@ -27,15 +27,7 @@ def add_words_to_dictionary(dictionary: dict[str, int], words: list[str]) -> dic
     Returns:
         dict[str, int]: The dictionary with the new word count.
     """
-    new_dictionary = dictionary.copy()
-    dictionary_words = list(dictionary.keys())
-    for word in words:
-        if word in dictionary_words:
-            new_dictionary[word] = new_dictionary[word] + 1
-        else:
-            new_dictionary[word] = 1
-            dictionary_words.append(word)
-    return new_dictionary
+    return add_word_counts(dictionary.copy(), words)
 
 def get_loading_bar(actual_number: int, total_number: int, bar_size: int) -> str:
     """Generate a loading bar.
@@ -55,6 +47,11 @@ def get_loading_bar(actual_number: int, total_number: int, bar_size: int) -> str
 
 
 def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Create the dictionary and posting files of the alphabetically sorted documents')
+    parser.add_argument('--memory-budget', type=int, default=None, help='MB of postings kept in memory before writing sorted runs to disk')
+    args = parser.parse_args()
+
     # Take time of the process
     process_start_time = time.time()
     
@@ -64,54 +61,41 @@ def main():
     output_file_dictionary = os.path.join(main_path, 'src/results/token_dictionary.txt')
     output_file_posting = os.path.join(main_path, 'src/results/token_posting.txt')
     output_file_times = os.path.join(main_path, 'src/results/times/a7_al02883272.txt')
+    documents_path = os.path.join(main_path, 'src/Documents.txt')
     
     # Get input files
     files = sorted(os.listdir(input_path))
     
-    posting_records: list[dict[str, any]] = [] # list with the word in each file and the num of times they appear
+    # the word in each file and the num of times they appear, in sorted runs on disk if there is a memory budget
+    if args.memory_budget == None:
+        posting_store = PostingStore(documents_path)
+    else:
+        posting_store = ExternalIndexBuilder(args.memory_budget * 1024 * 1024, os.path.dirname(output_file_posting))
     file_times_records: list[dict[str, any]] = [] # list with the time it took to process each file
-    # Get the word count of each file in the doc
-    for index, file in enumerate(files):
-        print(f'Processing file {index + 1} of {len(files)} {get_loading_bar(index + 1, len(files), 20)}', end='\r', flush=True)
-        file_start_time = time.time() # Start to take time
-        
-        file_records = get_unique_words(input_path, file)
-        
-        posting_records.extend(file_records)
-        file_end_time = time.time() # Finish to take time
-        file_times_records.append({
-            'file': file,
-            'time': file_end_time - file_start_time
-        })
-        
-    # Sort alphabetically by the word
-    posting_records = sorted(posting_records, key=lambda x: x['word']) 
-    
-    # Create token document records from posting records
-    doc_records: list[dict[str, any]] = []
-    last_posting_word = ''
-    posting_num = 0
-    for posting_row in posting_records:
-        if posting_row['word'] != last_posting_word:
-            last_posting_word = posting_row['word']
-            doc_records.append({
-                'word': last_posting_word,
-                '#doc': 1,
-                'posting': posting_num
+    try:
+        # Get the word count of each file in the doc
+        for index, file in enumerate(files):
+            print(f'Processing file {index + 1} of {len(files)} {get_loading_bar(index + 1, len(files), 20)}', end='\r', flush=True)
+            file_start_time = time.time() # Start to take time
+            
+            file_records = get_unique_words(input_path, file)
+            
+            posting_store.add_document(file, ((record['word'], record['frec']) for record in file_records))
+            file_end_time = time.time() # Finish to take time
+            file_times_records.append({
+                'file': file,
+                'time': file_end_time - file_start_time
             })
-        else:
-            doc_records[-1]['#doc'] += 1
-        posting_num += 1
+            
+        # Sort alphabetically by the word and write the token document records and the postings
+        write_dictionary_posting(posting_store.iter_sorted(), output_file_dictionary, output_file_posting)
+    finally:
+        if isinstance(posting_store, ExternalIndexBuilder):
+            posting_store.cleanup() # The runs are removed even if the files were not written
     
     process_end_time = time.time()
     print('\nFinished process.')
     # Write results in files
-    with open(output_file_dictionary, 'w', encoding='utf-8', errors='replace') as file:
-        for record in doc_records:
-            file.write(f"{record['word']};{record['#doc']};{record['posting']}\n")
-    with open(output_file_posting, 'w', encoding='utf-8', errors='replace') as file:
-        for record in posting_records:
-            file.write(f"{record['file']};{record['frec']}\n")
     with open(output_file_times, 'w', encoding='utf-8', errors='replace') as file:
         for record in file_times_records:
             file.write(f"{record['file']}\t{record['time']}\n")
@@ -1,6 +1,8 @@
+import argparse
 import os
-import re
 import time
+from tokenizer import tokenize_file
+from external_sort import ExternalIndexBuilder
 
 class HashTable:
     def __init__(self, size):
@@ -48,11 +50,7 @@ def get_unique_words(folder_path: str, file_name: str) -> list[dict[str, any]]:
     Returns:
         dict[str, int]: an array with every word of the file.
     """
-    # Read file content
-    with open(os.path.join(folder_path, file_name), 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
-    separated_words = re.split('[\n|,| |.|:|;|(|)]', content)  # Separate the words of the files
-    filtered_words = [word for word in separated_words if word.isalnum()]  # Remove any word with special symbols
+    filtered_words = tokenize_file(os.path.join(folder_path, file_name), 'separators')  # Separate the words of the files without special symbols
     word_dictionary = HashTable(10000)  # Initialize a new HashTable instance
     add_words_to_dictionary(word_dictionary, filtered_words)  # Add words to the HashTable
     return [{'word': word[0], 'file': file_name, 'frec': word[1]} for word_list in word_dictionary.table if word_list for word in word_list if word and len(word) >= 2]
@@ -89,6 +87,11 @@ def save_hash_table_to_file(hash_table: HashTable, file_path: str) -> None:
         file.write(f"Total Collisions: {hash_table.collisions}\n")
 
 def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Create the dictionary and posting files of the alphabetically sorted documents')
+    parser.add_argument('--memory-budget', type=int, default=None, help='MB of postings kept in memory before writing sorted runs to disk')
+    args = parser.parse_args()
+
     # Take time of the process
     process_start_time = time.time()
     
@@ -105,46 +108,58 @@ def main():
     
     doc_dictionary = HashTable(10000) # dictionary with the words and the num of documents they appear
     posting_records: list[dict[str, any]] = [] # list with the word in each file and the num of times they appear
-    file_times_records: list[dict[str, any]] = [] # list with the time it took to process each file
-    # Get the word count of each file in the doc
-    for index, file in enumerate(files):
-        print(f'Processing file {index + 1} of {len(files)}', end='\r', flush=True)
-        file_start_time = time.time() # Start to take time
-        file_records = get_unique_words(input_path, file)
-        file_words = map(lambda x: x['word'], file_records)
-        add_words_to_dictionary(doc_dictionary, file_words)
-        posting_records.extend(file_records)
-        file_end_time = time.time() # Finish to take time
-        file_times_records.append({
-            'file': file,
-            'time': file_end_time - file_start_time
-        })
+    builder = ExternalIndexBuilder(args.memory_budget * 1024 * 1024, os.path.dirname(output_file_posting)) if args.memory_budget != None else None # sorted runs on disk instead of posting_records
+    try:
+        file_times_records: list[dict[str, any]] = [] # list with the time it took to process each file
+        # Get the word count of each file in the doc
+        for index, file in enumerate(files):
+            print(f'Processing file {index + 1} of {len(files)}', end='\r', flush=True)
+            file_start_time = time.time() # Start to take time
+            file_records = get_unique_words(input_path, file)
+            file_words = map(lambda x: x['word'], file_records)
+            add_words_to_dictionary(doc_dictionary, file_words)
+            if builder == None:
+                posting_records.extend(file_records)
+            else:
+                builder.add_document(file, ((record['word'], record['frec']) for record in file_records))
+            file_end_time = time.time() # Finish to take time
+            file_times_records.append({
+                'file': file,
+                'time': file_end_time - file_start_time
+            })
             
-    # Create token document records from dictionary
-    doc_records: list[dict[str, any]] = []
-    posting_sum = 0
-    for word_list in doc_dictionary.table:
-        if word_list:
-            for word in word_list:
-                doc_records.append({
-                    'word': word[0],
-                    '#doc': word[1],
-                    'posting': posting_sum
-                })
-                posting_sum += word[1]
+        # Create token document records from dictionary
+        doc_records: list[dict[str, any]] = []
+        posting_sum = 0
+        for word_list in doc_dictionary.table:
+            if word_list:
+                for word in word_list:
+                    doc_records.append({
+                        'word': word[0],
+                        '#doc': word[1],
+                        'posting': posting_sum
+                    })
+                    posting_sum += word[1]
         
-    # Sort alphabetically by the word
-    posting_records = sorted(posting_records, key=lambda x: x['word']) 
+        # Sort alphabetically by the word
+        posting_records = sorted(posting_records, key=lambda x: x['word']) 
     
-    process_end_time = time.time()
-    print('Finished process.')
-    # Write results in files
-    with open(output_file_dictionary, 'w', encoding='utf-8', errors='replace') as file:
-        for record in doc_records:
-            file.write(f"{record['word']};{record['#doc']};{record['posting']}\n")
-    with open(output_file_posting, 'w', encoding='utf-8', errors='replace') as file:
-        for record in posting_records:
-            file.write(f"{record['file']};{record['frec']}\n")
+        process_end_time = time.time()
+        print('Finished process.')
+        # Write results in files
+        with open(output_file_dictionary, 'w', encoding='utf-8', errors='replace') as file:
+            for record in doc_records:
+                file.write(f"{record['word']};{record['#doc']};{record['posting']}\n")
+        with open(output_file_posting, 'w', encoding='utf-8', errors='replace') as file:
+            if builder == None:
+                for record in posting_records:
+                    file.write(f"{record['file']};{record['frec']}\n")
+            else:
+                for _, file_name, frec in builder.iter_sorted():
+                    file.write(f"{file_name};{frec}\n")
+    finally:
+        if builder != None:
+            builder.cleanup()
     with open(output_file_times, 'w', encoding='utf-8', errors='replace') as file:
         for record in file_times_records:
             file.write(f"{record['file']}\t{record['time']}\n")
@@ -1,6 +1,9 @@
+import argparse
 import time
 import os
-import re
+from word_count import count_words, add_word_counts, merge_document_frequencies
+from tokenizer import tokenize_file
+from external_sort import ExternalIndexBuilder
 
 def get_unique_words(folder_path: str, file_name: str) -> list[dict[str, any]]:
     """Get every unique word of a file.
@@ -10,13 +13,9 @@ def get_unique_words(folder_path: str, file_name: str) -> list[dict[str, any]]:
     Returns:
         dict[str, int]: an array with every word of the file.
     """
-    # Read file content
-    with open(os.path.join(folder_path, file_name), 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
+    separated_words = tokenize_file(os.path.join(folder_path, file_name), 'words') # Separate the words of the files
 
-    separated_words = re.findall(r'\b(?![a-zA-Z]*\d)\w+(?:-\w+)*\b', content) # Separate the words of the files
-
-    word_dictionary = add_words_to_dictionary({}, separated_words) # Return every unique word
+    word_dictionary = count_words(separated_words) # Return every unique word
     return [{ 'word': word, 'file': file_name, 'frec': word_dictionary[word] } for word in list(word_dictionary.keys())]
 
 def add_words_to_dictionary(dictionary: dict[str, int], words: str) -> dict[str, int]:
@@ -27,15 +26,7 @@ def add_words_to_dictionary(dictionary: dict[str, int], words: str) -> dict[str,
     Returns:
         dict[str, int]: The dictionary with the new word count.
     """
-    new_dictionary = dictionary.copy()
-    dictionary_words = list(dictionary.keys())
-    for word in words:
-        if word in dictionary_words:
-            new_dictionary[word] = new_dictionary[word] + 1
-        else:
-            new_dictionary[word] = 1
-            dictionary_words.append(word)
-    return new_dictionary
+    return add_word_counts(dictionary.copy(), words)
 
 def filter_words(word_dict: dict[str, int], stop_list_path: str) -> dict[str, int]:
     """Filter out words based on stop list, frequency, and length criteria.
@@ -47,7 +38,7 @@ def filter_words(word_dict: dict[str, int], stop_list_path: str) -> dict[str, in
     """
     # Read stop list
     with open(stop_list_path, 'r', encoding='utf-8') as stop_file:
-        stop_list = stop_file.read().splitlines()
+        stop_list = set(stop_file.read().splitlines())
 
     # Filter words
     filtered_dict = {}
@@ -74,6 +65,11 @@ def get_loading_bar(actual_number: int, total_number: int, bar_size: int) -> str
 
 
 def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Create the dictionary and posting files of the alphabetically sorted documents')
+    parser.add_argument('--memory-budget', type=int, default=None, help='MB of postings kept in memory before writing sorted runs to disk')
+    args = parser.parse_args()
+
     # Take time of the process
     process_start_time = time.time()
     
@@ -91,54 +87,66 @@ def main():
     
     doc_dictionary = {} # dictionary with the words and the num of documents they appear
     posting_records: list[dict[str, any]] = [] # list with the word in each file and the num of times they appear
-    file_times_records: list[dict[str, any]] = [] # list with the time it took to process each file
+    builder = ExternalIndexBuilder(args.memory_budget * 1024 * 1024, os.path.dirname(output_file_posting)) if args.memory_budget != None else None # sorted runs on disk instead of posting_records
+    try:
+        file_times_records: list[dict[str, any]] = [] # list with the time it took to process each file
     
-    # Get the word count of each file in the doc
-    for index, file in enumerate(files):
-        print(f'Processing file {index + 1} of {len(files)} {get_loading_bar(index + 1, len(files), 20)}', end='\r', flush=True)
-        file_start_time = time.time() # Start to take time
-        file_records = get_unique_words(input_path, file)
-        file_words = map(lambda x: x['word'], file_records)
-        doc_dictionary = add_words_to_dictionary(doc_dictionary, file_words)
-        posting_records.extend(file_records)
-        file_end_time = time.time() # Finish to take time
-        file_times_records.append({
-            'file': file,
-            'time': file_end_time - file_start_time
-        })
+        # Get the word count of each file in the doc
+        for index, file in enumerate(files):
+            print(f'Processing file {index + 1} of {len(files)} {get_loading_bar(index + 1, len(files), 20)}', end='\r', flush=True)
+            file_start_time = time.time() # Start to take time
+            file_records = get_unique_words(input_path, file)
+            file_words = map(lambda x: x['word'], file_records)
+            merge_document_frequencies(doc_dictionary, file_words) # Modify the global dictionary instead of copying it
+            if builder == None:
+                posting_records.extend(file_records)
+            else:
+                builder.add_document(file, ((record['word'], record['frec']) for record in file_records))
+            file_end_time = time.time() # Finish to take time
+            file_times_records.append({
+                'file': file,
+                'time': file_end_time - file_start_time
+            })
             
-    # Filter words
-    filtered_dictionary = filter_words(doc_dictionary, stop_list_path)
+        # Filter words
+        filtered_dictionary = filter_words(doc_dictionary, stop_list_path)
     
-    # Create token document records from dictionary
-    doc_records: list[dict[str, any]] = []
-    posting_sum = 0
-    for word in sorted(list(filtered_dictionary.keys())):
-        doc_records.append({
-            'word': word,
-            '#doc': filtered_dictionary[word],
-            'posting': posting_sum
-        })
-        posting_sum += filtered_dictionary[word]
+        # Create token document records from dictionary
+        doc_records: list[dict[str, any]] = []
+        posting_sum = 0
+        for word in sorted(list(filtered_dictionary.keys())):
+            doc_records.append({
+                'word': word,
+                '#doc': filtered_dictionary[word],
+                'posting': posting_sum
+            })
+            posting_sum += filtered_dictionary[word]
         
-    # Sort alphabetically by the word
-    posting_records = sorted(posting_records, key=lambda x: x['word']) 
+        # Sort alphabetically by the word
+        posting_records = sorted(posting_records, key=lambda x: x['word']) 
     
-    process_end_time = time.time()
-    print('Finished process.')
+        process_end_time = time.time()
+        print('Finished process.')
     
-    # Write filtered words to file
-    with open(output_file_filtered, 'w', encoding='utf-8', errors='replace') as file:
-        for word, freq in filtered_dictionary.items():
-            file.write(f"{word};{freq}\n")
+        # Write filtered words to file
+        with open(output_file_filtered, 'w', encoding='utf-8', errors='replace') as file:
+            for word, freq in filtered_dictionary.items():
+                file.write(f"{word};{freq}\n")
     
-    # Write results in files
-    with open(output_file_dictionary, 'w', encoding='utf-8', errors='replace') as file:
-        for record in doc_records:
-            file.write(f"{record['word']};{record['#doc']};{record['posting']}\n")
-    with open(output_file_posting, 'w', encoding='utf-8', errors='replace') as file:
-        for record in posting_records:
-            file.write(f"{record['file']};{record['frec']}\n")
+        # Write results in files
+        with open(output_file_dictionary, 'w', encoding='utf-8', errors='replace') as file:
+            for record in doc_records:
+                file.write(f"{record['word']};{record['#doc']};{record['posting']}\n")
+        with open(output_file_posting, 'w', encoding='utf-8', errors='replace') as file:
+            if builder == None:
+                for record in posting_records:
+                    file.write(f"{record['file']};{record['frec']}\n")
+            else:
+                for _, file_name, frec in builder.iter_sorted():
+                    file.write(f"{file_name};{frec}\n")
+    finally:
+        if builder != None:
+            builder.cleanup()
     with open(output_file_times, 'w', encoding='utf-8', errors='replace') as file:
         for record in file_times_records:
             file.write(f"{record['file']}\t{record['time']}\n")
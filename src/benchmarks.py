@@ -0,0 +1,714 @@
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from HashTable import hashtable, openhashtable, sha1_hash, crc32_hash, cached_hash
+from actividad_8 import HashTable
+from word_count import count_words, merge_document_frequencies
+from evidencia_1_times import tokenize, index, count_file_postings
+from posting_store import PostingStore
+from actividad_13 import generate_main_files, get_dict_data
+from binary_index import convert_index_file, read_index_groups, write_binary_index, write_weights_file
+from query_engine import QueryEngine
+from incremental_index import update_index, update_segments
+from segmented_index import SegmentedIndex
+from positional_index import PositionalIndex, build_positional_index, scan_phrase
+from tokenizer import tokenize_file
+from query_cache import CachedQueryEngine, get_generation_path
+from actividad_12 import create_document_index, legacy_search_word, read_document_ids, search_word
+
+def read_words(input_folder: str, file_quantity: int = None) -> list[str]:
+    """Read the words of the alphabetically ordered files.
+    Args:
+        input_folder (str): folder with the files (one word per line).
+        file_quantity (int): max number of files to read.
+    Returns:
+        list[str]: every word of the files.
+    """
+    words: list[str] = []
+    for file in sorted(os.listdir(input_folder))[:file_quantity]:
+        with open(os.path.join(input_folder, file), 'r', encoding='utf-8', errors='replace') as f:
+            words.extend(re.findall(r'\b(?![a-zA-Z]*\d)\w+(?:-\w+)*\b', f.read()))
+    return words
+
+def hashtable_benchmark(input_folder: str, output_path: str):
+    """Compare the word count with the old SHA-1 haskey/get/add loop against increment.
+    Args:
+        input_folder (str): folder with the files to count.
+        output_path (str): file where the times are written.
+    """
+    words = read_words(input_folder)
+    results: list[tuple[str, float]] = []
+
+    # Old way: three SHA-1 hashes per word
+    start_time = time.time()
+    table = hashtable[str, int](73369, sha1_hash)
+    for word in words:
+        if table.haskey(word):
+            table.add(word, table.get(word) + 1)
+        else:
+            table.add(word, 1)
+    results.append(('sha1 haskey/get/add', time.time() - start_time))
+
+    for name, hash_function in [('sha1 increment', sha1_hash), ('cached sha1 increment', cached_hash(sha1_hash)), ('crc32 increment', crc32_hash)]:
+        start_time = time.time()
+        table = hashtable[str, int](73369, hash_function)
+        for word in words:
+            table.increment(word)
+        results.append((name, time.time() - start_time))
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Palabras: {len(words)}\n")
+        for name, total_time in results:
+            file.write(f"{name}\tTiempo: {total_time} sec\tSpeedup: {results[0][1] / total_time:.2f}x\n")
+
+def memory_benchmark(input_folder: str, output_path: str):
+    """Compare memory and time of the hash tables when counting the words of the whole corpus.
+    Args:
+        input_folder (str): folder with the files to count.
+        output_path (str): file where the results are written.
+    """
+    words = read_words(input_folder)
+    results: list[tuple[str, float, int, int]] = []
+    tables = [
+        ('hashtable(73369)', lambda: hashtable[str, int](73369)),
+        ('actividad_8.HashTable(10000)', lambda: HashTable(10000)),
+        ('openhashtable', lambda: openhashtable[str, int]()),
+    ]
+    for name, create_table in tables:
+        tracemalloc.start()
+        start_time = time.time()
+        table = create_table()
+        for word in words:
+            if isinstance(table, HashTable):
+                value = table.search(word)
+                table.insert(word, value + 1 if value else 1)
+            else:
+                table.increment(word)
+        total_time = time.time() - start_time
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append((name, total_time, memory, len(set(words))))
+        del table
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Palabras: {len(words)}\tUnicas: {results[0][3]}\n")
+        for name, total_time, memory, unique_words in results:
+            file.write(f"{name}\tTiempo: {total_time} sec\tMemoria: {memory} bytes\tBytes por palabra: {memory / unique_words:.1f}\n")
+
+def legacy_add_words_to_dictionary(dictionary: dict[str, int], words: list[str]) -> dict[str, int]:
+    """Word count as it was done in actividad_7 and actividad_9 (list membership and a copy per call)."""
+    new_dictionary = dictionary.copy()
+    dictionary_words = list(dictionary.keys())
+    for word in words:
+        if word in dictionary_words:
+            new_dictionary[word] = new_dictionary[word] + 1
+        else:
+            new_dictionary[word] = 1
+            dictionary_words.append(word)
+    return new_dictionary
+
+def word_count_benchmark(input_folder: str, output_path: str, legacy_file_quantity: int = 60):
+    """Time per word of each file in the actividad_9 count loop while the global vocabulary grows.
+    Args:
+        input_folder (str): folder with the files to count.
+        output_path (str): file where the times are written.
+        legacy_file_quantity (int): number of files counted with the old functions (they are quadratic).
+    """
+    files = sorted(os.listdir(input_folder))
+    documents = []
+    for file in files:
+        with open(os.path.join(input_folder, file), 'r', encoding='utf-8', errors='replace') as f:
+            documents.append(re.findall(r'\b(?![a-zA-Z]*\d)\w+(?:-\w+)*\b', f.read()))
+
+    legacy_times: list[float] = []
+    doc_dictionary: dict[str, int] = {}
+    for words in documents[:legacy_file_quantity]:
+        start_time = time.time()
+        word_dictionary = legacy_add_words_to_dictionary({}, words)
+        doc_dictionary = legacy_add_words_to_dictionary(doc_dictionary, word_dictionary.keys())
+        legacy_times.append((time.time() - start_time) / max(len(words), 1))
+
+    times: list[float] = []
+    vocabulary_sizes: list[int] = []
+    doc_dictionary = {}
+    for words in documents:
+        start_time = time.time()
+        word_dictionary = count_words(words)
+        merge_document_frequencies(doc_dictionary, word_dictionary)
+        times.append((time.time() - start_time) / max(len(words), 1))
+        vocabulary_sizes.append(len(doc_dictionary))
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        for index in range(9, len(documents), 50):
+            legacy_time = f"{legacy_times[index] * 1e6:.3f} us" if index < len(legacy_times) else '-'
+            file.write(f"Doc#: {index + 1}\tVocabulario: {vocabulary_sizes[index]}\tTiempo por palabra: {times[index] * 1e6:.3f} us\tAnterior: {legacy_time}\n")
+
+def workers_benchmark(input_folder: str, output_path: str):
+    """Speedup of evidencia_1 tokenize and index with different number of worker processes.
+    Args:
+        input_folder (str): folder with the files to process.
+        output_path (str): file where the times are written.
+    """
+    # tokenize needs the file number in the name
+    input_paths = [os.path.join(input_folder, file) for file in sorted(os.listdir(input_folder)) if re.match(r'\d+', file)]
+    worker_counts = [1]
+    while worker_counts[-1] * 2 <= max(os.cpu_count() or 1, 2):
+        worker_counts.append(worker_counts[-1] * 2)
+    results: list[tuple[int, float, float, bool]] = []
+    serial_outputs: tuple[bytes, bytes] = None
+    for workers in worker_counts:
+        token_path, index_path = f"{output_path}.token.tmp", f"{output_path}.index.tmp"
+        start_time = time.time()
+        tokenize(output_path=token_path, input_paths=input_paths, workers=workers)
+        index_start_time = time.time()
+        index(output_path=index_path, input_paths=input_paths, workers=workers)
+        end_time = time.time()
+        with open(token_path, 'rb') as token_file, open(index_path, 'rb') as index_file:
+            outputs = (token_file.read(), index_file.read())
+        os.remove(token_path)
+        os.remove(index_path)
+        if serial_outputs == None:
+            serial_outputs = outputs
+        results.append((workers, index_start_time - start_time, end_time - index_start_time, outputs == serial_outputs))
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Docs: {len(input_paths)}\tCPUs: {os.cpu_count()}\n")
+        for workers, token_time, index_time, same_output in results:
+            file.write(f"Workers: {workers}\tTokenize: {token_time} sec ({results[0][1] / token_time:.2f}x)\tIndex: {index_time} sec ({results[0][2] / index_time:.2f}x)\tMisma salida: {same_output}\n")
+
+def postings_memory_benchmark(input_folder: str, output_path: str):
+    """Compare the memory of the posting dicts of evidencia_1_times.index against PostingStore.
+    Args:
+        input_folder (str): folder with the files to index.
+        output_path (str): file where the results are written.
+    """
+    input_paths = [os.path.join(input_folder, file) for file in sorted(os.listdir(input_folder))]
+    files_postings = [count_file_postings(file_path) for file_path in input_paths] # Words are created before measuring
+    posting_count = sum(len(file_postings) for file_postings in files_postings)
+    results: list[tuple[str, int, float]] = []
+
+    tracemalloc.start()
+    start_time = time.time()
+    posting_records: list[dict[str, any]] = []
+    for file_path, file_postings in zip(input_paths, files_postings):
+        posting_records.extend({ 'word': word, 'file': file_path.split('/')[-1], 'frec': frec } for word, frec in file_postings)
+    memory, _ = tracemalloc.get_traced_memory()
+    results.append(('list[dict]', memory, time.time() - start_time))
+    del posting_records
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    start_time = time.time()
+    posting_store = PostingStore()
+    for file_path, file_postings in zip(input_paths, files_postings):
+        posting_store.add_document(file_path.split('/')[-1], file_postings)
+    memory, _ = tracemalloc.get_traced_memory()
+    results.append(('PostingStore', memory, time.time() - start_time))
+    del posting_store
+    tracemalloc.stop()
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Postings: {posting_count}\n")
+        for name, memory, total_time in results:
+            file.write(f"{name}\tMemoria: {memory} bytes\tBytes por posting: {memory / posting_count:.1f}\tTiempo: {total_time} sec\n")
+
+def build_query_index(input_folder: str, temp_dir: str) -> dict[str, str]:
+    """Build every index file used by the searches in a temporary folder.
+    Args:
+        input_folder (str): folder with the files to index.
+        temp_dir (str): folder where the index files are written.
+    Returns:
+        dict[str, str]: path of the index, text dictionary and postings and binary dictionary and postings.
+    """
+    paths = {
+        'index': os.path.join(temp_dir, 'indexed_tokens.txt'),
+        'dict': os.path.join(temp_dir, 'token_dict.txt'),
+        'post': os.path.join(temp_dir, 'token_post.txt'),
+        'binary_dict': os.path.join(temp_dir, 'token_dict.bin'),
+        'binary_post': os.path.join(temp_dir, 'token_post.bin'),
+    }
+    index(output_path=paths['index'], input_path=input_folder)
+    generate_main_files(paths['index'], paths['dict'], paths['post'])
+    convert_index_file(paths['index'], paths['binary_dict'], paths['binary_post'])
+    return paths
+
+def query_engine_benchmark(input_folder: str, output_path: str, query_quantity: int = 200):
+    """Latency of the actividad_13 searches with the text files against the mmap QueryEngine.
+    Args:
+        input_folder (str): folder with the files to index.
+        output_path (str): file where the times are written.
+        query_quantity (int): number of random queries of one to three words.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = build_query_index(input_folder, temp_dir)
+        words = [word for word, _ in read_index_groups(paths['index'])]
+        generator = random.Random(0)
+        queries = [generator.sample(words, generator.randint(1, 3)) for _ in range(query_quantity)]
+
+        start_time = time.time()
+        for query in queries:
+            for token in query:
+                get_dict_data(paths['dict'], paths['post'], token)
+        text_time = time.time() - start_time
+
+        start_time = time.time()
+        engine = QueryEngine(paths['binary_dict'], paths['binary_post'])
+        open_time = time.time() - start_time
+        start_time = time.time()
+        for query in queries:
+            engine.search(query)
+        engine_time = time.time() - start_time
+        engine.close()
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Busquedas: {query_quantity}\tTerminos: {len(words)}\n")
+        file.write(f"get_dict_data\tTiempo por busqueda: {text_time / query_quantity * 1e6:.1f} us\n")
+        file.write(f"QueryEngine\tApertura: {open_time * 1e6:.1f} us\tTiempo por busqueda: {engine_time / query_quantity * 1e6:.1f} us\tSpeedup: {text_time / engine_time:.2f}x\n")
+
+def top_k_benchmark(input_folder: str, output_path: str, query_quantity: int = 200):
+    """Compare the full sort of actividad_13, the heap top-k and the document at a time merge.
+    Args:
+        input_folder (str): folder with the files to index.
+        output_path (str): file where the times are written.
+        query_quantity (int): number of queries of each kind.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = build_query_index(input_folder, temp_dir)
+        groups = [(word, len(postings)) for word, postings in read_index_groups(paths['index'])]
+        engine = QueryEngine(paths['binary_dict'], paths['binary_post'])
+
+    def full_sort(tokens: list[str], limit: int) -> list[tuple[str, int, int]]:
+        file_data: dict[int, list[int]] = {}
+        for token in dict.fromkeys(tokens):
+            for doc_id, frec in zip(*engine.postings(token)):
+                data = file_data.setdefault(doc_id, [0, 0])
+                data[0] += 1
+                data[1] += frec
+        files_sorted = sorted(file_data.keys(), key=lambda x: (file_data[x][0], file_data[x][1]), reverse=True)
+        return [(engine.document_names[doc_id], file_data[doc_id][0], file_data[doc_id][1]) for doc_id in files_sorted[:limit]]
+
+    generator = random.Random(0)
+    groups.sort(key=lambda x: x[1], reverse=True)
+    common_words = [word for word, _ in groups[:200]]
+    rare_words = [word for word, posting_count in groups if 5 <= posting_count <= 20]
+    query_sets = {
+        'comunes': [generator.sample(common_words, 3) for _ in range(query_quantity)],
+        'comunes + rara': [generator.sample(common_words, 2) + [generator.choice(rare_words)] for _ in range(query_quantity)],
+    }
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        for query_name, queries in query_sets.items():
+            for k in [10, 100]:
+                results: list[tuple[str, float]] = []
+                rankings = []
+                for name, search in [('sort', full_sort), ('heap', engine.search), ('daat', engine.search_daat)]:
+                    start_time = time.time()
+                    rankings.append([[(diversity, quantity) for _, diversity, quantity in search(query, k)] for query in queries])
+                    results.append((name, (time.time() - start_time) / query_quantity))
+                same_ranking = rankings[0] == rankings[1] == rankings[2]
+                file.write(f"Consultas: {query_name}\tk: {k}\tMismo ranking: {same_ranking}\n")
+                for name, query_time in results:
+                    file.write(f"{name}\tTiempo por busqueda: {query_time * 1e6:.1f} us\tSpeedup: {results[0][1] / query_time:.2f}x\n")
+    engine.close()
+
+def build_synthetic_index(index_path: str, factor: int, dict_path: str, post_path: str):
+    """Build a binary index with every document repeated factor times, the copies get slightly different frecs.
+    Args:
+        index_path (str): path of the word;file;frec index.
+        factor (int): number of copies of each document.
+        dict_path (str): path of the binary dictionary.
+        post_path (str): path of the binary postings.
+    """
+    generator = random.Random(0)
+    document_names = sorted({file_name for _, postings in read_index_groups(index_path) for file_name, _ in postings})
+    document_ids = {name: doc_id for doc_id, name in enumerate(document_names)}
+    terms_postings = ((word, [(document_ids[file_name] * factor + copy, max(1, frec + generator.randint(-2, 2))) for file_name, frec in postings for copy in range(factor)]) for word, postings in read_index_groups(index_path))
+    write_binary_index(terms_postings, [f"{name}#{copy}" for name in document_names for copy in range(factor)], dict_path, post_path)
+
+def scoring_benchmark(input_folder: str, output_path: str, query_quantity: int = 200, factor: int = 100):
+    """Query throughput of the BM25 and TF-IDF scoring against the diversity ranking, on the corpus and on a synthetic corpus.
+    Args:
+        input_folder (str): folder with the files to index.
+        output_path (str): file where the times are written.
+        query_quantity (int): number of random queries of one to three words.
+        factor (int): number of copies of each document in the synthetic corpus.
+    """
+    results: list[tuple[str, int, str, float]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = build_query_index(input_folder, temp_dir)
+        words = [word for word, _ in read_index_groups(paths['index'])]
+        generator = random.Random(0)
+        queries = [generator.sample(words, generator.randint(1, 3)) for _ in range(query_quantity)]
+        synthetic_dict_path, synthetic_post_path = os.path.join(temp_dir, 'synthetic_dict.bin'), os.path.join(temp_dir, 'synthetic_post.bin')
+        build_synthetic_index(paths['index'], factor, synthetic_dict_path, synthetic_post_path)
+        for corpus_name, dict_path, post_path in [('corpus', paths['binary_dict'], paths['binary_post']), (f'sintetico {factor}x', synthetic_dict_path, synthetic_post_path)]:
+            weights_path = f"{dict_path}.weights"
+            start_time = time.time()
+            write_weights_file(dict_path, post_path, weights_path)
+            build_time = time.time() - start_time
+            engine = QueryEngine(dict_path, post_path, weights_path=weights_path)
+            searches = [
+                ('diversidad', lambda query: engine.search(query)),
+                ('tfidf', lambda query: engine.search_scored(query, scheme='tfidf')),
+                ('bm25', lambda query: engine.search_scored(query, scheme='bm25')),
+            ]
+            results.append((corpus_name, len(engine.document_names), 'pesos', build_time))
+            for name, search in searches:
+                start_time = time.time()
+                for query in queries:
+                    search(query)
+                results.append((corpus_name, len(engine.document_names), name, time.time() - start_time))
+            engine.close()
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Busquedas: {query_quantity}\n")
+        for corpus_name, doc_count, name, total_time in results:
+            if name == 'pesos':
+                file.write(f"{corpus_name}\tDocs: {doc_count}\tCalculo de pesos: {total_time} sec\n")
+            else:
+                file.write(f"{corpus_name}\t{name}\tBusquedas por segundo: {query_quantity / total_time:.1f}\n")
+
+def incremental_benchmark(input_folder: str, output_path: str):
+    """Cost of the incremental index update for different numbers of changed documents, against a full index.
+    The update of indexed_tokens.txt is followed by the rebuild of the files that actividad_13 generates from it
+    (text and binary dictionary and postings and the weights), the update of the segments only writes the changed
+    documents and its lookups are compared with the rebuilt binary index.
+    Args:
+        input_folder (str): folder with the files to index.
+        output_path (str): file where the times are written.
+    """
+    results: list[tuple[int, float, float, float, float, bool, bool]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        documents_path = os.path.join(temp_dir, 'documents')
+        shutil.copytree(input_folder, documents_path)
+        index_path, full_index_path = os.path.join(temp_dir, 'index.txt'), os.path.join(temp_dir, 'full_index.txt')
+        text_dict_path, text_post_path = os.path.join(temp_dir, 'token_dict.txt'), os.path.join(temp_dir, 'token_post.txt')
+        dict_path, post_path, weights_path = os.path.join(temp_dir, 'token_dict.bin'), os.path.join(temp_dir, 'token_post.bin'), os.path.join(temp_dir, 'token_weights.bin')
+        segments_path = os.path.join(temp_dir, 'segments')
+        # Index without a manifest, as evidencia_1_times.index leaves it
+        index(output_path=index_path, input_path=documents_path)
+        with open(index_path, 'rb') as file:
+            first_index = file.read()
+        start_time = time.time()
+        update_index(documents_path, index_path)
+        first_time = time.time() - start_time
+        with open(index_path, 'rb') as file:
+            same_first_index = file.read() == first_index
+        start_time = time.time()
+        update_segments(documents_path, segments_path)
+        first_segments_time = time.time() - start_time
+        file_names = sorted(os.listdir(documents_path))
+        generator = random.Random(0)
+        for delta_size in [1, 5, 25, 100]:
+            # Change half of the documents and add the other half as copies with a new name
+            for position, file_name in enumerate(generator.sample(file_names, delta_size)):
+                with open(os.path.join(documents_path, file_name), 'r', encoding='utf-8', errors='replace') as file:
+                    content = file.read()
+                if position % 2 == 0:
+                    with open(os.path.join(documents_path, file_name), 'w', encoding='utf-8') as file:
+                        file.write(content + f"update{delta_size}\n")
+                else:
+                    with open(os.path.join(documents_path, f"{delta_size}_{file_name}"), 'w', encoding='utf-8') as file:
+                        file.write(content)
+            start_time = time.time()
+            update_index(documents_path, index_path)
+            update_time = time.time() - start_time
+            # The same files as actividad_13.prepare_index_files after --update
+            start_time = time.time()
+            generate_main_files(index_path, text_dict_path, text_post_path)
+            convert_index_file(index_path, dict_path, post_path)
+            write_weights_file(dict_path, post_path, weights_path)
+            derived_time = time.time() - start_time
+            start_time = time.time()
+            update_segments(documents_path, segments_path)
+            segments_time = time.time() - start_time
+            start_time = time.time()
+            index(output_path=full_index_path, input_path=documents_path)
+            full_time = time.time() - start_time
+            with open(index_path, 'rb') as file, open(full_index_path, 'rb') as full_file:
+                same_index = file.read() == full_file.read()
+            with QueryEngine(dict_path, post_path) as engine, SegmentedIndex(segments_path) as segmented_index:
+                terms = generator.sample(list(engine.terms()), 500) + [f"update{delta_size}"]
+                same_segments = all(segmented_index.lookup(term) == engine.lookup(term) for term in terms)
+            results.append((delta_size, update_time, derived_time, segments_time, full_time, same_index, same_segments))
+        # A second update without changes must not touch the index
+        with open(index_path, 'rb') as file:
+            last_index = file.read()
+        noop_changes = update_index(documents_path, index_path)
+        with open(index_path, 'rb') as file:
+            noop_update = noop_changes == ([], [], []) and file.read() == last_index
+        noop_update = noop_update and update_segments(documents_path, segments_path) == ([], [], [])
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Primer indice (sin manifiesto): {first_time} sec\tMismo indice: {same_first_index}\tPrimeros segmentos: {first_segments_time} sec\n")
+        for delta_size, update_time, derived_time, segments_time, full_time, same_index, same_segments in results:
+            file.write(f"Docs cambiados: {delta_size}\tActualizacion: {update_time} sec\tArchivos derivados: {derived_time} sec\tTotal: {update_time + derived_time} sec\t"
+                f"Segmentos: {segments_time} sec\tIndice completo: {full_time} sec\tMismo indice: {same_index}\tMismos segmentos: {same_segments}\n")
+        file.write(f"Actualizacion sin cambios: {noop_update}\n")
+
+def compression_benchmark(input_folder: str, output_path: str):
+    """Size and decode throughput of the postings as text, binary records (version 1) and compressed blocks (version 2).
+    Args:
+        input_folder (str): folder with the files to index.
+        output_path (str): file where the results are written.
+    """
+    results: list[tuple[str, int, int, float, float]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = build_query_index(input_folder, temp_dir)
+        results.append(('token_dict.txt + token_post.txt', os.path.getsize(paths['dict']), os.path.getsize(paths['post']), 0., 0.))
+        for version in [1, 2]:
+            dict_path, post_path = os.path.join(temp_dir, f"v{version}.dict"), os.path.join(temp_dir, f"v{version}.post")
+            convert_index_file(paths['index'], dict_path, post_path, version)
+            with QueryEngine(dict_path, post_path) as engine:
+                terms = [(term, len(doc_ids)) for term, doc_ids, _ in engine.iter_terms()]
+                throughputs: list[float] = []
+                for selected_terms in [terms, [(term, posting_count) for term, posting_count in terms if posting_count >= 100]]:
+                    posting_count = sum(count for _, count in selected_terms)
+                    start_time = time.time()
+                    for term, _ in selected_terms:
+                        engine.postings(term)
+                    throughputs.append(posting_count / (time.time() - start_time))
+            results.append((f"binario v{version}", os.path.getsize(dict_path), os.path.getsize(post_path), *throughputs))
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        text_size = results[0][2]
+        for name, dict_size, post_size, all_throughput, common_throughput in results:
+            file.write(f"{name}\tDiccionario: {dict_size} bytes\tPostings: {post_size} bytes\tCompresion: {text_size / post_size:.2f}x")
+            if all_throughput > 0:
+                file.write(f"\tDecodificacion: {all_throughput / 1e6:.2f} M postings/s (terminos con 100+ docs: {common_throughput / 1e6:.2f} M postings/s)")
+            file.write("\n")
+
+def phrase_benchmark(input_folder: str, output_path: str, query_quantity: int = 100, scan_quantity: int = 10):
+    """Phrase queries with the positional index against reading and tokenizing every document.
+    Args:
+        input_folder (str): folder of the alphabetically ordered files, the documents are in the texts folder next to it.
+        output_path (str): file where the times are written.
+        query_quantity (int): phrases searched with the index.
+        scan_quantity (int): phrases searched with the full scan.
+    """
+    texts_folder = os.path.join(os.path.dirname(input_folder), 'texts')
+    file_names = sorted(os.listdir(texts_folder))
+    generator = random.Random(0)
+    phrases: list[list[str]] = []
+    while len(phrases) < query_quantity:
+        tokens = list(tokenize_file(os.path.join(texts_folder, generator.choice(file_names)), 'word_chars'))
+        length = generator.randint(2, 4)
+        if len(tokens) > length:
+            start = generator.randrange(len(tokens) - length)
+            phrases.append(tokens[start:start + length])
+    with tempfile.TemporaryDirectory() as temp_dir:
+        dict_path, post_path, positions_path = os.path.join(temp_dir, 'index.dict'), os.path.join(temp_dir, 'index.post'), os.path.join(temp_dir, 'index.pos')
+        start_time = time.time()
+        build_positional_index(texts_folder, dict_path, post_path, positions_path)
+        build_time = time.time() - start_time
+        with PositionalIndex(dict_path, post_path, positions_path) as positional_index:
+            start_time = time.time()
+            index_results = [positional_index.search_phrase(words) for words in phrases]
+            index_time = (time.time() - start_time) / len(phrases)
+            start_time = time.time()
+            for words in phrases[:scan_quantity]:
+                positional_index.search_near(words[:1], words[-1:], len(words))
+            near_time = (time.time() - start_time) / scan_quantity
+        start_time = time.time()
+        scan_results = [scan_phrase(texts_folder, words) for words in phrases[:scan_quantity]]
+        scan_time = (time.time() - start_time) / scan_quantity
+        positions_size = os.path.getsize(positions_path)
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Indice posicional: {build_time} sec\tPosiciones: {positions_size} bytes\n")
+        file.write(f"Frase con indice: {index_time * 1000:.3f} ms por consulta\tNEAR/k con indice: {near_time * 1000:.3f} ms por consulta\n")
+        file.write(f"Frase leyendo todos los documentos: {scan_time * 1000:.3f} ms por consulta\tMismos resultados: {index_results[:scan_quantity] == scan_results}\n")
+
+def search_word_benchmark(input_folder: str, output_path: str, query_quantity: int = 20):
+    """Latency of actividad_12.search_word with the binary index against the legacy scan of every HTML document,
+    for growing parts of Documents.txt.
+    Args:
+        input_folder (str): folder of the alphabetically ordered files, src is two folders above it.
+        output_path (str): file where the times are written.
+        query_quantity (int): words searched for each part.
+    """
+    main_path = os.path.dirname(os.path.dirname(input_folder))
+    files_path = os.path.join(main_path, 'html')
+    document_rows: list[str] = []
+    with open(os.path.join(main_path, 'Documents.txt'), 'r') as file:
+        document_rows = [row for row in file if row.strip()]
+    words = sorted(set(read_words(input_folder, 20)))
+    queries = random.Random(0).sample(words, query_quantity)
+    results: list[tuple[int, float, float, float]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # The legacy search reads the documents from the html folder next to Documents.txt
+        os.symlink(files_path, os.path.join(temp_dir, 'html'))
+        documents_file = os.path.join(temp_dir, 'Documents.txt')
+        dictionary_file = os.path.join(main_path, 'results/token_dictionary.txt')
+        posting_file = os.path.join(main_path, 'results/token_posting.txt')
+        dict_path, post_path = os.path.join(temp_dir, 'html.dict'), os.path.join(temp_dir, 'html.post')
+        for fraction in [4, 2, 1]:
+            with open(documents_file, 'w') as file:
+                file.writelines(document_rows[:len(document_rows) // fraction])
+            document_ids = read_document_ids(documents_file)
+            start_time = time.time()
+            create_document_index(files_path, documents_file, dict_path, post_path)
+            build_time = time.time() - start_time
+            start_time = time.time()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for word in queries:
+                    legacy_search_word(word, dictionary_file, posting_file, documents_file)
+            scan_time = (time.time() - start_time) / query_quantity
+            with QueryEngine(dict_path, post_path) as engine:
+                start_time = time.time()
+                for word in queries:
+                    search_word(word, engine, document_ids, files_path)
+                index_time = (time.time() - start_time) / query_quantity
+            results.append((len(document_ids), build_time, scan_time, index_time))
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        for document_quantity, build_time, scan_time, index_time in results:
+            file.write(f"Documentos: {document_quantity}\tIndice: {build_time} sec\tBusqueda leyendo los documentos: {scan_time * 1000:.3f} ms\tBusqueda con indice: {index_time * 1000:.3f} ms\n")
+
+def query_cache_benchmark(input_folder: str, output_path: str, query_quantity: int = 5000, distinct_quantity: int = 500):
+    """Skewed query log (Zipf) with the QueryEngine against the CachedQueryEngine for some result cache sizes.
+    Args:
+        input_folder (str): folder with the files to index.
+        output_path (str): file where the times are written.
+        query_quantity (int): queries of the log.
+        distinct_quantity (int): different token combinations of the log.
+    """
+    results: list[tuple[str, float, dict[str, any]]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = build_query_index(input_folder, temp_dir)
+        words = [word for word, _ in read_index_groups(paths['index'])]
+        generator = random.Random(0)
+        distinct_queries = [generator.sample(words, generator.randint(1, 3)) for _ in range(distinct_quantity)]
+        weights = [1 / (rank + 1) for rank in range(distinct_quantity)]
+        queries = generator.choices(distinct_queries, weights=weights, k=query_quantity)
+
+        with QueryEngine(paths['binary_dict'], paths['binary_post']) as engine:
+            start_time = time.time()
+            expected = [engine.search(query) for query in queries]
+            results.append(("Sin cache", (time.time() - start_time) / query_quantity, None))
+        for result_cache_size in [16, 64, 256]:
+            with CachedQueryEngine(paths['binary_dict'], paths['binary_post'], get_generation_path(paths['dict']), result_cache_size) as engine:
+                start_time = time.time()
+                same_results = [engine.search(query) for query in queries] == expected
+                results.append((f"Cache de {result_cache_size} resultados", (time.time() - start_time) / query_quantity, { **engine.cache_stats(), 'same': same_results }))
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"Busquedas: {query_quantity}\tDistintas: {distinct_quantity}\n")
+        for name, query_time, stats in results:
+            file.write(f"{name}\tTiempo por busqueda: {query_time * 1e6:.1f} us")
+            if stats != None:
+                result_stats, posting_stats = stats['results'], stats['postings']
+                file.write(f"\tAciertos resultados: {result_stats['hits'] / (result_stats['hits'] + result_stats['misses']):.1%}\tAciertos postings: {posting_stats['hits'] / max(posting_stats['hits'] + posting_stats['misses'], 1):.1%}\tMismos resultados: {stats['same']}")
+            file.write("\n")
+
+def legacy_generate_main_files(input_index_path: str, output_dict_path: str, output_post_path: str):
+    """actividad_13.generate_main_files as it was: the whole index in memory and the outputs built with +=."""
+    with open(input_index_path, 'r', encoding='utf-8', errors='replace') as file:
+        content = file.read()
+    content_rows = content.split("\n")
+    actual_word = None
+    file_quantity = 0
+    posting_id = 0
+    dict_hashtable = hashtable[str, dict[str, int]](73369, sha1_hash)
+    post_content = ""
+    for row in content_rows:
+        row_data = row.split(";")
+        if (len(row_data) < 3):
+            continue
+        if row_data[0] != actual_word and actual_word != None:
+            dict_hashtable.add(actual_word, { 'file_quantity': file_quantity, 'posting_id': posting_id })
+            posting_id += file_quantity
+            file_quantity = 0
+        actual_word = row_data[0]
+        file_quantity += 1
+        post_content += f"{row_data[1]};{row_data[2]}\n"
+    dict_hashtable.add(actual_word, { 'file_quantity': file_quantity, 'posting_id': posting_id })
+    text = ""
+    for index, bucket in enumerate(dict_hashtable.data):
+        text += f"Index{index}$%i"
+        for key in list(bucket.keys()):
+            text += f"{key}$%g{bucket[key]}$%c"
+        text += "\n"
+    with open(output_dict_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(text)
+    with open(output_post_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(post_content)
+
+def streaming_benchmark(input_folder: str, output_path: str):
+    """Time and peak memory of the streaming generate_main_files against the old one, for the index of the corpus
+    and for an index with every document repeated.
+    Args:
+        input_folder (str): folder with the files to index.
+        output_path (str): file where the results are written.
+    """
+    results: list[tuple[int, str, float, int, bool]] = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        index_path = os.path.join(temp_dir, 'indexed_tokens.txt')
+        index(output_path=index_path, input_path=input_folder)
+        for factor in [1, 4]:
+            factor_index_path = os.path.join(temp_dir, f"indexed_tokens_{factor}.txt")
+            with open(index_path, 'r', encoding='utf-8', errors='replace') as file, open(factor_index_path, 'w', encoding='utf-8') as factor_file:
+                for row in file:
+                    word, file_name, frec = row.rstrip('\n').split(';')
+                    factor_file.writelines(f"{word};{file_name}#{copy};{frec}\n" for copy in range(factor))
+            outputs: list[bytes] = []
+            for name, generate in [('legacy', legacy_generate_main_files), ('streaming', generate_main_files)]:
+                dict_path, post_path = os.path.join(temp_dir, f"{name}_dict.txt"), os.path.join(temp_dir, f"{name}_post.txt")
+                tracemalloc.start()
+                start_time = time.time()
+                generate(factor_index_path, dict_path, post_path)
+                total_time = time.time() - start_time
+                _, peak_memory = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                with open(dict_path, 'rb') as dict_file, open(post_path, 'rb') as post_file:
+                    outputs.append(dict_file.read() + post_file.read())
+                results.append((factor, name, total_time, peak_memory, outputs[0] == outputs[-1]))
+            results.append((factor, 'indexed_tokens.txt', 0., os.path.getsize(factor_index_path), True))
+
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        for factor, name, total_time, peak_memory, same_output in results:
+            if name == 'indexed_tokens.txt':
+                file.write(f"Copias: {factor}\t{name}: {peak_memory} bytes\n")
+            else:
+                file.write(f"Copias: {factor}\t{name}\tTiempo: {total_time} sec\tMemoria maxima: {peak_memory} bytes\tMisma salida: {same_output}\n")
+
+
+def main():
+    benchmarks = {
+        'hashtable': hashtable_benchmark,
+        'memory': memory_benchmark,
+        'word_count': word_count_benchmark,
+        'workers': workers_benchmark,
+        'postings_memory': postings_memory_benchmark,
+        'query_engine': query_engine_benchmark,
+        'top_k': top_k_benchmark,
+        'scoring': scoring_benchmark,
+        'incremental': incremental_benchmark,
+        'compression': compression_benchmark,
+        'phrase': phrase_benchmark,
+        'search_word': search_word_benchmark,
+        'query_cache': query_cache_benchmark,
+        'streaming': streaming_benchmark,
+    }
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Run a benchmark and store its times in src/results/times')
+    parser.add_argument('benchmark', type=str, choices=list(benchmarks.keys()), help='Benchmark to run')
+    args = parser.parse_args()
+
+    # Get paths
+    main_path = os.getcwd()
+    input_folder = os.path.join(main_path, 'src/results/alphabetically')
+    output_path = os.path.join(main_path, f'src/results/times/bench_{args.benchmark}.txt')
+
+    benchmarks[args.benchmark](input_folder, output_path)
+    with open(output_path, 'r', encoding='utf-8', errors='replace') as file:
+        print(file.read())
+
+if __name__ == "__main__":
+    main()
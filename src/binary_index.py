@@ -0,0 +1,495 @@
+import argparse
+import ast
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import accumulate, islice
+from typing import Iterable, Iterator
+from HashTable import crc32_hash
+
+# Dictionary file: header, hashed term directory, term strings and document names
+DICT_MAGIC = b'AIDX'
+DICT_HEADER = struct.Struct('<4sHHIIIIII') # magic, version, build tag, table size, term count, doc count, directory, strings and documents offsets
+DIRECTORY_ENTRY = struct.Struct('<IIIIII') # term hash, string offset, string length, posting offset, posting count, max frec
+DIRECTORY_ENTRY_V2 = struct.Struct('<IIIIIII') # the same fields and the byte offset of the postings
+# Postings file: header and the postings of each term, contiguous and sorted by doc id
+# Version 1: (doc id, frec) records. Version 2: blocks of BLOCK_SIZE postings, each one with a flags byte, the doc id
+# deltas and the frecs as varints. Terms with more than one block start with a skip table (last doc id and byte length
+# of each block). The flags mark the sections where every value takes one byte, they are read without decoding.
+POST_MAGIC = b'APST'
+POST_HEADER = struct.Struct('<4sHHI') # magic, version, build tag, posting count
+POSTING_RECORD = struct.Struct('<II')
+SKIP_ENTRY = struct.Struct('<II') # last doc id, block bytes
+BLOCK_SIZE = 128
+SINGLE_BYTE_DOCS = 1 # Block flags
+SINGLE_BYTE_FRECS = 2
+MAX_VARINT_BYTES = 5
+VERSION = 2 # Version of the files that are written
+SUPPORTED_VERSIONS = (1, 2)
+# The dict and post files of one build have the same build tag, a reader that opens them while they are replaced
+# (one file of each build) opens them again
+OPEN_ATTEMPTS = 100
+OPEN_RETRY_DELAY = 0.01
+# Weights file: header, length of each document and the TF-IDF and BM25 weight of each posting (posting offset order)
+WEIGHTS_MAGIC = b'AWGT'
+WEIGHTS_VERSION = 1
+WEIGHTS_HEADER = struct.Struct('<4sHHIIdff') # magic, version, build tag of the index, doc count, posting count, average doc length, k1, b
+
+def get_term_hash(term: str) -> int:
+    return crc32_hash(term)
+
+def get_directory_entry(version: int) -> struct.Struct:
+    return DIRECTORY_ENTRY if version == 1 else DIRECTORY_ENTRY_V2
+
+def encode_varints(values: list[int]) -> bytes:
+    """Encode integers with 7 bits per byte, the high bit marks that more bytes follow."""
+    if max(values, default=0) < 128:
+        return bytes(values) # Every value fits in one byte
+    encoded = bytearray()
+    for value in values:
+        while value >= 128:
+            encoded.append((value & 127) | 128)
+            value >>= 7
+        encoded.append(value)
+    return bytes(encoded)
+
+def decode_varints(buffer: bytes, start: int, count: int, single_byte: bool) -> tuple[Iterable[int], int]:
+    """Decode count varints from buffer[start].
+    Returns:
+        tuple[Iterable[int], int]: the values and the position after the last one.
+    """
+    if single_byte:
+        return buffer[start:start + count], start + count # Fast path, the bytes are the values
+    values: list[int] = []
+    value, shift = 0, 0
+    position = start
+    for byte in buffer[start:start + count * MAX_VARINT_BYTES]:
+        position += 1
+        value |= (byte & 127) << shift
+        if byte & 128:
+            shift += 7
+        else:
+            values.append(value)
+            if len(values) == count:
+                break
+            value, shift = 0, 0
+    return values, position
+
+def encode_postings(postings: list[tuple[int, int]]) -> bytes:
+    """Encode the postings of a term (version 2).
+    Args:
+        postings (list[tuple[int, int]]): (doc id, frec) sorted by doc id.
+    Returns:
+        bytes: the skip table (only with more than one block) and the blocks.
+    """
+    skip_table = bytearray()
+    blocks = bytearray()
+    previous_doc_id = 0
+    for start in range(0, len(postings), BLOCK_SIZE):
+        block = postings[start:start + BLOCK_SIZE]
+        deltas: list[int] = []
+        for doc_id, _ in block:
+            deltas.append(doc_id - previous_doc_id)
+            previous_doc_id = doc_id
+        doc_bytes = encode_varints(deltas)
+        frec_bytes = encode_varints([frec for _, frec in block])
+        flags = (SINGLE_BYTE_DOCS if len(doc_bytes) == len(block) else 0) | (SINGLE_BYTE_FRECS if len(frec_bytes) == len(block) else 0)
+        skip_table += SKIP_ENTRY.pack(previous_doc_id, 1 + len(doc_bytes) + len(frec_bytes))
+        blocks.append(flags)
+        blocks += doc_bytes
+        blocks += frec_bytes
+    if len(postings) <= BLOCK_SIZE:
+        return bytes(blocks)
+    return bytes(skip_table + blocks)
+
+def get_skip_table(buffer: bytes, byte_offset: int, posting_count: int) -> list[tuple[int, int, int]]:
+    """Read the skip table of a term (version 2).
+    Returns:
+        list[tuple[int, int, int]]: last doc id (None if the term has only one block), byte offset and posting count of each block.
+    """
+    if posting_count <= BLOCK_SIZE:
+        return [(None, byte_offset, posting_count)]
+    block_count = (posting_count + BLOCK_SIZE - 1) // BLOCK_SIZE
+    position = byte_offset + block_count * SKIP_ENTRY.size
+    skip_table: list[tuple[int, int, int]] = []
+    for block, (last_doc_id, block_length) in enumerate(SKIP_ENTRY.iter_unpack(buffer[byte_offset:position])):
+        skip_table.append((last_doc_id, position, min(BLOCK_SIZE, posting_count - block * BLOCK_SIZE)))
+        position += block_length
+    return skip_table
+
+def decode_block(buffer: bytes, position: int, count: int, previous_doc_id: int) -> tuple[Iterable[int], Iterable[int]]:
+    """Decode one block of a term (version 2).
+    Args:
+        buffer (bytes): content of the postings file.
+        position (int): byte offset of the block.
+        count (int): postings of the block.
+        previous_doc_id (int): last doc id of the previous block, 0 for the first one.
+    Returns:
+        tuple[Iterable[int], Iterable[int]]: doc ids and frecs of the block.
+    """
+    flags = buffer[position]
+    deltas, position = decode_varints(buffer, position + 1, count, flags & SINGLE_BYTE_DOCS)
+    frecs, _ = decode_varints(buffer, position, count, flags & SINGLE_BYTE_FRECS)
+    return islice(accumulate(deltas, initial=previous_doc_id), 1, None), frecs
+
+def decode_postings(buffer: bytes, byte_offset: int, posting_count: int) -> tuple[array, array]:
+    """Decode every posting of a term (version 2), block by block.
+    Args:
+        buffer (bytes): content of the postings file.
+        byte_offset (int): byte offset of the postings of the term.
+        posting_count (int): postings of the term.
+    Returns:
+        tuple[array, array]: doc ids and frecs.
+    """
+    doc_ids, frecs = array('I'), array('I')
+    previous_doc_id = 0
+    for last_doc_id, position, count in get_skip_table(buffer, byte_offset, posting_count):
+        block_doc_ids, block_frecs = decode_block(buffer, position, count, previous_doc_id)
+        doc_ids.extend(block_doc_ids)
+        frecs.extend(block_frecs)
+        previous_doc_id = last_doc_id
+    return doc_ids, frecs
+
+def read_postings(buffer: bytes, version: int, posting_offset: int, posting_count: int, byte_offset: int) -> tuple[array, array]:
+    """Read the postings of a term of a postings file of any version.
+    Args:
+        buffer (bytes): content of the postings file (bytes or mmap).
+        version (int): version of the file.
+        posting_offset (int): posting offset of the directory entry.
+        posting_count (int): postings of the term.
+        byte_offset (int): byte offset of the directory entry (version 2).
+    Returns:
+        tuple[array, array]: doc ids and frecs.
+    """
+    if version != 1:
+        return decode_postings(buffer, byte_offset, posting_count)
+    start = POST_HEADER.size + posting_offset * POSTING_RECORD.size
+    records = array('I')
+    records.frombytes(buffer[start:start + posting_count * POSTING_RECORD.size])
+    if sys.byteorder == 'big':
+        records.byteswap()
+    return records[0::2], records[1::2]
+
+def get_build_tag(dict_path: str) -> int:
+    """Get the build tag of a new index, different from the one of the dictionary it replaces (1 to 65535)."""
+    try:
+        with open(dict_path, 'rb') as file:
+            header = file.read(DICT_HEADER.size)
+    except FileNotFoundError:
+        return 1
+    if len(header) < DICT_HEADER.size or header[:4] != DICT_MAGIC:
+        return 1
+    return DICT_HEADER.unpack(header)[2] % 65535 + 1
+
+def write_binary_index(terms_postings: Iterable[tuple[str, list[tuple[int, int]]]], document_names: list[str], dict_path: str, post_path: str, version: int = VERSION) -> int:
+    """Write the binary dictionary and postings files.
+    Args:
+        terms_postings (Iterable[tuple[str, list[tuple[int, int]]]]): each term with its (doc id, frec) postings, every term only once.
+        document_names (list[str]): name of each doc id.
+        dict_path (str): path of the dictionary file.
+        post_path (str): path of the postings file.
+        version (int): 1 for fixed size records, 2 for compressed blocks.
+    Returns:
+        int: the build tag written in both headers.
+    """
+    if not version in SUPPORTED_VERSIONS:
+        raise Exception(f'Unknown binary index version {version}')
+    build_tag = get_build_tag(dict_path)
+    directory_entry = get_directory_entry(version)
+    entries: list[tuple[int, ...]] = []
+    strings = bytearray()
+    posting_count = 0
+    byte_offset = POST_HEADER.size
+    # The files are written with a temporary name and replaced at the end, so the readers that have the old
+    # files mapped keep reading them
+    with open(f"{post_path}.tmp", 'wb') as post_file:
+        post_file.write(POST_HEADER.pack(POST_MAGIC, version, build_tag, 0))
+        for term, postings in terms_postings:
+            postings = sorted(postings)
+            term_bytes = term.encode('utf-8')
+            entry = (get_term_hash(term), len(strings), len(term_bytes), posting_count, len(postings), max(frec for _, frec in postings))
+            strings += term_bytes
+            if version == 1:
+                records = array('I')
+                for doc_id, frec in postings:
+                    records.append(doc_id)
+                    records.append(frec)
+                if sys.byteorder == 'big':
+                    records.byteswap()
+                content = records.tobytes()
+            else:
+                entry += (byte_offset,)
+                content = encode_postings(postings)
+            entries.append(entry)
+            post_file.write(content)
+            byte_offset += len(content)
+            posting_count += len(postings)
+        post_file.seek(0)
+        post_file.write(POST_HEADER.pack(POST_MAGIC, version, build_tag, posting_count))
+
+    # Open addressing with linear probing, load factor of 2/3
+    table_size = max(len(entries) * 3 // 2 + 1, 8)
+    directory = bytearray(table_size * directory_entry.size)
+    used = bytearray(table_size)
+    for entry in entries:
+        slot = entry[0] % table_size
+        while used[slot]:
+            slot = (slot + 1) % table_size
+        used[slot] = 1
+        directory_entry.pack_into(directory, slot * directory_entry.size, *entry)
+
+    documents = '\n'.join(document_names).encode('utf-8')
+    directory_offset = DICT_HEADER.size
+    strings_offset = directory_offset + len(directory)
+    documents_offset = strings_offset + len(strings)
+    with open(f"{dict_path}.tmp", 'wb') as dict_file:
+        dict_file.write(DICT_HEADER.pack(DICT_MAGIC, version, build_tag, table_size, len(entries), len(document_names), directory_offset, strings_offset, documents_offset))
+        dict_file.write(directory)
+        dict_file.write(strings)
+        dict_file.write(documents)
+    os.replace(f"{post_path}.tmp", post_path)
+    os.replace(f"{dict_path}.tmp", dict_path)
+    return build_tag
+
+def read_index_groups(index_path: str) -> Iterator[tuple[str, list[tuple[str, int]]]]:
+    """Read a word;file;frec index grouped by word.
+    Args:
+        index_path (str): path of the index (indexed_tokens.txt).
+    Returns:
+        Iterator[tuple[str, list[tuple[str, int]]]]: each word with its (file, frec) postings.
+    """
+    actual_word = None
+    postings: list[tuple[str, int]] = []
+    with open(index_path, 'r', encoding='utf-8', errors='replace') as file:
+        for row in file:
+            row_data = row.rstrip('\n').split(';')
+            if len(row_data) < 3:
+                continue
+            if row_data[0] != actual_word:
+                if actual_word != None:
+                    yield actual_word, postings
+                actual_word = row_data[0]
+                postings = []
+            postings.append((row_data[1], int(row_data[2])))
+    if actual_word != None:
+        yield actual_word, postings
+
+def convert_index_file(index_path: str, dict_path: str, post_path: str, version: int = VERSION):
+    """Build the binary index from the word;file;frec index (two streaming passes).
+    Args:
+        index_path (str): path of the index (indexed_tokens.txt).
+        dict_path (str): path of the binary dictionary.
+        post_path (str): path of the binary postings.
+        version (int): version of the binary files.
+    """
+    document_names = sorted({file_name for _, postings in read_index_groups(index_path) for file_name, _ in postings})
+    document_ids = {name: doc_id for doc_id, name in enumerate(document_names)}
+    terms_postings = ((word, [(document_ids[file_name], frec) for file_name, frec in postings]) for word, postings in read_index_groups(index_path))
+    write_binary_index(terms_postings, document_names, dict_path, post_path, version)
+
+def convert_text_files(text_dict_path: str, text_post_path: str, dict_path: str, post_path: str, version: int = VERSION):
+    """Build the binary index from the token_dict.txt and token_post.txt files of actividad_13.
+    Args:
+        text_dict_path (str): path of token_dict.txt.
+        text_post_path (str): path of token_post.txt.
+        dict_path (str): path of the binary dictionary.
+        post_path (str): path of the binary postings.
+        version (int): version of the binary files.
+    """
+    terms: list[tuple[int, int, str]] = [] # posting id, file quantity and term
+    with open(text_dict_path, 'r', encoding='utf-8', errors='replace') as file:
+        for row in file:
+            row_data = row.rstrip('\n').split("$%i")
+            if len(row_data) < 2: continue
+            for record in row_data[1].split("$%c"):
+                if not "$%g" in record: continue
+                term, data = record.split("$%g")
+                dict_data = ast.literal_eval(data)
+                terms.append((dict_data['posting_id'], dict_data['file_quantity'], term))
+    terms.sort()
+    with open(text_post_path, 'r', encoding='utf-8', errors='replace') as file:
+        posting_rows = [row.rstrip('\n').split(';') for row in file]
+    document_names = sorted({row[0] for row in posting_rows if len(row) >= 2})
+    document_ids = {name: doc_id for doc_id, name in enumerate(document_names)}
+    terms_postings = ((term, [(document_ids[row[0]], int(row[1])) for row in posting_rows[posting_id:posting_id + file_quantity]]) for posting_id, file_quantity, term in terms)
+    write_binary_index(terms_postings, document_names, dict_path, post_path, version)
+
+def write_weights_file(dict_path: str, post_path: str, weights_path: str, doc_lengths: list[int] = None, k1: float = 1.2, b: float = 0.75):
+    """Precompute the document lengths, the IDF of each term and the weight of each posting.
+    TF-IDF weight: frec / doc length * log(N / df). BM25 weight: idf * frec * (k1 + 1) / (frec + k1 * (1 - b + b * doc length / avg length)).
+    Args:
+        dict_path (str): path of the binary dictionary.
+        post_path (str): path of the binary postings.
+        weights_path (str): path of the weights file.
+        doc_lengths (list[int]): token count of each doc id, the sum of its frecs is used if it is None.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalization.
+    """
+    with open(dict_path, 'rb') as file:
+        dict_content = file.read()
+    with open(post_path, 'rb') as file:
+        post_content = file.read()
+    _, version, build_tag, table_size, _, doc_count, directory_offset, _, _ = DICT_HEADER.unpack_from(dict_content, 0)
+    _, _, _, posting_count = POST_HEADER.unpack_from(post_content, 0)
+    directory_entry = get_directory_entry(version)
+    # Directory entries and postings in posting offset order
+    terms: list[tuple[int, int, int]] = []
+    for slot in range(table_size):
+        entry = directory_entry.unpack_from(dict_content, directory_offset + slot * directory_entry.size)
+        if entry[4] > 0:
+            terms.append((entry[3], entry[4], entry[6] if version != 1 else 0))
+    terms.sort()
+    doc_ids, frecs = array('I'), array('I')
+    for posting_offset, term_posting_count, byte_offset in terms:
+        term_doc_ids, term_frecs = read_postings(post_content, version, posting_offset, term_posting_count, byte_offset)
+        doc_ids.extend(term_doc_ids)
+        frecs.extend(term_frecs)
+    if doc_lengths == None:
+        doc_lengths = array('I', bytes(4 * doc_count))
+        for doc_id, frec in zip(doc_ids, frecs):
+            doc_lengths[doc_id] += frec
+    else:
+        doc_lengths = array('I', doc_lengths)
+    average_length = sum(doc_lengths) / doc_count if doc_count > 0 else 0.
+
+    tfidf_weights = array('f', bytes(4 * posting_count))
+    bm25_weights = array('f', bytes(4 * posting_count))
+    for posting_offset, term_posting_count, _ in terms:
+        tfidf_idf = math.log(doc_count / term_posting_count)
+        bm25_idf = math.log(1 + (doc_count - term_posting_count + 0.5) / (term_posting_count + 0.5))
+        for position in range(posting_offset, posting_offset + term_posting_count):
+            frec, doc_length = frecs[position], max(doc_lengths[doc_ids[position]], 1)
+            tfidf_weights[position] = frec / doc_length * tfidf_idf
+            bm25_weights[position] = bm25_idf * frec * (k1 + 1) / (frec + k1 * (1 - b + b * doc_length / average_length))
+
+    if sys.byteorder == 'big':
+        for column in (doc_lengths, tfidf_weights, bm25_weights):
+            column.byteswap()
+    with open(f"{weights_path}.tmp", 'wb') as file:
+        file.write(WEIGHTS_HEADER.pack(WEIGHTS_MAGIC, WEIGHTS_VERSION, build_tag, doc_count, posting_count, average_length, k1, b))
+        file.write(doc_lengths.tobytes())
+        file.write(tfidf_weights.tobytes())
+        file.write(bm25_weights.tobytes())
+    os.replace(f"{weights_path}.tmp", weights_path)
+
+class BinaryIndex:
+    """Reader of the binary index. The files are opened with mmap, each lookup reads one directory entry (plus
+    collisions), the term and its postings. QueryEngine adds the searches on top of it.
+    """
+    dict_map: mmap.mmap
+    post_map: mmap.mmap
+    table_size: int
+    term_count: int
+    directory_offset: int
+    strings_offset: int
+    document_names: list[str]
+    version: int
+    build_tag: int
+    directory_entry: struct.Struct
+
+    def __init__(self, dict_path: str, post_path: str) -> None:
+        for _ in range(OPEN_ATTEMPTS):
+            with open(dict_path, 'rb') as dict_file:
+                self.dict_map = mmap.mmap(dict_file.fileno(), 0, access=mmap.ACCESS_READ)
+            with open(post_path, 'rb') as post_file:
+                self.post_map = mmap.mmap(post_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, self.version, self.build_tag, self.table_size, self.term_count, doc_count, self.directory_offset, self.strings_offset, documents_offset = DICT_HEADER.unpack_from(self.dict_map, 0)
+            post_magic, post_version, post_build_tag, _ = POST_HEADER.unpack_from(self.post_map, 0)
+            if post_build_tag == self.build_tag or magic != DICT_MAGIC or post_magic != POST_MAGIC:
+                break
+            # The files are being replaced, the new dictionary comes right after the new postings
+            self.dict_map.close()
+            self.post_map.close()
+            time.sleep(OPEN_RETRY_DELAY)
+        else:
+            raise Exception(f'{dict_path} and {post_path} are not from the same build')
+        if magic != DICT_MAGIC or not self.version in SUPPORTED_VERSIONS:
+            raise Exception(f'{dict_path} is not a binary dictionary')
+        if post_magic != POST_MAGIC or post_version != self.version:
+            raise Exception(f'{post_path} is not a binary postings file of the same version')
+        self.directory_entry = get_directory_entry(self.version)
+        self.document_names = self.dict_map[documents_offset:].decode('utf-8').split('\n') if doc_count > 0 else []
+
+    def find_term(self, term: str) -> tuple[int, int, int, int]:
+        """Find a term in the directory.
+        Args:
+            term (str): the term to find.
+        Returns:
+            tuple[int, int, int, int]: posting offset, posting count, max frec and byte offset (version 2) of the term, None if it is not in the index.
+        """
+        if self.term_count == 0:
+            return None
+        term_hash = get_term_hash(term)
+        term_bytes = term.encode('utf-8')
+        slot = term_hash % self.table_size
+        while True:
+            entry = self.directory_entry.unpack_from(self.dict_map, self.directory_offset + slot * self.directory_entry.size)
+            entry_hash, string_offset, string_length, posting_offset, posting_count, max_frec = entry[:6]
+            if posting_count == 0:
+                return None
+            if entry_hash == term_hash and string_length == len(term_bytes):
+                string_start = self.strings_offset + string_offset
+                if self.dict_map[string_start:string_start + string_length] == term_bytes:
+                    return posting_offset, posting_count, max_frec, entry[6] if self.version != 1 else 0
+            slot = (slot + 1) % self.table_size
+
+    def postings(self, term: str) -> tuple[array, array]:
+        """Get the postings of a term.
+        Args:
+            term (str): the term to find.
+        Returns:
+            tuple[array, array]: doc ids (sorted) and frecs of the term, both empty if it is not in the index.
+        """
+        term_data = self.find_term(term)
+        if term_data == None:
+            return array('I'), array('I')
+        posting_offset, posting_count, _, byte_offset = term_data
+        return read_postings(self.post_map, self.version, posting_offset, posting_count, byte_offset)
+
+    def lookup(self, term: str) -> list[dict[str, any]]:
+        """Get the files of a term, with the same format as actividad_13.get_dict_data.
+        Args:
+            term (str): the term to find.
+        Returns:
+            list[dict[str, any]]: name and quant of each file of the term.
+        """
+        doc_ids, frecs = self.postings(term)
+        return [{ "name": self.document_names[doc_id], "quant": frec } for doc_id, frec in zip(doc_ids, frecs)]
+
+    def close(self):
+        self.dict_map.close()
+        self.post_map.close()
+
+    def __enter__(self) -> 'BinaryIndex':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Convert the text index files to the binary index format')
+    parser.add_argument('source', type=str, help='Input format (index|text)')
+    parser.add_argument('inputs', nargs='+', type=str, help='indexed_tokens.txt for index, token_dict.txt and token_post.txt for text')
+    parser.add_argument('--dict', type=str, default=os.path.join(os.getcwd(), 'src/results/data/token_dict.bin'), help='Output dictionary file')
+    parser.add_argument('--post', type=str, default=os.path.join(os.getcwd(), 'src/results/data/token_post.bin'), help='Output postings file')
+    parser.add_argument('--weights', type=str, default=None, help='Also write the TF-IDF and BM25 weights file')
+    parser.add_argument('--version', type=int, default=VERSION, help='1 for fixed size posting records, 2 for compressed blocks')
+    args = parser.parse_args()
+
+    if args.source == 'index' and len(args.inputs) == 1:
+        convert_index_file(args.inputs[0], args.dict, args.post, args.version)
+    elif args.source == 'text' and len(args.inputs) == 2:
+        convert_text_files(args.inputs[0], args.inputs[1], args.dict, args.post, args.version)
+    else:
+        raise Exception('Use "index indexed_tokens.txt" or "text token_dict.txt token_post.txt"')
+    if args.weights != None:
+        write_weights_file(args.dict, args.post, args.weights)
+
+if __name__ == "__main__":
+    main()
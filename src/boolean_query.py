@@ -0,0 +1,148 @@
+import argparse
+import heapq
+import os
+import re
+from query_engine import QueryEngine, intersect
+
+QUERY_TOKEN_PATTERN = re.compile(r'\(|\)|[^\s()]+')
+OPERATORS = ('AND', 'OR', 'NOT')
+
+# Query tree: ('term', word), ('and', [nodes]), ('or', [nodes]), ('not', node)
+
+def parse_query(query: str) -> tuple:
+    """Parse a boolean query. NOT binds first, then AND, then OR. Terms without an operator between them are
+    joined with AND. Operators have to be uppercase, lowercase and, or, not are searched as words.
+    Args:
+        query (str): the query, for example "casa AND (perro OR gato) NOT raton".
+    Returns:
+        tuple: the query tree.
+    """
+    tokens = QUERY_TOKEN_PATTERN.findall(query)
+    position = 0
+
+    def peek() -> str:
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or() -> tuple:
+        nonlocal position
+        children = [parse_and()]
+        while peek() == 'OR':
+            position += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ('or', children)
+
+    def parse_and() -> tuple:
+        nonlocal position
+        children = [parse_not()]
+        while peek() != None and peek() != 'OR' and peek() != ')':
+            if peek() == 'AND':
+                position += 1
+            children.append(parse_not())
+        return children[0] if len(children) == 1 else ('and', children)
+
+    def parse_not() -> tuple:
+        nonlocal position
+        if peek() == 'NOT':
+            position += 1
+            return ('not', parse_not())
+        return parse_primary()
+
+    def parse_primary() -> tuple:
+        nonlocal position
+        token = peek()
+        if token == None:
+            raise Exception('The query ended before a term')
+        position += 1
+        if token == '(':
+            node = parse_or()
+            if peek() != ')':
+                raise Exception('Missing ")" in the query')
+            position += 1
+            return node
+        if token == ')' or token in OPERATORS:
+            raise Exception(f'Unexpected "{token}" in the query')
+        return ('term', token)
+
+    if not tokens:
+        raise Exception('The query is empty')
+    node = parse_or()
+    if position < len(tokens):
+        raise Exception(f'Unexpected "{tokens[position]}" in the query')
+    return node
+
+def estimate_size(engine: QueryEngine, node: tuple) -> int:
+    """Upper bound of the number of documents of a node, used to evaluate the rarest operands first."""
+    if node[0] == 'term':
+        term_data = engine.find_term(node[1])
+        return term_data[1] if term_data != None else 0
+    if node[0] == 'and':
+        return min(estimate_size(engine, child) for child in node[1])
+    if node[0] == 'or':
+        return sum(estimate_size(engine, child) for child in node[1])
+    return len(engine.document_names) - estimate_size(engine, node[1])
+
+def difference(doc_ids: list[int], removed_doc_ids: list[int]) -> list[int]:
+    removed = set(removed_doc_ids)
+    return [doc_id for doc_id in doc_ids if not doc_id in removed]
+
+def evaluate(engine: QueryEngine, node: tuple) -> list[int]:
+    """Get the sorted doc ids that match a query tree.
+    Conjunctions start from the rarest operand and filter it with the other ones, so the work depends on the
+    rarest list and not on the frequent ones.
+    Args:
+        engine (QueryEngine): engine of the index.
+        node (tuple): query tree.
+    Returns:
+        list[int]: the matching doc ids.
+    """
+    if node[0] == 'term':
+        return list(engine.postings(node[1])[0])
+    if node[0] == 'or':
+        return list(dict.fromkeys(heapq.merge(*(evaluate(engine, child) for child in node[1]))))
+    if node[0] == 'not':
+        return difference(list(range(len(engine.document_names))), evaluate(engine, node[1]))
+    positive = sorted((child for child in node[1] if child[0] != 'not'), key=lambda child: estimate_size(engine, child))
+    negative = [child[1] for child in node[1] if child[0] == 'not']
+    if positive:
+        doc_ids = evaluate(engine, positive[0])
+        for child in positive[1:]:
+            if not doc_ids:
+                break
+            if child[0] == 'term':
+                doc_ids = engine.filter_documents(child[1], doc_ids)
+            else:
+                doc_ids = intersect(doc_ids, evaluate(engine, child))
+    else:
+        doc_ids = list(range(len(engine.document_names)))
+    for child in negative:
+        if not doc_ids:
+            break
+        doc_ids = difference(doc_ids, evaluate(engine, child))
+    return doc_ids
+
+def search_boolean(engine: QueryEngine, query: str) -> list[str]:
+    """Get the files that match a boolean query.
+    Args:
+        engine (QueryEngine): engine of the index.
+        query (str): the query.
+    Returns:
+        list[str]: the file names, sorted.
+    """
+    return [engine.document_names[doc_id] for doc_id in evaluate(engine, parse_query(query))]
+
+
+def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Search the files that match a boolean query (AND, OR, NOT and parentheses)')
+    parser.add_argument('query', nargs='+', type=str, help='Query, for example: casa AND ( perro OR gato ) NOT raton')
+    parser.add_argument('--dict', type=str, default=os.path.join(os.getcwd(), 'src/results/data/token_dict.bin'), help='Binary dictionary')
+    parser.add_argument('--post', type=str, default=os.path.join(os.getcwd(), 'src/results/data/token_post.bin'), help='Binary postings')
+    args = parser.parse_args()
+
+    with QueryEngine(args.dict, args.post) as engine:
+        file_names = search_boolean(engine, ' '.join(args.query))
+    for index, file_name in enumerate(file_names):
+        print(f"{index + 1}. {file_name}")
+
+if __name__ == "__main__":
+    main()
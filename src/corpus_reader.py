@@ -0,0 +1,97 @@
+import mmap
+import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterator
+
+def read_document(file_path: str, mode: str = 'text', encoding: str = 'utf-8', errors: str = 'replace') -> any:
+    """Read a whole document.
+    Args:
+        file_path (str): path of the document.
+        mode (str): 'text' for str, 'bytes' for bytes, 'mmap' for a read only mmap of the file (bytes interface).
+        encoding (str): encoding of the text mode.
+        errors (str): decoding errors of the text mode.
+    Returns:
+        any: the content of the document.
+    """
+    if mode == 'text':
+        with open(file_path, 'r', encoding=encoding, errors=errors) as file:
+            return file.read()
+    if mode == 'bytes':
+        with open(file_path, 'rb') as file:
+            return file.read()
+    if mode == 'mmap':
+        with open(file_path, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b'' # Empty files can't be mapped
+            content = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(content, 'madvise') and hasattr(mmap, 'MADV_WILLNEED'):
+            content.madvise(mmap.MADV_WILLNEED) # Ask the kernel to load the pages before they are used
+        return content
+    raise Exception('The mode has to be text, bytes or mmap')
+
+def close_content(future: Future):
+    """Close the mmap read by a future that was not used, it runs when the future is done."""
+    if not future.cancelled() and future.exception() == None and isinstance(future.result(), mmap.mmap):
+        future.result().close()
+
+class CorpusReader:
+    """Read the documents of a corpus in order while a thread pool reads the next ones.
+    At most prefetch documents are read ahead, so the memory used depends on the prefetch depth and not on the
+    corpus size. With prefetch 0 every document is read when it is needed, like open().read().
+    Errors of a document (for example UnicodeDecodeError with errors='strict') are raised when it is reached.
+    """
+    file_paths: list[str]
+    prefetch: int
+    mode: str
+    encoding: str
+    errors: str
+    executor: ThreadPoolExecutor
+
+    def __init__(self, file_paths: list[str], prefetch: int = 4, workers: int = None, mode: str = 'text', encoding: str = 'utf-8', errors: str = 'replace') -> None:
+        self.file_paths = list(file_paths)
+        self.prefetch = prefetch
+        self.mode = mode
+        self.encoding = encoding
+        self.errors = errors
+        self.executor = ThreadPoolExecutor(max_workers=workers if workers != None else min(prefetch, 8)) if prefetch > 0 else None
+
+    def read(self, file_path: str) -> any:
+        return read_document(file_path, self.mode, self.encoding, self.errors)
+
+    def __iter__(self) -> Iterator[tuple[str, any]]:
+        """Get the path and content of each document, in the order of file_paths.
+        A mmap content is closed when the next document is requested.
+        """
+        pending: deque[Future] = deque()
+        next_position = 0
+        previous_content = None
+        try:
+            for file_path in self.file_paths:
+                if self.executor == None:
+                    content = self.read(file_path)
+                else:
+                    while next_position < len(self.file_paths) and len(pending) <= self.prefetch:
+                        pending.append(self.executor.submit(self.read, self.file_paths[next_position]))
+                        next_position += 1
+                    content = pending.popleft().result()
+                if isinstance(previous_content, mmap.mmap):
+                    previous_content.close()
+                previous_content = content
+                yield file_path, content
+        finally:
+            for future in pending:
+                if not future.cancel():
+                    future.add_done_callback(close_content) # Now if it finished, when it finishes if it is running
+            if isinstance(previous_content, mmap.mmap):
+                previous_content.close()
+
+    def close(self):
+        if self.executor != None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> 'CorpusReader':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,93 @@
+import os
+from typing import NamedTuple
+from tokenizer import tokenize_file
+
+class DocumentStats(NamedTuple):
+    token_count: int # Tokens of the profile of the table, the document length
+    unique_terms: int
+    byte_size: int
+    mtime: float
+
+def get_document_stats(file_path: str, profile: str = 'separators') -> DocumentStats:
+    """Read a document once and get its statistics.
+    Args:
+        file_path (str): path of the document.
+        profile (str): tokenization profile used to count the tokens.
+    Returns:
+        DocumentStats: the statistics of the document.
+    """
+    file_stat = os.stat(file_path)
+    token_count = 0
+    terms: set[str] = set()
+    for token in tokenize_file(file_path, profile):
+        token_count += 1
+        terms.add(token)
+    return DocumentStats(token_count, len(terms), file_stat.st_size, file_stat.st_mtime)
+
+def get_postings_stats(file_path: str, word_counts: list[tuple[str, int]]) -> DocumentStats:
+    """Get the statistics of a document from its postings, without tokenizing it again.
+    Args:
+        file_path (str): path of the document.
+        word_counts (list[tuple[str, int]]): (word, frec) of every unique word of the document.
+    Returns:
+        DocumentStats: the statistics of the document, in the profile the postings were counted with.
+    """
+    file_stat = os.stat(file_path)
+    return DocumentStats(sum(frec for _, frec in word_counts), len(word_counts), file_stat.st_size, file_stat.st_mtime)
+
+def read_stats_profile(stats_path: str) -> str:
+    """Get the tokenization profile of the token counts of a table, 'separators' for the tables without it."""
+    with open(stats_path, 'r', encoding='utf-8', errors='replace') as file:
+        first_row = file.readline().rstrip('\n').split(';')
+    return first_row[1] if first_row[0] == '#profile' and len(first_row) > 1 else 'separators'
+
+def read_document_stats(stats_path: str) -> dict[str, DocumentStats]:
+    """Read the file;token_count;unique_terms;byte_size;mtime table.
+    Args:
+        stats_path (str): path of the table.
+    Returns:
+        dict[str, DocumentStats]: the statistics of each document name.
+    """
+    document_stats: dict[str, DocumentStats] = {}
+    with open(stats_path, 'r', encoding='utf-8', errors='replace') as file:
+        for row in file:
+            row_data = row.rstrip('\n').split(';')
+            if len(row_data) < 5: continue
+            document_stats[row_data[0]] = DocumentStats(int(row_data[1]), int(row_data[2]), int(row_data[3]), float(row_data[4]))
+    return document_stats
+
+def write_document_stats(document_stats: dict[str, DocumentStats], stats_path: str, profile: str = 'separators'):
+    with open(stats_path, 'w', encoding='utf-8', errors='replace') as file:
+        file.write(f"#profile;{profile}\n") # Skipped by read_document_stats, it has less than 5 columns
+        for file_name in sorted(document_stats.keys()):
+            stats = document_stats[file_name]
+            file.write(f"{file_name};{stats.token_count};{stats.unique_terms};{stats.byte_size};{stats.mtime}\n")
+
+def update_document_stats(files_path: str, stats_path: str, file_names: list[str] = None) -> dict[str, DocumentStats]:
+    """Create or refresh the statistics table, only the new or modified documents (size or mtime) are read.
+    Args:
+        files_path (str): folder with the documents.
+        stats_path (str): path of the table.
+        file_names (list[str]): documents of the table, every file of the folder if it is None.
+    Returns:
+        dict[str, DocumentStats]: the statistics of each document name.
+    """
+    if file_names == None:
+        file_names = sorted(os.listdir(files_path))
+    old_stats = read_document_stats(stats_path) if os.path.exists(stats_path) and read_stats_profile(stats_path) == 'separators' else {}
+    document_stats: dict[str, DocumentStats] = {}
+    changed = len(old_stats) != len(file_names)
+    for file_name in file_names:
+        file_path = os.path.join(files_path, file_name)
+        stats = old_stats.get(file_name)
+        if stats != None:
+            file_stat = os.stat(file_path)
+            if file_stat.st_size != stats.byte_size or file_stat.st_mtime != stats.mtime:
+                stats = None
+        if stats == None:
+            stats = get_document_stats(file_path)
+            changed = True
+        document_stats[file_name] = stats
+    if changed:
+        write_document_stats(document_stats, stats_path)
+    return document_stats
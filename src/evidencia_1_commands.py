@@ -1,12 +1,19 @@
 import argparse
 from evidencia_1_times import tokenize, index
+from pipeline import index_html
 
 def main():
     # Declare input parser
     parser = argparse.ArgumentParser(description='Process files to tokenize or index them')
-    parser.add_argument('action', type=str, help='Process type (tokenize|index)')
+    parser.add_argument('action', type=str, help='Process type (tokenize|index|index_html)')
     parser.add_argument('input_dir', type=str, help='Folder with the input files')
     parser.add_argument('output_dir', type=str, help='Output file')
+    parser.add_argument('--workers', type=int, default=1, help='tokenize/index: number of processes used to read the files')
+    parser.add_argument('--memory-budget', type=int, default=None, help='index: MB of postings kept in memory before writing sorted runs to disk')
+    parser.add_argument('--stats', type=str, default=None, help='index: file where the document statistics table is written')
+    parser.add_argument('--texts', type=str, default=None, help='index_html: folder where the texts without tags are written')
+    parser.add_argument('--alphabetically', type=str, default=None, help='index_html: folder where the sorted words are written')
+    parser.add_argument('--prefetch', type=int, default=0, help='files read ahead in a thread pool while the current one is processed (tokenize/index with one worker, index_html)')
     
     args = parser.parse_args()
     
@@ -14,18 +21,32 @@ def main():
     action = args.action
     input_dir = args.input_dir
     output_dir = args.output_dir
-    if action != 'tokenize' and action != 'index':
-        raise Exception('The action has to be "tokenize" or "index"')
+    if action != 'tokenize' and action != 'index' and action != 'index_html':
+        raise Exception('The action has to be "tokenize", "index" or "index_html"')
     
     if action == 'tokenize':
         tokenize(
             input_path=input_dir,
-            output_path=output_dir
+            output_path=output_dir,
+            workers=args.workers,
+            prefetch=args.prefetch
         )
-    else:
+    elif action == 'index':
         index(
             input_path=input_dir,
-            output_path=output_dir
+            output_path=output_dir,
+            workers=args.workers,
+            memory_budget=args.memory_budget * 1024 * 1024 if args.memory_budget != None else None,
+            stats_path=args.stats,
+            prefetch=args.prefetch
+        )
+    else:
+        index_html(
+            input_path=input_dir,
+            output_path=output_dir,
+            texts_path=args.texts,
+            alphabetically_path=args.alphabetically,
+            prefetch=args.prefetch
         )
 
 if __name__ == "__main__":
@@ -1,69 +1,101 @@
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 import time
 import os
 import re
-from HashTable import hashtable
+from HashTable import hashtable, openhashtable
+from tokenizer import tokenize_file, tokenize_text, count_lines
+from word_count import count_words
+from external_sort import ExternalIndexBuilder
+from posting_store import PostingStore
+from corpus_reader import CorpusReader
+from document_stats import DocumentStats, get_postings_stats, write_document_stats
+
+INDEX_PROFILE = 'lines_lower' # Tokenization profile of the postings of index
 
 # Just for testing
 tokenize_word_summary = defaultdict(lambda: { 'before': 0, 'after': 0 })
 
-def get_unique_words(file_path: str, default_hashtable: hashtable[str, int] = hashtable[str, int](379)) -> list[dict[str, any]]:
+def get_unique_words(file_path: str, default_hashtable: openhashtable[str, int] = None, content: str = None) -> list[dict[str, any]]:
     """Get every unique word of a file.
     Args:
         file_path (str): path of the file.
-        default_hashtable (hashtable[str, int]): default hashtable where unique words will be added.
+        default_hashtable (openhashtable[str, int]): hashtable where unique words will be added, it is modified. A new one is used by default.
+        content (str): content of the file if it was already read, the file is read if it is None.
     Returns:
         list[dict[str, int]]: an array with every word of the file.
     """
-    # Read file content
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
-    
-    separated_words = [word.lower() for word in re.split('\n', content)] # Separate the words of the files and make them lowercase
-    filtered_words = [word for word in separated_words if word.isalnum()] # Separate the words of the files
+    # Lowercase words of the file, one per line
+    filtered_words = tokenize_file(file_path, INDEX_PROFILE) if content == None else tokenize_text(content, INDEX_PROFILE)
 
-    word_hash_table = add_words_to_hash_table(default_hashtable, filtered_words) # Return every unique word
+    if default_hashtable == None:
+        default_hashtable = openhashtable[str, int]()
+    word_hash_table = add_words_to_hash_table(default_hashtable, filtered_words, in_place=True) # Return every unique word
     return [{ 'word': word, 'file': file_path.split('/')[-1], 'frec': word_hash_table.get(word) } for word in word_hash_table.keys()]
 
-def get_unique_words_hash_table(file_path: str, default_hashtable: hashtable[str, int] = hashtable[str, int](379)) -> hashtable[str, int]:
+def get_unique_words_hash_table(file_path: str, default_hashtable: hashtable[str, int] = None, in_place: bool = True, content: str = None) -> hashtable[str, int]:
     """Get every unique word of a file.
     Args:
         file_path (str): path of the file.
-        default_hashtable (hashtable[str, int]): default hashtable where unique words will be added.
+        default_hashtable (hashtable[str, int]): hashtable where unique words will be added. A new one is used by default.
+        in_place (bool): add the words to default_hashtable instead of a copy of it.
+        content (str): content of the file if it was already read, the file is read if it is None.
     Returns:
         hashtable[str, int]: a hashtable with every word of the file.
     """
-    # Read file content
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-        content = file.read()
     file_name = file_path.split('/')[-1]
-    separated_words = re.split('\n', content) # Separate the words of the files
-    filtered_words = re.findall(r'\b(?![a-zA-Z]*\d)\w+(?:-\w+)*\b', content) # Separate the words of the files
+    # Separate the words of the files
+    filtered_words = list(tokenize_file(file_path, 'words') if content == None else tokenize_text(content, 'words'))
 
     file_number = int(re.match(r'\d+', file_name)[0]);
 
     tokenize_word_summary[file_number] = { 'before': 0, 'after': 0 }
-    tokenize_word_summary[file_number]['before'] += len(separated_words)
+    tokenize_word_summary[file_number]['before'] += count_lines(file_path) if content == None else content.count('\n') + 1
     tokenize_word_summary[file_number]['after'] += len(filtered_words)
 
-    return add_words_to_hash_table(default_hashtable, filtered_words) # Return every unique word
+    if default_hashtable == None:
+        default_hashtable = hashtable[str, int](379)
+    return add_words_to_hash_table(default_hashtable, filtered_words, in_place) # Return every unique word
 
-def add_words_to_hash_table(hashtable: hashtable[str, int], words: list[str]) -> hashtable[str, int]:
+def add_words_to_hash_table(hashtable: hashtable[str, int] | openhashtable[str, int], words: list[str], in_place: bool = False) -> hashtable[str, int] | openhashtable[str, int]:
     """Add words to a hash table, and set word count.
     Args:
-        dictionary (dict[str, int]): The dictionary that will be modified.
+        hashtable (hashtable[str, int]): The hash table with the actual word count.
         words (list[str]): The words that will be added to the count.
+        in_place (bool): Modify the hash table instead of a copy of it.
     Returns:
-        dict[str, int]: The dictionary with the new word count.
+        hashtable[str, int]: The hash table with the new word count.
     """
-    new_hash_table = hashtable.clone()
+    if in_place:
+        new_hash_table = hashtable
+    elif isinstance(hashtable, openhashtable):
+        new_hash_table = hashtable.clone()
+    else:
+        new_hash_table = hashtable.snapshot() # Only the buckets that change are copied
     for word in words:
-        if new_hash_table.haskey(word):
-            new_hash_table.add(word, new_hash_table.get(word) + 1)
-        else:
-            new_hash_table.add(word, 1)
+        new_hash_table.increment(word)
     return new_hash_table
 
+def count_file_tokens(file_path: str) -> tuple[int, int, list[tuple[str, int]]]:
+    """Count the words of a file for tokenize, it runs in the worker processes.
+    Args:
+        file_path (str): path of the file.
+    Returns:
+        tuple[int, int, list[tuple[str, int]]]: lines of the file, words of the file, and (word, count) in order of first appearance.
+    """
+    filtered_words = list(tokenize_file(file_path, 'words'))
+    return count_lines(file_path), len(filtered_words), list(count_words(filtered_words).items())
+
+def count_file_postings(file_path: str, content: str = None) -> list[tuple[str, int]]:
+    """Count the words of a file for index, it runs in the worker processes.
+    Args:
+        file_path (str): path of the file.
+        content (str): content of the file if it was already read, the file is read if it is None.
+    Returns:
+        list[tuple[str, int]]: (word, frec) of every unique word of the file.
+    """
+    return [(posting['word'], posting['frec']) for posting in get_unique_words(file_path, content=content)]
+
 def get_loading_bar(actual_number: int, total_number: int, bar_size: int) -> str:
     """Generate a loading bar.
     Args:
@@ -80,34 +112,74 @@ def get_loading_bar(actual_number: int, total_number: int, bar_size: int) -> str
     return loading_bar + ']'
 
 
-def tokenize(output_path: str, input_path: str = None, input_paths: list[str] = None):
+def tokenize(output_path: str, input_path: str = None, input_paths: list[str] = None, workers: int = 1, prefetch: int = 0):
     if input_path == None and input_paths == None:
         raise Exception('There is no input')
     if input_paths == None:
         files = sorted(os.listdir(input_path))
         input_paths = [os.path.join(input_path, file) for file in files]
     words_hashtable = hashtable[str, int](73369)
-    for input_file in input_paths:
-        words_hashtable = get_unique_words_hash_table(file_path=input_file, default_hashtable=words_hashtable)
+    if workers <= 1 and prefetch > 0:
+        # The next files are read in a thread pool while the current one is counted
+        with CorpusReader(input_paths, prefetch) as reader:
+            for input_file, content in reader:
+                get_unique_words_hash_table(file_path=input_file, default_hashtable=words_hashtable, content=content) # Words are added in place
+    elif workers <= 1:
+        for input_file in input_paths:
+            get_unique_words_hash_table(file_path=input_file, default_hashtable=words_hashtable) # Words are added in place
+    else:
+        # Files are counted in parallel and merged in input order, so the result is the same as the serial one
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            file_counts = executor.map(count_file_tokens, input_paths, chunksize=8)
+            for input_file, (line_count, word_count, word_counts) in zip(input_paths, file_counts):
+                file_number = int(re.match(r'\d+', input_file.split('/')[-1])[0])
+                tokenize_word_summary[file_number] = { 'before': line_count, 'after': word_count }
+                for word, count in word_counts:
+                    words_hashtable.increment(word, count)
     with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
-        file.write(words_hashtable.tostring())
+        words_hashtable.dump(file)
             
 
-def index(output_path: str, input_path: str = None, input_paths: list[str] = None):
+def index(output_path: str, input_path: str = None, input_paths: list[str] = None, workers: int = 1, memory_budget: int = None, stats_path: str = None, prefetch: int = 0):
     if input_path == None and input_paths == None:
         raise Exception('There is no input')
     if input_paths == None:
         files = sorted(os.listdir(input_path))
         input_paths = [os.path.join(input_path, file) for file in files]
-    posting_records: list[dict[str, any]] = [] # list with the word in each file and the num of times they appear
-    # Get the word count of each file in the doc
-    for file_path in input_paths:
-        file_records = get_unique_words(file_path)
-        posting_records.extend(file_records)
-    posting_records = sorted(posting_records, key=lambda x: x['word']) # Sort alphabetically by the word
-    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
-        for posting in posting_records:
-            file.write(f"{posting['word']};{posting['file']};{posting['frec']}\n")
+    # Files are counted in parallel and merged in input order, so the result is the same as the serial one
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    # the word in each file and the num of times they appear, in sorted runs on disk if there is a memory budget
+    if memory_budget == None:
+        posting_store = PostingStore()
+    else:
+        posting_store = ExternalIndexBuilder(memory_budget, os.path.dirname(os.path.abspath(output_path)))
+    files_stats: dict[str, DocumentStats] = {}
+    # The next files are read in a thread pool while the current one is counted, the worker processes read their own files
+    reader = CorpusReader(input_paths, prefetch) if executor == None and prefetch > 0 else None
+    try:
+        if reader != None:
+            files_postings = (count_file_postings(file_path, content) for file_path, content in reader)
+        elif executor == None:
+            files_postings = map(count_file_postings, input_paths)
+        else:
+            files_postings = executor.map(count_file_postings, input_paths, chunksize=8)
+        # Get the word count of each file in the doc
+        for file_path, file_postings in zip(input_paths, files_postings):
+            file_name = file_path.split('/')[-1]
+            if stats_path != None:
+                # Document statistics table of the same tokenization as the postings, used by the weights
+                files_stats[file_name] = get_postings_stats(file_path, file_postings)
+            posting_store.add_document(file_name, file_postings)
+        if stats_path != None:
+            write_document_stats(files_stats, stats_path, INDEX_PROFILE)
+        posting_store.write_index(output_path) # Sorted alphabetically by the word
+    finally:
+        if executor != None:
+            executor.shutdown()
+        if reader != None:
+            reader.close()
+        if isinstance(posting_store, ExternalIndexBuilder):
+            posting_store.cleanup() # The runs are removed even if the index was not written
 
 
 def main():
@@ -0,0 +1,114 @@
+import heapq
+import os
+import shutil
+import tempfile
+from typing import Iterable, Iterator
+
+POSTING_BYTES = 120 # Approximate memory of one (word, file, frec) tuple without the word characters
+MAX_OPEN_RUNS = 64 # Max number of runs merged at the same time
+
+def parse_posting_row(row: str) -> tuple[str, str, int]:
+    word, file_name, frec = row.rstrip('\n').rsplit(';', 2)
+    return word, file_name, int(frec)
+
+class ExternalIndexBuilder:
+    """Build the word;file;frec index with a bounded amount of memory.
+    The postings of a batch of documents are sorted and written to a temporary run file when the memory budget
+    is reached, and the runs are merged at the end. Runs keep the document order, so the result is the same
+    as sorting every posting by word in memory.
+    """
+    memory_budget: int
+    temp_dir: str
+    run_paths: list[str]
+    batch: list[tuple[str, str, int]]
+    batch_bytes: int
+
+    def __init__(self, memory_budget: int = 64 * 1024 * 1024, temp_dir: str = None) -> None:
+        self.memory_budget = memory_budget
+        self.temp_dir = tempfile.mkdtemp(prefix='index_runs_', dir=temp_dir)
+        self.run_paths = []
+        self.batch = []
+        self.batch_bytes = 0
+
+    def add_document(self, file_name: str, word_counts: Iterable[tuple[str, int]]):
+        """Add the postings of a document.
+        Args:
+            file_name (str): name of the document in the index.
+            word_counts (Iterable[tuple[str, int]]): (word, frec) of every unique word of the document.
+        """
+        for word, frec in word_counts:
+            self.batch.append((word, file_name, frec))
+            self.batch_bytes += POSTING_BYTES + len(word)
+        if self.batch_bytes >= self.memory_budget:
+            self.spill()
+
+    def spill(self):
+        """Write the actual batch as a sorted run."""
+        if not self.batch:
+            return
+        self.batch.sort(key=lambda x: x[0]) # Stable, keeps the document order of each word
+        run_path = os.path.join(self.temp_dir, f"run_{len(self.run_paths)}.txt")
+        with open(run_path, 'w', encoding='utf-8', errors='replace') as file:
+            file.writelines(f"{word};{file_name};{frec}\n" for word, file_name, frec in self.batch)
+        self.run_paths.append(run_path)
+        self.batch = []
+        self.batch_bytes = 0
+
+    def merge_runs(self, run_paths: list[str], output_path: str):
+        files = [open(run_path, 'r', encoding='utf-8', errors='replace') for run_path in run_paths]
+        try:
+            with open(output_path, 'w', encoding='utf-8', errors='replace') as output:
+                # heapq.merge takes equal words from the first run first, so the merge is stable
+                output.writelines(heapq.merge(*files, key=lambda row: row.rsplit(';', 2)[0]))
+        finally:
+            for file in files:
+                file.close()
+        for run_path in run_paths:
+            os.remove(run_path)
+
+    def iter_sorted(self) -> Iterator[tuple[str, str, int]]:
+        """Merge the runs and get every posting sorted by word. The builder can not be used after this.
+        Returns:
+            Iterator[tuple[str, str, int]]: (word, file, frec) of every posting.
+        """
+        self.spill()
+        # Merge in groups until every run can be opened at the same time
+        while len(self.run_paths) > MAX_OPEN_RUNS:
+            merged_paths: list[str] = []
+            for start in range(0, len(self.run_paths), MAX_OPEN_RUNS):
+                group = self.run_paths[start:start + MAX_OPEN_RUNS]
+                merged_path = os.path.join(self.temp_dir, f"merge_{len(self.run_paths)}_{start}.txt")
+                self.merge_runs(group, merged_path)
+                merged_paths.append(merged_path)
+            self.run_paths = merged_paths
+        files = [open(run_path, 'r', encoding='utf-8', errors='replace') for run_path in self.run_paths]
+        try:
+            for row in heapq.merge(*files, key=lambda row: row.rsplit(';', 2)[0]):
+                yield parse_posting_row(row)
+        finally:
+            for file in files:
+                file.close()
+            self.cleanup()
+
+    def write_index(self, output_path: str):
+        """Merge the runs into the index file.
+        Args:
+            output_path (str): path of the word;file;frec index.
+        """
+        with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+            for word, file_name, frec in self.iter_sorted():
+                file.write(f"{word};{file_name};{frec}\n")
+
+    def cleanup(self):
+        for run_path in self.run_paths:
+            if os.path.exists(run_path):
+                os.remove(run_path)
+        self.run_paths = []
+        if os.path.isdir(self.temp_dir):
+            shutil.rmtree(self.temp_dir) # Also the partial files of a failed merge
+
+    def __enter__(self) -> 'ExternalIndexBuilder':
+        return self
+
+    def __exit__(self, *args):
+        self.cleanup() # The runs are removed even if the index was not written
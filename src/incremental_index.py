@@ -0,0 +1,165 @@
+import argparse
+import hashlib
+import heapq
+import json
+import os
+from typing import Iterator
+from evidencia_1_times import count_file_postings
+from segmented_index import SegmentedIndex
+
+SEGMENT_BATCH_SIZE = 50 # Documents per segment written by update_segments
+
+def get_manifest_path(index_path: str) -> str:
+    return f"{index_path}.manifest.json"
+
+def get_file_hash(file_path: str) -> str:
+    with open(file_path, 'rb') as file:
+        return hashlib.sha1(file.read()).hexdigest()
+
+def get_fingerprint(file_path: str, old_fingerprint: dict[str, any] = None) -> dict[str, any]:
+    """Get the size, mtime and content hash of a document, the hash is only computed when size or mtime changed.
+    Args:
+        file_path (str): path of the document.
+        old_fingerprint (dict[str, any]): fingerprint stored in the manifest.
+    Returns:
+        dict[str, any]: size, mtime and hash of the document.
+    """
+    file_stat = os.stat(file_path)
+    if old_fingerprint != None and old_fingerprint['size'] == file_stat.st_size and old_fingerprint['mtime'] == file_stat.st_mtime:
+        return old_fingerprint
+    return { 'size': file_stat.st_size, 'mtime': file_stat.st_mtime, 'hash': get_file_hash(file_path) }
+
+def read_manifest(manifest_path: str) -> dict[str, dict[str, any]]:
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def write_manifest(manifest: dict[str, dict[str, any]], manifest_path: str):
+    temp_path = f"{manifest_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+def get_changes(input_path: str, manifest: dict[str, dict[str, any]]) -> tuple[list[str], list[str], list[str], dict[str, dict[str, any]]]:
+    """Compare the documents of a folder with the manifest.
+    Args:
+        input_path (str): folder with the documents.
+        manifest (dict[str, dict[str, any]]): fingerprint of each indexed document.
+    Returns:
+        tuple[list[str], list[str], list[str], dict[str, dict[str, any]]]: added, changed and deleted documents and the new manifest.
+    """
+    added: list[str] = []
+    changed: list[str] = []
+    new_manifest: dict[str, dict[str, any]] = {}
+    file_names = sorted(os.listdir(input_path))
+    for file_name in file_names:
+        old_fingerprint = manifest.get(file_name)
+        fingerprint = get_fingerprint(os.path.join(input_path, file_name), old_fingerprint)
+        if old_fingerprint == None:
+            added.append(file_name)
+        elif fingerprint['hash'] != old_fingerprint['hash']:
+            changed.append(file_name)
+        new_manifest[file_name] = fingerprint
+    deleted = sorted(set(manifest.keys()) - set(file_names))
+    return added, changed, deleted, new_manifest
+
+def iter_index_rows(index_path: str, removed_files: set[str]) -> Iterator[tuple[str, str, str]]:
+    """Read the rows of an index without the postings of some documents.
+    Returns:
+        Iterator[tuple[str, str, str]]: word, file and the row as it is in the file.
+    """
+    if not os.path.exists(index_path):
+        return
+    with open(index_path, 'r', encoding='utf-8', errors='replace') as file:
+        for row in file:
+            word, file_name, _ = row.rsplit(';', 2)
+            if not file_name in removed_files:
+                yield word, file_name, row
+
+def update_index(input_path: str, index_path: str, manifest_path: str = None) -> tuple[list[str], list[str], list[str]]:
+    """Update the word;file;frec index of evidencia_1_times.index with the documents that were added, changed or
+    deleted since the last update. Only the added and changed documents are read, their postings are sorted and
+    merged with the old index by (word, file), so the result is the same as indexing the whole folder again.
+    The whole index is written again and the files that are generated from it have to be built again, use
+    update_segments when the cost has to depend only on the changed documents.
+    Args:
+        input_path (str): folder with the documents.
+        index_path (str): path of the index.
+        manifest_path (str): path of the manifest, next to the index if it is None.
+    Returns:
+        tuple[list[str], list[str], list[str]]: added, changed and deleted documents.
+    """
+    if manifest_path == None:
+        manifest_path = get_manifest_path(index_path)
+    # Without a manifest the rows of the index can't be matched with the documents, it is built again
+    rebuild = not os.path.exists(index_path) or not os.path.exists(manifest_path)
+    manifest = {} if rebuild else read_manifest(manifest_path)
+    added, changed, deleted, new_manifest = get_changes(input_path, manifest)
+    if not rebuild and not added and not changed and not deleted:
+        if new_manifest != manifest:
+            write_manifest(new_manifest, manifest_path) # Only mtimes changed
+        return added, changed, deleted
+
+    delta: list[tuple[str, str, str]] = []
+    for file_name in sorted(added + changed):
+        delta.extend((word, file_name, f"{word};{file_name};{frec}\n") for word, frec in count_file_postings(os.path.join(input_path, file_name)))
+    delta.sort()
+    removed_files = set(changed) | set(deleted)
+
+    temp_path = f"{index_path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8', errors='replace') as file:
+        # The index is sorted by word and then by file, the same order as the full index
+        old_rows = iter_index_rows(index_path, removed_files) if not rebuild else iter(())
+        file.writelines(row for _, _, row in heapq.merge(old_rows, delta))
+    os.replace(temp_path, index_path)
+    write_manifest(new_manifest, manifest_path)
+    return added, changed, deleted
+
+def update_segments(input_path: str, segments_path: str, manifest_path: str = None) -> tuple[list[str], list[str], list[str]]:
+    """Update a segmented_index.SegmentedIndex with the documents that were added, changed or deleted since the
+    last update. The added and changed documents are written as new segments, their old versions and the deleted
+    documents are only marked as deleted in the manifest of the segments. The old segments are not read, so the
+    cost depends on the changed documents and not on the size of the index, besides the tiered merges.
+    Args:
+        input_path (str): folder with the documents.
+        segments_path (str): folder of the segments.
+        manifest_path (str): path of the manifest, in the segments folder if it is None.
+    Returns:
+        tuple[list[str], list[str], list[str]]: added, changed and deleted documents.
+    """
+    if manifest_path == None:
+        manifest_path = get_manifest_path(os.path.join(segments_path, 'documents'))
+    manifest = read_manifest(manifest_path)
+    added, changed, deleted, new_manifest = get_changes(input_path, manifest)
+    with SegmentedIndex(segments_path, background_merge=False) as segmented_index:
+        if not manifest:
+            # Without a manifest every document is added again, the live documents that are not in the folder are removed
+            live_documents = set(document_name for segment in segmented_index.manifest['segments'] for document_name in segment['documents'] if not document_name in segment['deleted'])
+            deleted = sorted(live_documents - set(new_manifest.keys()))
+        if deleted:
+            segmented_index.remove_documents(deleted)
+        file_names = sorted(added + changed)
+        for start in range(0, len(file_names), SEGMENT_BATCH_SIZE):
+            segmented_index.add_files([os.path.join(input_path, file_name) for file_name in file_names[start:start + SEGMENT_BATCH_SIZE]])
+    if new_manifest != manifest:
+        write_manifest(new_manifest, manifest_path)
+    return added, changed, deleted
+
+
+def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Update the index with the added, changed and deleted documents')
+    parser.add_argument('--input', type=str, default=os.path.join(os.getcwd(), 'src/results/alphabetically'), help='Folder with the documents')
+    parser.add_argument('--index', type=str, default=os.path.join(os.getcwd(), 'src/results/data/indexed_tokens.txt'), help='Index file (word;file;frec)')
+    parser.add_argument('--segments', type=str, default=None, help='Update the segments of this folder (segmented_index.py) instead of the index file, only the changed documents are written')
+    args = parser.parse_args()
+
+    if args.segments != None:
+        added, changed, deleted = update_segments(args.input, args.segments)
+    else:
+        added, changed, deleted = update_index(args.input, args.index)
+    print(f"Agregados: {len(added)}\tModificados: {len(changed)}\tEliminados: {len(deleted)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import os
+import re
+from typing import Iterator
+from tokenizer import tokenize_text
+from word_count import count_words
+from corpus_reader import CorpusReader
+
+TAG_PATTERN = re.compile(r'<(\S?\d+)[^>]>(.?)|<.*?\>', flags=re.S) # Same pattern as actividad_2 and actividad_3
+
+def strip_tags(content: str) -> str:
+    """Remove the html tags of a text.
+    Args:
+        content (str): html content.
+    Returns:
+        str: the content without the tags.
+    """
+    return TAG_PATTERN.sub('', content)
+
+def get_text_file_name(html_file_name: str) -> str:
+    """Get the name of the intermediate text file of an html file (002.html -> 002.txt).
+    Args:
+        html_file_name (str): name of the html file.
+    Returns:
+        str: the name used in the texts and alphabetically folders and in the postings.
+    """
+    return re.sub(r'\.[^.]+$', '.txt', html_file_name)
+
+def count_html_words(html_path: str, profile: str = 'lines_lower', texts_path: str = None, alphabetically_path: str = None, content: str = None) -> dict[str, int]:
+    """Read an html file once and count its words, optionally writing the intermediate files of actividad_3.
+    Args:
+        html_path (str): path of the html file.
+        profile (str): tokenization profile applied to the words, as if they were read from the alphabetically folder.
+        texts_path (str): folder where the text without tags is written, nothing is written if it is None.
+        alphabetically_path (str): folder where the sorted words are written, nothing is written if it is None.
+        content (str): content of the file if it was already read, the file is read if it is None.
+    Returns:
+        dict[str, int]: the count of each token of the file.
+    """
+    if not html_path.endswith('.html'):
+        raise Exception('File must be html')
+    if content == None:
+        with open(html_path, 'r', encoding='utf-8', errors='replace') as file:
+            content = file.read()
+    text_content = strip_tags(content)
+    text_file_name = get_text_file_name(os.path.basename(html_path))
+    words = text_content.split()
+    if texts_path != None:
+        with open(os.path.join(texts_path, text_file_name), 'w', encoding='utf-8') as file:
+            file.write(text_content)
+    if alphabetically_path != None:
+        with open(os.path.join(alphabetically_path, text_file_name), 'w', encoding='utf-8') as file:
+            file.writelines(f"{word}\n" for word in sorted(words))
+    # The words are tokenized one per line, the same as when they are read from the alphabetically folder
+    return count_words(tokenize_text('\n'.join(words), profile))
+
+def iter_html_postings(html_paths: list[str], profile: str = 'lines_lower', texts_path: str = None, alphabetically_path: str = None, prefetch: int = 0) -> Iterator[tuple[str, dict[str, int]]]:
+    """Get the word count of each html file, one file at a time while the next ones are read.
+    Args:
+        html_paths (list[str]): paths of the html files.
+        profile (str): tokenization profile.
+        texts_path (str): optional folder for the texts without tags.
+        alphabetically_path (str): optional folder for the sorted words.
+        prefetch (int): files read ahead by the CorpusReader, 0 to read each file when it is needed.
+    Returns:
+        Iterator[tuple[str, dict[str, int]]]: the posting file name (NNN.txt) and the word count of each file.
+    """
+    for html_path in html_paths:
+        if not html_path.endswith('.html'):
+            raise Exception('File must be html') # Before reading any file
+    with CorpusReader(html_paths, prefetch) as reader:
+        for html_path, content in reader:
+            yield get_text_file_name(os.path.basename(html_path)), count_html_words(html_path, profile, texts_path, alphabetically_path, content)
+
+def index_html(output_path: str, input_path: str = None, input_paths: list[str] = None, profile: str = 'lines_lower', texts_path: str = None, alphabetically_path: str = None, prefetch: int = 0):
+    """Index html files in one pass per file, writing the same word;file;frec rows as evidencia_1_times.index.
+    Args:
+        output_path (str): path of the index file.
+        input_path (str): folder with the html files.
+        input_paths (list[str]): paths of the html files, used instead of input_path.
+        profile (str): tokenization profile.
+        texts_path (str): optional folder for the texts without tags.
+        alphabetically_path (str): optional folder for the sorted words.
+        prefetch (int): files read ahead while the current one is counted.
+    """
+    if input_path == None and input_paths == None:
+        raise Exception('There is no input')
+    if input_paths == None:
+        files = sorted(os.listdir(input_path))
+        input_paths = [os.path.join(input_path, file) for file in files]
+    posting_records: list[tuple[str, str, int]] = []
+    for file_name, word_count in iter_html_postings(input_paths, profile, texts_path, alphabetically_path, prefetch):
+        posting_records.extend((word, file_name, frec) for word, frec in word_count.items())
+    posting_records.sort(key=lambda x: x[0]) # Sort alphabetically by the word
+    with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+        for word, file_name, frec in posting_records:
+            file.write(f"{word};{file_name};{frec}\n")
@@ -0,0 +1,308 @@
+import argparse
+import bisect
+import os
+import re
+import struct
+import sys
+import time
+from array import array
+from binary_index import OPEN_ATTEMPTS, OPEN_RETRY_DELAY, VERSION, encode_varints, decode_varints, write_binary_index
+from query_engine import QueryEngine
+from tokenizer import tokenize_file
+
+POSITIONS_MAGIC = b'APOS'
+POSITIONS_VERSION = 1
+POSITIONS_HEADER = struct.Struct('<4sHHI') # magic, version, build tag of the index, posting count
+NEAR_PATTERN = re.compile(r'NEAR/(\d+)')
+# Positions file: header, byte offset of the positions of each posting (posting count + 1, in the posting offset
+# order of the binary index) and the positions of each posting as varint gaps
+
+def read_document_positions(file_path: str, profile: str = 'word_chars') -> dict[str, list[int]]:
+    """Get the positions of each token of a document.
+    Args:
+        file_path (str): path of the document.
+        profile (str): tokenization profile.
+    Returns:
+        dict[str, list[int]]: the sorted positions of each token.
+    """
+    positions: dict[str, list[int]] = {}
+    for position, token in enumerate(tokenize_file(file_path, profile)):
+        token_positions = positions.get(token)
+        if token_positions == None:
+            positions[token] = [position]
+        else:
+            token_positions.append(position)
+    return positions
+
+def encode_positions(positions: list[int]) -> bytes:
+    """Encode sorted positions as the first position and the gaps between them."""
+    return encode_varints([positions[0]] + [position - previous for previous, position in zip(positions, positions[1:])])
+
+def decode_positions(buffer: bytes, start: int, end: int, count: int) -> list[int]:
+    gaps, _ = decode_varints(buffer, start, count, end - start == count)
+    positions: list[int] = []
+    position = 0
+    for gap in gaps:
+        position += gap
+        positions.append(position)
+    return positions
+
+def build_positional_index(files_path: str, dict_path: str, post_path: str, positions_path: str, profile: str = 'word_chars', version: int = VERSION):
+    """Build a binary index of the documents of a folder and the positions file of its postings.
+    The frec of each posting is the length of its position list.
+    Args:
+        files_path (str): folder with the documents.
+        dict_path (str): path of the binary dictionary.
+        post_path (str): path of the binary postings.
+        positions_path (str): path of the positions file.
+        profile (str): tokenization profile.
+        version (int): version of the binary index.
+    """
+    document_names = sorted(os.listdir(files_path))
+    terms: dict[str, list[tuple[int, list[int]]]] = {}
+    for doc_id, document_name in enumerate(document_names):
+        for term, positions in read_document_positions(os.path.join(files_path, document_name), profile).items():
+            terms.setdefault(term, []).append((doc_id, positions))
+    sorted_terms = sorted(terms.keys())
+
+    # The binary index gives the posting offsets in the order of the terms, and the postings are sorted by doc id
+    build_tag = write_binary_index(((term, [(doc_id, len(positions)) for doc_id, positions in terms[term]]) for term in sorted_terms), document_names, dict_path, post_path, version)
+    offsets = array('I', [0])
+    content = bytearray()
+    for term in sorted_terms:
+        for _, positions in terms[term]:
+            content += encode_positions(positions)
+            offsets.append(len(content))
+    if sys.byteorder == 'big':
+        offsets.byteswap()
+    with open(f"{positions_path}.tmp", 'wb') as file:
+        file.write(POSITIONS_HEADER.pack(POSITIONS_MAGIC, POSITIONS_VERSION, build_tag, len(offsets) - 1))
+        file.write(offsets.tobytes())
+        file.write(content)
+    os.replace(f"{positions_path}.tmp", positions_path) # An interrupted build doesn't leave a truncated file
+
+def match_phrase(term_positions: list[list[int]]) -> list[int]:
+    """Get the positions where the terms appear one after the other, merging the position lists.
+    Args:
+        term_positions (list[list[int]]): sorted positions of each term of the phrase, in the phrase order.
+    Returns:
+        list[int]: start position of each match.
+    """
+    starts = term_positions[0]
+    for offset, positions in enumerate(term_positions[1:], 1):
+        matches: list[int] = []
+        index = 0
+        for start in starts:
+            while index < len(positions) and positions[index] < start + offset:
+                index += 1
+            if index == len(positions):
+                break
+            if positions[index] == start + offset:
+                matches.append(start)
+        starts = matches
+        if not starts:
+            break
+    return starts
+
+def match_near(starts: list[int], length: int, other_starts: list[int], other_length: int, distance: int) -> list[int]:
+    """Get the starts of the first phrase that have the other phrase at most distance words before or after it.
+    Adjacent phrases have a distance of 1.
+    Args:
+        starts (list[int]): sorted start positions of the first phrase.
+        length (int): words of the first phrase.
+        other_starts (list[int]): sorted start positions of the other phrase.
+        other_length (int): words of the other phrase.
+        distance (int): max distance between the end of one phrase and the start of the other.
+    Returns:
+        list[int]: the matching starts of the first phrase.
+    """
+    matches: list[int] = []
+    for start in starts:
+        # Other phrase before: it ends in [start - distance, start - 1]
+        index = bisect.bisect_left(other_starts, start - distance - other_length + 1)
+        if index < len(other_starts) and other_starts[index] <= start - other_length:
+            matches.append(start)
+            continue
+        # Other phrase after: it starts in [start + length, start + length - 1 + distance]
+        index = bisect.bisect_left(other_starts, start + length)
+        if index < len(other_starts) and other_starts[index] <= start + length - 1 + distance:
+            matches.append(start)
+    return matches
+
+class PositionalIndex:
+    """Binary index with the positions of every posting, for phrase and proximity queries.
+    Only the documents that have every term of the query are decoded, and only their position lists.
+    """
+    engine: QueryEngine
+    positions_file: any
+    positions_content: bytes
+    offsets: array
+    data_offset: int
+
+    def __init__(self, dict_path: str, post_path: str, positions_path: str) -> None:
+        for _ in range(OPEN_ATTEMPTS):
+            self.engine = QueryEngine(dict_path, post_path)
+            with open(positions_path, 'rb') as file:
+                self.positions_content = file.read()
+            magic, version, build_tag, posting_count = POSITIONS_HEADER.unpack_from(self.positions_content, 0)
+            if build_tag == self.engine.build_tag or magic != POSITIONS_MAGIC:
+                break
+            # The positions file is replaced right after the dict and post files of its build
+            self.engine.close()
+            time.sleep(OPEN_RETRY_DELAY)
+        else:
+            raise Exception(f'{positions_path} is not from the same build as {dict_path}')
+        if magic != POSITIONS_MAGIC or version != POSITIONS_VERSION:
+            raise Exception(f'{positions_path} is not a positions file')
+        self.offsets = array('I')
+        self.offsets.frombytes(self.positions_content[POSITIONS_HEADER.size:POSITIONS_HEADER.size + (posting_count + 1) * self.offsets.itemsize])
+        if sys.byteorder == 'big':
+            self.offsets.byteswap()
+        self.data_offset = POSITIONS_HEADER.size + len(self.offsets) * self.offsets.itemsize
+
+    @property
+    def document_names(self) -> list[str]:
+        return self.engine.document_names
+
+    def positions(self, term: str, doc_ids: list[int]) -> list[list[int]]:
+        """Get the positions of a term in some documents.
+        Args:
+            term (str): the term.
+            doc_ids (list[int]): sorted doc ids, every one has to contain the term.
+        Returns:
+            list[list[int]]: positions of the term in each document.
+        """
+        posting_offset = self.engine.find_term(term)[0]
+        term_doc_ids, frecs = self.engine.postings(term)
+        term_positions: list[list[int]] = []
+        index = 0
+        for doc_id in doc_ids:
+            index = bisect.bisect_left(term_doc_ids, doc_id, index)
+            posting = posting_offset + index
+            term_positions.append(decode_positions(self.positions_content, self.data_offset + self.offsets[posting], self.data_offset + self.offsets[posting + 1], frecs[index]))
+        return term_positions
+
+    def phrase_starts(self, words: list[str], doc_ids: list[int] = None) -> dict[int, list[int]]:
+        """Get the start positions of a phrase in each document that has it.
+        Args:
+            words (list[str]): words of the phrase.
+            doc_ids (list[int]): sorted doc ids where the phrase is searched, every document if it is None.
+        Returns:
+            dict[int, list[int]]: start positions of the phrase in each doc id.
+        """
+        words = [word.lower() for word in words]
+        unique_words = list(dict.fromkeys(words))
+        if any(self.engine.find_term(word) == None for word in unique_words):
+            return {}
+        # Documents with every word, starting from the rarest one
+        unique_words.sort(key=lambda word: self.engine.find_term(word)[1])
+        candidates = list(self.engine.postings(unique_words[0])[0]) if doc_ids == None else self.engine.filter_documents(unique_words[0], doc_ids)
+        for word in unique_words[1:]:
+            if not candidates:
+                return {}
+            candidates = self.engine.filter_documents(word, candidates)
+        word_positions = { word: self.positions(word, candidates) for word in unique_words }
+        doc_starts: dict[int, list[int]] = {}
+        for index, doc_id in enumerate(candidates):
+            starts = match_phrase([word_positions[word][index] for word in words])
+            if starts:
+                doc_starts[doc_id] = starts
+        return doc_starts
+
+    def search_phrase(self, words: list[str]) -> list[tuple[str, int]]:
+        """Get the documents with the exact phrase.
+        Args:
+            words (list[str]): words of the phrase.
+        Returns:
+            list[tuple[str, int]]: name and number of matches of each document, sorted by name.
+        """
+        return [(self.document_names[doc_id], len(starts)) for doc_id, starts in self.phrase_starts(words).items()]
+
+    def search_near(self, words: list[str], other_words: list[str], distance: int) -> list[tuple[str, int]]:
+        """Get the documents where two phrases (or words) are at most distance words apart, in any order.
+        Args:
+            words (list[str]): words of the first phrase.
+            other_words (list[str]): words of the other phrase.
+            distance (int): max distance, 1 for adjacent phrases.
+        Returns:
+            list[tuple[str, int]]: name and number of matches of the first phrase of each document, sorted by name.
+        """
+        doc_starts = self.phrase_starts(words)
+        if not doc_starts:
+            return []
+        other_doc_starts = self.phrase_starts(other_words, list(doc_starts.keys()))
+        results: list[tuple[str, int]] = []
+        for doc_id, other_starts in other_doc_starts.items():
+            matches = match_near(doc_starts[doc_id], len(words), other_starts, len(other_words), distance)
+            if matches:
+                results.append((self.document_names[doc_id], len(matches)))
+        return results
+
+    def search(self, query: str) -> list[tuple[str, int]]:
+        """Run a query: a phrase ("casa blanca" or casa blanca) or two phrases joined by NEAR/k (casa NEAR/3 perro).
+        Args:
+            query (str): the query.
+        Returns:
+            list[tuple[str, int]]: name and number of matches of each document, sorted by name.
+        """
+        parts = NEAR_PATTERN.split(query)
+        if len(parts) == 1:
+            return self.search_phrase(parse_phrase(parts[0]))
+        if len(parts) == 3:
+            return self.search_near(parse_phrase(parts[0]), parse_phrase(parts[2]), int(parts[1]))
+        raise Exception('Use only one NEAR/k in the query')
+
+    def close(self):
+        self.engine.close()
+
+    def __enter__(self) -> 'PositionalIndex':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def parse_phrase(text: str) -> list[str]:
+    words = re.findall(r'\w+', text.lower()) # Same tokens as the word_chars profile
+    if not words:
+        raise Exception('Every phrase of the query needs at least one word')
+    return words
+
+def scan_phrase(files_path: str, words: list[str], profile: str = 'word_chars') -> list[tuple[str, int]]:
+    """Find a phrase tokenizing every document of a folder, without an index.
+    Args:
+        files_path (str): folder with the documents.
+        words (list[str]): words of the phrase.
+        profile (str): tokenization profile.
+    Returns:
+        list[tuple[str, int]]: name and number of matches of each document, sorted by name.
+    """
+    words = [word.lower() for word in words]
+    results: list[tuple[str, int]] = []
+    for document_name in sorted(os.listdir(files_path)):
+        tokens = list(tokenize_file(os.path.join(files_path, document_name), profile))
+        matches = sum(1 for start in range(len(tokens) - len(words) + 1) if tokens[start:start + len(words)] == words)
+        if matches > 0:
+            results.append((document_name, matches))
+    return results
+
+
+def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Positional index for phrase and NEAR/k queries')
+    parser.add_argument('action', type=str, choices=['build', 'search'], help='Action')
+    parser.add_argument('query', nargs='*', type=str, help='search: a phrase or two phrases joined by NEAR/k')
+    parser.add_argument('--input', type=str, default=os.path.join(os.getcwd(), 'src/results/texts'), help='build: folder with the documents')
+    parser.add_argument('--dict', type=str, default=os.path.join(os.getcwd(), 'src/results/data/positional_dict.bin'), help='Binary dictionary')
+    parser.add_argument('--post', type=str, default=os.path.join(os.getcwd(), 'src/results/data/positional_post.bin'), help='Binary postings')
+    parser.add_argument('--positions', type=str, default=os.path.join(os.getcwd(), 'src/results/data/positional_pos.bin'), help='Positions file')
+    args = parser.parse_args()
+
+    if args.action == 'build':
+        build_positional_index(args.input, args.dict, args.post, args.positions)
+        return
+    with PositionalIndex(args.dict, args.post, args.positions) as positional_index:
+        for index, (file_name, matches) in enumerate(positional_index.search(' '.join(args.query))):
+            print(f"{index + 1}. {file_name} - matches: {matches}")
+
+if __name__ == "__main__":
+    main()
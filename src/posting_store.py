@@ -0,0 +1,138 @@
+import os
+from array import array
+from typing import Iterable, Iterator
+
+DOCUMENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Documents.txt')
+
+def read_document_ids(documents_path: str) -> dict[str, int]:
+    """Read the document ids of Documents.txt (id<TAB>NNN.html).
+    Args:
+        documents_path (str): path of Documents.txt.
+    Returns:
+        dict[str, int]: the id of each document name without extension.
+    """
+    document_ids: dict[str, int] = {}
+    with open(documents_path, 'r', encoding='utf-8', errors='replace') as file:
+        for line in file:
+            parts = line.strip().split('\t')
+            if len(parts) == 2:
+                document_ids[os.path.splitext(parts[1])[0]] = int(parts[0])
+    return document_ids
+
+class PostingStore:
+    """Columnar posting list: interned term ids and three array('I') columns instead of one dict per posting."""
+    __slots__ = ('terms', 'term_ids', 'document_names', 'document_ids', 'term_column', 'document_column', 'frec_column')
+    terms: list[str] # Term of each term id
+    term_ids: dict[str, int]
+    document_names: list[str] # File name of each document id, None for unused ids
+    document_ids: dict[str, int] # Document id of each name without extension
+    term_column: array
+    document_column: array
+    frec_column: array
+
+    def __init__(self, documents_path: str = DOCUMENTS_PATH) -> None:
+        self.terms = []
+        self.term_ids = {}
+        self.document_ids = read_document_ids(documents_path) if documents_path != None and os.path.exists(documents_path) else {}
+        self.document_names = [None] * (max(self.document_ids.values(), default=-1) + 1)
+        self.term_column = array('I')
+        self.document_column = array('I')
+        self.frec_column = array('I')
+
+    def get_term_id(self, word: str) -> int:
+        term_id = self.term_ids.get(word)
+        if term_id == None:
+            term_id = len(self.terms)
+            self.term_ids[word] = term_id
+            self.terms.append(word)
+        return term_id
+
+    def get_document_id(self, file_name: str) -> int:
+        """Get the id of a document, taken from Documents.txt or a new one after the last id.
+        Args:
+            file_name (str): name of the document in the postings (NNN.txt).
+        Returns:
+            int: the document id.
+        """
+        stem = os.path.splitext(file_name)[0]
+        document_id = self.document_ids.get(stem)
+        if document_id == None:
+            document_id = len(self.document_names)
+            self.document_ids[stem] = document_id
+            self.document_names.append(None)
+        self.document_names[document_id] = file_name
+        return document_id
+
+    def add_document(self, file_name: str, word_counts: Iterable[tuple[str, int]]):
+        """Add the postings of a document.
+        Args:
+            file_name (str): name of the document in the postings.
+            word_counts (Iterable[tuple[str, int]]): (word, frec) of every unique word of the document.
+        """
+        document_id = self.get_document_id(file_name)
+        get_term_id = self.get_term_id
+        for word, frec in word_counts:
+            self.term_column.append(get_term_id(word))
+            self.document_column.append(document_id)
+            self.frec_column.append(frec)
+
+    def __len__(self) -> int:
+        return len(self.term_column)
+
+    def sorted_positions(self) -> list[int]:
+        """Get the position of every posting sorted by word, postings of the same word keep their order."""
+        term_ranks = array('I', bytes(4 * len(self.terms)))
+        for rank, term_id in enumerate(sorted(range(len(self.terms)), key=self.terms.__getitem__)):
+            term_ranks[term_id] = rank
+        term_column = self.term_column
+        return sorted(range(len(term_column)), key=lambda position: term_ranks[term_column[position]])
+
+    def iter_sorted(self) -> Iterator[tuple[str, str, int]]:
+        """Get every posting sorted by word, the same order as sorting the posting dicts by 'word'.
+        Returns:
+            Iterator[tuple[str, str, int]]: (word, file, frec) of every posting.
+        """
+        terms, document_names = self.terms, self.document_names
+        for position in self.sorted_positions():
+            yield terms[self.term_column[position]], document_names[self.document_column[position]], self.frec_column[position]
+
+    def write_index(self, output_path: str):
+        """Write the word;file;frec index of evidencia_1_times.index.
+        Args:
+            output_path (str): path of the index file.
+        """
+        with open(output_path, 'w', encoding='utf-8', errors='replace') as file:
+            for word, file_name, frec in self.iter_sorted():
+                file.write(f"{word};{file_name};{frec}\n")
+
+    def write_dictionary_posting(self, dictionary_path: str, posting_path: str):
+        """Write the word;#doc;posting dictionary and the file;frec posting of actividad_7.
+        Args:
+            dictionary_path (str): path of the dictionary file.
+            posting_path (str): path of the posting file.
+        """
+        write_dictionary_posting(self.iter_sorted(), dictionary_path, posting_path)
+
+def write_dictionary_posting(sorted_postings: Iterable[tuple[str, str, int]], dictionary_path: str, posting_path: str):
+    """Write the word;#doc;posting dictionary and the file;frec posting of actividad_7.
+    Args:
+        sorted_postings (Iterable[tuple[str, str, int]]): (word, file, frec) of every posting sorted by word, from
+            PostingStore.iter_sorted or ExternalIndexBuilder.iter_sorted.
+        dictionary_path (str): path of the dictionary file.
+        posting_path (str): path of the posting file.
+    """
+    with open(dictionary_path, 'w', encoding='utf-8', errors='replace') as dictionary_file, open(posting_path, 'w', encoding='utf-8', errors='replace') as posting_file:
+        last_word = None
+        document_count = 0
+        posting_start = 0
+        for posting_num, (word, file_name, frec) in enumerate(sorted_postings):
+            if word != last_word:
+                if last_word != None:
+                    dictionary_file.write(f"{last_word};{document_count};{posting_start}\n")
+                last_word = word
+                document_count = 0
+                posting_start = posting_num
+            document_count += 1
+            posting_file.write(f"{file_name};{frec}\n")
+        if last_word != None:
+            dictionary_file.write(f"{last_word};{document_count};{posting_start}\n")
@@ -0,0 +1,162 @@
+import os
+from array import array
+from collections import OrderedDict
+from typing import Callable
+from query_engine import QueryEngine
+
+GENERATION_SUFFIX = '.generation'
+
+def get_generation_path(dict_path: str) -> str:
+    return f"{dict_path}{GENERATION_SUFFIX}"
+
+def read_generation(generation_path: str) -> int:
+    """Get the index generation written by actividad_13.prepare_index_files, 0 if there is no marker."""
+    if not os.path.exists(generation_path):
+        return 0
+    with open(generation_path, 'r', encoding='utf-8') as file:
+        content = file.read().strip()
+    return int(content) if content.isdigit() else 0
+
+def get_generation_stamp(generation_path: str) -> tuple[int, int]:
+    """Get the mtime and size of the generation marker, one stat instead of reading the file on every query."""
+    try:
+        marker_stat = os.stat(generation_path)
+    except FileNotFoundError:
+        return None
+    return marker_stat.st_mtime_ns, marker_stat.st_size
+
+def write_generation(generation_path: str) -> int:
+    """Increase the index generation, the caches of the old generation stop being used.
+    Returns:
+        int: the new generation.
+    """
+    generation = read_generation(generation_path) + 1
+    with open(f"{generation_path}.tmp", 'w', encoding='utf-8') as file:
+        file.write(f"{generation}\n")
+    os.replace(f"{generation_path}.tmp", generation_path)
+    return generation
+
+class LRUCache:
+    """Cache that drops the least recently used entries when the sum of the entry sizes is over max_size."""
+    entries: OrderedDict
+    max_size: int
+    size: int
+    hits: int
+    misses: int
+
+    def __init__(self, max_size: int) -> None:
+        self.entries = OrderedDict()
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: any) -> any:
+        """Get the value of a key and mark it as used, None if it is not in the cache."""
+        entry = self.entries.get(key)
+        if entry == None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: any, value: any, size: int = 1):
+        if size > self.max_size:
+            return # It would drop every other entry
+        old_entry = self.entries.pop(key, None)
+        if old_entry != None:
+            self.size -= old_entry[1]
+        self.entries[key] = (value, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, old_size) = self.entries.popitem(last=False)
+            self.size -= old_size
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict[str, int]:
+        return { 'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries), 'size': self.size, 'max_size': self.max_size }
+
+class CachedQueryEngine(QueryEngine):
+    """QueryEngine with a cache of results by normalized query and a cache of postings by term under it.
+    Both caches are cleared, and the index files opened again, when prepare_index_files writes a new generation
+    after the binary files of the new index replaced the old ones.
+    """
+    dict_path: str
+    post_path: str
+    weights_path: str
+    generation_path: str
+    generation: int
+    generation_stamp: tuple[int, int]
+    result_cache: LRUCache # Entries are counted
+    posting_cache: LRUCache # Size is the number of postings
+    invalidations: int
+
+    def __init__(self, dict_path: str, post_path: str, generation_path: str, result_cache_size: int = 1024, posting_cache_size: int = 1 << 20, weights_path: str = None) -> None:
+        super().__init__(dict_path, post_path, weights_path=weights_path)
+        self.dict_path = dict_path
+        self.post_path = post_path
+        self.weights_path = weights_path
+        self.generation_path = generation_path
+        self.generation_stamp = get_generation_stamp(generation_path)
+        self.generation = read_generation(generation_path)
+        self.result_cache = LRUCache(result_cache_size)
+        self.posting_cache = LRUCache(posting_cache_size)
+        self.invalidations = 0
+
+    def check_generation(self):
+        """Clear the caches and open the index again if there is a new index generation."""
+        generation_stamp = get_generation_stamp(self.generation_path)
+        if generation_stamp == self.generation_stamp:
+            return
+        self.generation_stamp = generation_stamp
+        generation = read_generation(self.generation_path)
+        if generation == self.generation:
+            return
+        self.result_cache.clear()
+        self.posting_cache.clear()
+        self.close()
+        QueryEngine.__init__(self, self.dict_path, self.post_path, weights_path=self.weights_path)
+        self.generation = generation
+        self.invalidations += 1
+
+    def postings(self, term: str) -> tuple[array, array]:
+        # search_boolean and filter_documents don't go through cached_search
+        self.check_generation()
+        term_postings = self.posting_cache.get(term)
+        if term_postings == None:
+            term_postings = super().postings(term)
+            self.posting_cache.put(term, term_postings, max(len(term_postings[0]), 1))
+        return term_postings
+
+    def filter_documents(self, term: str, doc_ids: list[int]) -> list[int]:
+        self.check_generation()
+        return super().filter_documents(term, doc_ids)
+
+    def cached_search(self, key: tuple, search: Callable[..., list[tuple]], tokens: list[str], limit: int, **kwargs) -> list[tuple]:
+        self.check_generation()
+        results = self.result_cache.get(key)
+        if results == None:
+            generation = self.generation
+            results = search(tokens, limit=limit, **kwargs)
+            if generation == self.generation: # Results that mix two generations are not kept
+                self.result_cache.put(key, results)
+        return list(results)
+
+    def search(self, tokens: list[str], limit: int = 10) -> list[tuple[str, int, int]]:
+        # Ties keep the order of the first appearance of the tokens, so only the repeated tokens are removed
+        return self.cached_search(('search', tuple(dict.fromkeys(tokens)), limit), super().search, tokens, limit)
+
+    def search_daat(self, tokens: list[str], limit: int = 10) -> list[tuple[str, int, int]]:
+        # Ties are ordered by doc id, the order of the tokens doesn't change the result
+        return self.cached_search(('daat', tuple(sorted(set(tokens))), limit), super().search_daat, tokens, limit)
+
+    def search_scored(self, tokens: list[str], limit: int = 10, scheme: str = 'bm25') -> list[tuple[str, float]]:
+        return self.cached_search((scheme, tuple(dict.fromkeys(tokens)), limit), super().search_scored, tokens, limit, scheme=scheme)
+
+    def cache_stats(self) -> dict[str, any]:
+        """Hits, misses and size of each cache, to choose their sizes."""
+        return { 'generation': self.generation, 'invalidations': self.invalidations, 'results': self.result_cache.stats(), 'postings': self.posting_cache.stats() }
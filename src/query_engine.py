@@ -0,0 +1,278 @@
+import heapq
+import mmap
+import sys
+from array import array
+from bisect import bisect_left
+from typing import Iterator
+from binary_index import WEIGHTS_HEADER, WEIGHTS_MAGIC, WEIGHTS_VERSION, BinaryIndex, decode_block, get_skip_table, read_postings
+
+def gallop(doc_ids: array, doc_id: int, low: int) -> int:
+    """Find the position of the first doc id >= doc_id from low, doubling the step before the binary search.
+    Args:
+        doc_ids (array): sorted doc ids.
+        doc_id (int): doc id to find.
+        low (int): first position to check.
+    Returns:
+        int: the position, len(doc_ids) if every doc id is smaller.
+    """
+    step = 1
+    high = low
+    while high < len(doc_ids) and doc_ids[high] < doc_id:
+        low = high + 1
+        high += step
+        step *= 2
+    return bisect_left(doc_ids, doc_id, low, min(high + 1, len(doc_ids)))
+
+def intersect(doc_ids: list[int], other_doc_ids: array) -> list[int]:
+    """Intersect two sorted lists of doc ids, galloping over the second one (the largest)."""
+    result: list[int] = []
+    position = 0
+    for doc_id in doc_ids:
+        position = gallop(other_doc_ids, doc_id, position)
+        if position == len(other_doc_ids):
+            break
+        if other_doc_ids[position] == doc_id:
+            result.append(doc_id)
+    return result
+
+class QueryEngine(BinaryIndex):
+    """Search engine over the binary index. The files are opened once with mmap (BinaryIndex) and every query only
+    reads the directory entries and postings of its tokens, without parsing any file.
+    """
+    term_cache: dict[str, tuple[int, int, int, int]] # Small directory of the last terms found
+    term_cache_size: int
+    weights_map: mmap.mmap # None when there is no weights file
+    weights_offsets: dict[str, int] # Offset of the weights of each scoring scheme
+
+    def __init__(self, dict_path: str, post_path: str, term_cache_size: int = 4096, weights_path: str = None) -> None:
+        super().__init__(dict_path, post_path)
+        self.term_cache = {}
+        self.term_cache_size = term_cache_size
+        self.weights_map = None
+        self.weights_offsets = {}
+        if weights_path != None:
+            with open(weights_path, 'rb') as weights_file:
+                self.weights_map = mmap.mmap(weights_file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, build_tag, weights_doc_count, posting_count, _, _, _ = WEIGHTS_HEADER.unpack_from(self.weights_map, 0)
+            if magic != WEIGHTS_MAGIC or version != WEIGHTS_VERSION or build_tag != self.build_tag or weights_doc_count != len(self.document_names):
+                raise Exception(f'{weights_path} is not a weights file of this index')
+            self.weights_offsets['tfidf'] = WEIGHTS_HEADER.size + 4 * weights_doc_count
+            self.weights_offsets['bm25'] = self.weights_offsets['tfidf'] + 4 * posting_count
+
+    def find_term(self, term: str) -> tuple[int, int, int, int]:
+        if term in self.term_cache:
+            return self.term_cache[term]
+        term_data = super().find_term(term)
+        if len(self.term_cache) >= self.term_cache_size:
+            self.term_cache.pop(next(iter(self.term_cache)))
+        self.term_cache[term] = term_data
+        return term_data
+
+    def filter_documents(self, term: str, doc_ids: list[int]) -> list[int]:
+        """Keep the documents that have a term. With compressed postings only the blocks that can have one of the
+        documents are decoded (skip table), otherwise the postings are intersected galloping.
+        Args:
+            term (str): the term.
+            doc_ids (list[int]): sorted doc ids.
+        Returns:
+            list[int]: the doc ids that have the term.
+        """
+        term_data = self.find_term(term)
+        if term_data == None or not doc_ids:
+            return []
+        posting_offset, posting_count, _, byte_offset = term_data
+        if self.version == 1:
+            return intersect(doc_ids, self.postings(term)[0])
+        result: list[int] = []
+        position = 0
+        previous_doc_id = 0
+        for last_doc_id, block_position, count in get_skip_table(self.post_map, byte_offset, posting_count):
+            if position == len(doc_ids):
+                break
+            if last_doc_id == None or doc_ids[position] <= last_doc_id:
+                block_doc_ids = array('I', decode_block(self.post_map, block_position, count, previous_doc_id)[0])
+                end = bisect_left(doc_ids, block_doc_ids[-1] + 1, position)
+                result.extend(intersect(doc_ids[position:end], block_doc_ids))
+                position = end
+            previous_doc_id = last_doc_id
+        return result
+
+    def terms(self) -> Iterator[str]:
+        """Get every term of the index in directory order, without reading the postings."""
+        for slot in range(self.table_size if self.term_count > 0 else 0):
+            entry = self.directory_entry.unpack_from(self.dict_map, self.directory_offset + slot * self.directory_entry.size)
+            if entry[4] == 0:
+                continue
+            string_start = self.strings_offset + entry[1]
+            yield self.dict_map[string_start:string_start + entry[2]].decode('utf-8')
+
+    def iter_terms(self) -> Iterator[tuple[str, array, array]]:
+        """Get every term of the index with its postings, in directory order.
+        Returns:
+            Iterator[tuple[str, array, array]]: term, doc ids and frecs.
+        """
+        for slot in range(self.table_size if self.term_count > 0 else 0):
+            entry = self.directory_entry.unpack_from(self.dict_map, self.directory_offset + slot * self.directory_entry.size)
+            _, string_offset, string_length, posting_offset, posting_count, _ = entry[:6]
+            if posting_count == 0:
+                continue
+            string_start = self.strings_offset + string_offset
+            term = self.dict_map[string_start:string_start + string_length].decode('utf-8')
+            yield (term, *read_postings(self.post_map, self.version, posting_offset, posting_count, entry[6] if self.version != 1 else 0))
+
+    def search(self, tokens: list[str], limit: int = 10) -> list[tuple[str, int, int]]:
+        """Rank the files by the number of different tokens they have and then by the number of times they appear.
+        Args:
+            tokens (list[str]): query tokens, repeated tokens are counted once.
+            limit (int): max number of results.
+        Returns:
+            list[tuple[str, int, int]]: file name, word diversity and word quantity of the best files.
+        """
+        file_data: dict[int, list[int]] = {}
+        for token in dict.fromkeys(tokens):
+            doc_ids, frecs = self.postings(token)
+            for doc_id, frec in zip(doc_ids, frecs):
+                data = file_data.get(doc_id)
+                if data == None:
+                    file_data[doc_id] = [1, frec]
+                else:
+                    data[0] += 1
+                    data[1] += frec
+        # nlargest keeps the order of sorted(reverse=True), so ties keep the order of the old full sort.
+        # The heap only pays off when the top is small compared with the candidates
+        if limit * 8 < len(file_data):
+            files_top = heapq.nlargest(limit, file_data.keys(), key=lambda x: (file_data[x][0], file_data[x][1]))
+        else:
+            files_top = sorted(file_data.keys(), key=lambda x: (file_data[x][0], file_data[x][1]), reverse=True)[:limit]
+        return [(self.document_names[doc_id], file_data[doc_id][0], file_data[doc_id][1]) for doc_id in files_top]
+
+    def search_daat(self, tokens: list[str], limit: int = 10) -> list[tuple[str, int, int]]:
+        """Same ranking as search, merging the postings document at a time and skipping the documents that can't
+        reach the top (MaxScore). Once the top has documents with every token, only the rarest posting list is
+        read and the other ones are probed with binary search. Ties are ordered by doc id.
+        Args:
+            tokens (list[str]): query tokens, repeated tokens are counted once.
+            limit (int): max number of results.
+        Returns:
+            list[tuple[str, int, int]]: file name, word diversity and word quantity of the best files.
+        """
+        if limit <= 0:
+            return []
+        term_lists: list[tuple[array, array, int]] = [] # doc ids, frecs and max frec of each term
+        for token in dict.fromkeys(tokens):
+            term_data = self.find_term(token)
+            if term_data != None:
+                doc_ids, frecs = self.postings(token)
+                term_lists.append((doc_ids, frecs, term_data[2]))
+        # The most common terms are the first ones to become non essential
+        term_lists.sort(key=lambda x: len(x[0]), reverse=True)
+        term_quantity = len(term_lists)
+        # Upper bound (diversity, quantity) of a document that is only in the first i lists
+        prefix_bounds = [(0, 0)]
+        for _, _, max_frec in term_lists:
+            prefix_bounds.append((prefix_bounds[-1][0] + 1, prefix_bounds[-1][1] + max_frec))
+        doc_lists = [doc_ids for doc_ids, _, _ in term_lists]
+        frec_lists = [frecs for _, frecs, _ in term_lists]
+        lengths = [len(doc_ids) for doc_ids in doc_lists]
+        positions = [0] * term_quantity
+        non_essential = 0 # Lists before this one are only probed
+        top: list[tuple[int, int, int]] = [] # Min heap of (diversity, quantity, -doc id)
+        threshold = None # (diversity, quantity) of the last document of a full top
+
+        while non_essential < term_quantity:
+            if non_essential == term_quantity - 1:
+                # Only one essential list, its documents are the candidates
+                term = non_essential
+                position = positions[term]
+                if position == lengths[term]:
+                    break
+                doc_id = doc_lists[term][position]
+                diversity, quantity = 1, frec_lists[term][position]
+                positions[term] = position + 1
+            else:
+                # Next document of the essential lists
+                doc_id = None
+                for term in range(non_essential, term_quantity):
+                    if positions[term] < lengths[term]:
+                        term_doc_id = doc_lists[term][positions[term]]
+                        if doc_id == None or term_doc_id < doc_id:
+                            doc_id = term_doc_id
+                if doc_id == None:
+                    break
+                diversity, quantity = 0, 0
+                for term in range(non_essential, term_quantity):
+                    position = positions[term]
+                    if position < lengths[term] and doc_lists[term][position] == doc_id:
+                        diversity += 1
+                        quantity += frec_lists[term][position]
+                        positions[term] = position + 1
+            # Probe the non essential lists while the document can still enter the top
+            for term in range(non_essential - 1, -1, -1):
+                if threshold != None:
+                    bound_diversity, bound_quantity = prefix_bounds[term + 1]
+                    if (diversity + bound_diversity, quantity + bound_quantity) < threshold:
+                        break
+                position = bisect_left(doc_lists[term], doc_id, positions[term])
+                positions[term] = position
+                if position < lengths[term] and doc_lists[term][position] == doc_id:
+                    diversity += 1
+                    quantity += frec_lists[term][position]
+            entry = (diversity, quantity, -doc_id)
+            if len(top) < limit:
+                heapq.heappush(top, entry)
+            elif entry > top[0]:
+                heapq.heapreplace(top, entry)
+            else:
+                continue
+            if len(top) == limit:
+                threshold = top[0][:2]
+                while non_essential < term_quantity and prefix_bounds[non_essential + 1] < threshold:
+                    non_essential += 1
+        top.sort(reverse=True)
+        return [(self.document_names[-negative_doc_id], diversity, quantity) for diversity, quantity, negative_doc_id in top]
+
+    def search_scored(self, tokens: list[str], limit: int = 10, scheme: str = 'bm25') -> list[tuple[str, float]]:
+        """Rank the files by the sum of the precomputed weights of the tokens, accumulated in an array by doc id.
+        Args:
+            tokens (list[str]): query tokens, repeated tokens are counted once.
+            limit (int): max number of results.
+            scheme (str): weights used (bm25|tfidf).
+        Returns:
+            list[tuple[str, float]]: file name and score of the best files.
+        """
+        if self.weights_map == None:
+            raise Exception('The engine was opened without a weights file')
+        if not scheme in self.weights_offsets:
+            raise Exception(f'Unknown scoring scheme {scheme}')
+        weights_offset = self.weights_offsets[scheme]
+        scores = array('d', bytes(8 * len(self.document_names)))
+        touched = bytearray(len(self.document_names))
+        candidates: list[int] = []
+        for token in dict.fromkeys(tokens):
+            term_data = self.find_term(token)
+            if term_data == None:
+                continue
+            posting_offset, posting_count, _, _ = term_data
+            doc_ids, _ = self.postings(token)
+            weights = array('f')
+            weights.frombytes(self.weights_map[weights_offset + 4 * posting_offset:weights_offset + 4 * (posting_offset + posting_count)])
+            if sys.byteorder == 'big':
+                weights.byteswap()
+            for doc_id, weight in zip(doc_ids, weights):
+                if not touched[doc_id]:
+                    touched[doc_id] = 1
+                    candidates.append(doc_id)
+                scores[doc_id] += weight
+        files_top = heapq.nlargest(limit, candidates, key=scores.__getitem__)
+        return [(self.document_names[doc_id], scores[doc_id]) for doc_id in files_top]
+
+    def close(self):
+        super().close()
+        if self.weights_map != None:
+            self.weights_map.close()
+
+    def __enter__(self) -> 'QueryEngine':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
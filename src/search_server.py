@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import json
+import os
+from actividad_13 import prepare_index_files
+from query_engine import QueryEngine
+from query_cache import CachedQueryEngine, get_generation_path
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Protocol: one JSON object per line
+# request:  {"tokens": ["word", ...], "limit": 10, "daat": false}
+# response: {"results": [{"name": "NNN.txt", "diversity": 2, "quantity": 31}, ...]} or {"error": "message"}
+# request:  {"stats": true}
+# response: {"stats": {"generation": 1, "invalidations": 0, "results": {"hits": 10, "misses": 2, ...}, "postings": {...}}}
+
+def handle_request(engine: QueryEngine, line: bytes) -> dict[str, any]:
+    """Answer one request of the protocol.
+    Args:
+        engine (QueryEngine): engine with the index loaded.
+        line (bytes): JSON request.
+    Returns:
+        dict[str, any]: the response.
+    """
+    try:
+        request = json.loads(line)
+        if request.get('stats', False):
+            if not isinstance(engine, CachedQueryEngine):
+                raise Exception('the engine has no cache')
+            return { "stats": engine.cache_stats() }
+        tokens = request['tokens']
+        limit = int(request.get('limit', 10))
+        daat = bool(request.get('daat', False))
+        if not isinstance(tokens, list) or not all(isinstance(token, str) for token in tokens):
+            raise Exception('tokens must be a list of strings')
+        if limit < 0:
+            raise Exception('limit must not be negative')
+    except Exception as error:
+        return { "error": f"Invalid request: {error}" }
+    try:
+        search = engine.search_daat if daat else engine.search
+        results = search(tokens, limit=limit)
+    except Exception as error:
+        return { "error": f"Search failed: {error}" } # The connection and the server keep working
+    return { "results": [{ "name": name, "diversity": diversity, "quantity": quantity } for name, diversity, quantity in results] }
+
+class SearchServer:
+    """Asyncio server that keeps the index open and answers the searches of many clients."""
+    engine: QueryEngine
+    query_count: int
+
+    def __init__(self, engine: QueryEngine) -> None:
+        self.engine = engine
+        self.query_count = 0
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                # Searches only take microseconds, they are answered in the event loop
+                response = handle_request(self.engine, line)
+                self.query_count += 1
+                writer.write(json.dumps(response).encode('utf-8') + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None):
+        """Serve until the task is cancelled.
+        Args:
+            host (str): TCP host, used when there is no socket_path.
+            port (int): TCP port.
+            socket_path (str): path of a Unix domain socket.
+        """
+        if socket_path != None:
+            if os.path.exists(socket_path):
+                os.remove(socket_path)
+            server = await asyncio.start_unix_server(self.handle_client, path=socket_path)
+        else:
+            server = await asyncio.start_server(self.handle_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+async def query_server(requests: list[dict[str, any]], host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, socket_path: str = None) -> list[dict[str, any]]:
+    """Send requests to a running server through one connection.
+    Args:
+        requests (list[dict[str, any]]): requests of the protocol.
+        host (str): TCP host, used when there is no socket_path.
+        port (int): TCP port.
+        socket_path (str): path of a Unix domain socket.
+    Returns:
+        list[dict[str, any]]: the response of each request.
+    """
+    if socket_path != None:
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    responses: list[dict[str, any]] = []
+    try:
+        for request in requests:
+            writer.write(json.dumps(request).encode('utf-8') + b'\n')
+            await writer.drain()
+            responses.append(json.loads(await reader.readline()))
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    return responses
+
+
+def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Search server that keeps the actividad_13 index loaded')
+    parser.add_argument('--host', type=str, default=DEFAULT_HOST, help='TCP host')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='TCP port')
+    parser.add_argument('--socket', type=str, default=None, help='Unix domain socket path, used instead of TCP')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    serve_parser = subparsers.add_parser('serve', help='Load the index and answer searches')
+    serve_parser.add_argument('--result-cache', type=int, default=1024, help='Results kept in the cache')
+    serve_parser.add_argument('--posting-cache', type=int, default=1 << 20, help='Postings kept in the cache')
+    query_parser = subparsers.add_parser('query', help='Send a search to a running server')
+    query_parser.add_argument('inputs', nargs='+', type=str, help='Input tokens separated by spaces')
+    query_parser.add_argument('--limit', type=int, default=10, help='Max number of files')
+    query_parser.add_argument('--daat', action='store_true', help='Merge the postings document at a time with early termination')
+    subparsers.add_parser('stats', help='Show the hits and misses of the caches of a running server')
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        binary_dict_path, binary_post_path, _ = prepare_index_files(os.getcwd())
+        generation_path = get_generation_path(os.path.join(os.getcwd(), 'src/results/data/token_dict.txt'))
+        with CachedQueryEngine(binary_dict_path, binary_post_path, generation_path, args.result_cache, args.posting_cache) as engine:
+            try:
+                asyncio.run(SearchServer(engine).serve(args.host, args.port, args.socket))
+            except KeyboardInterrupt:
+                pass
+    elif args.command == 'stats':
+        response = asyncio.run(query_server([{ "stats": True }], args.host, args.port, args.socket))[0]
+        if "error" in response:
+            raise Exception(response["error"])
+        print(json.dumps(response["stats"], indent=1))
+    else:
+        response = asyncio.run(query_server([{ "tokens": args.inputs, "limit": args.limit, "daat": args.daat }], args.host, args.port, args.socket))[0]
+        if "error" in response:
+            raise Exception(response["error"])
+        # Same output as actividad_13
+        for index, result in enumerate(response["results"]):
+            print(f"{index + 1}. {result['name']} - diversity: {result['diversity']}  quantity: {result['quantity']}")
+
+if __name__ == "__main__":
+    main()
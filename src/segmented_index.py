@@ -0,0 +1,322 @@
+import argparse
+import heapq
+import json
+import os
+import threading
+from typing import Iterable
+from binary_index import write_binary_index
+from evidencia_1_times import count_file_postings
+from query_engine import QueryEngine
+
+MERGE_FACTOR = 4 # Segments of the same level merged into one segment of the next level
+MANIFEST_NAME = 'manifest.json'
+
+class SegmentedIndex:
+    """Index stored as immutable binary segments listed in a manifest.
+    Each batch of documents is written as a new level 0 segment. When MERGE_FACTOR segments have the same level
+    they are merged into one segment of the next level in a background thread, so every posting is rewritten at
+    most once per level (log(documents) times). A document added again is marked as deleted in the older segments,
+    queries skip the deleted documents and merges drop them.
+    Queries only take the lock to get the list of live segments, the segment files are never modified. The engines
+    of a merged segment are closed when the last query that got them releases them (release_segments).
+    """
+    segments_path: str
+    manifest: dict[str, any] # next_id and the segments (name, level, documents, deleted), oldest first
+    lock: threading.Lock
+    merge_thread: threading.Thread
+    engines: dict[str, QueryEngine] # Open segments
+    engine_refs: dict[QueryEngine, int] # Queries that are using each engine
+    retired_engines: set[QueryEngine] # Engines of merged segments that are still used by a query
+    background_merge: bool
+
+    def __init__(self, segments_path: str, background_merge: bool = True) -> None:
+        self.segments_path = segments_path
+        os.makedirs(segments_path, exist_ok=True)
+        self.manifest = self.read_manifest()
+        self.lock = threading.Lock()
+        self.merge_thread = None
+        self.engines = {}
+        self.engine_refs = {}
+        self.retired_engines = set()
+        self.background_merge = background_merge
+
+    def get_segment_paths(self, name: str) -> tuple[str, str]:
+        return os.path.join(self.segments_path, f"{name}.dict"), os.path.join(self.segments_path, f"{name}.post")
+
+    def read_manifest(self) -> dict[str, any]:
+        manifest_path = os.path.join(self.segments_path, MANIFEST_NAME)
+        if not os.path.exists(manifest_path):
+            return { 'next_id': 0, 'segments': [] }
+        with open(manifest_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+
+    def write_manifest(self):
+        """Write the manifest atomically, the lock has to be taken."""
+        manifest_path = os.path.join(self.segments_path, MANIFEST_NAME)
+        with open(f"{manifest_path}.tmp", 'w', encoding='utf-8') as file:
+            json.dump(self.manifest, file, indent=1)
+        os.replace(f"{manifest_path}.tmp", manifest_path)
+
+    def new_segment_name(self) -> str:
+        """Get the name of a new segment, the lock has to be taken."""
+        name = f"seg_{self.manifest['next_id']:06d}"
+        self.manifest['next_id'] += 1
+        return name
+
+    def write_segment(self, name: str, documents: dict[str, Iterable[tuple[str, int]]]) -> list[str]:
+        """Write a segment with the (word, frec) postings of each document.
+        Returns:
+            list[str]: the document names of the segment, their position is the doc id.
+        """
+        document_names = sorted(documents.keys())
+        terms: dict[str, list[tuple[int, int]]] = {}
+        for doc_id, document_name in enumerate(document_names):
+            for word, frec in documents[document_name]:
+                terms.setdefault(word, []).append((doc_id, frec))
+        dict_path, post_path = self.get_segment_paths(name)
+        write_binary_index(terms.items(), document_names, dict_path, post_path)
+        return document_names
+
+    def add_documents(self, documents: dict[str, Iterable[tuple[str, int]]]):
+        """Add a batch of documents as a new segment.
+        Args:
+            documents (dict[str, Iterable[tuple[str, int]]]): (word, frec) postings of each document name.
+        """
+        if not documents:
+            return
+        with self.lock:
+            name = self.new_segment_name()
+        document_names = self.write_segment(name, documents)
+        with self.lock:
+            for segment in self.manifest['segments']:
+                old_documents = set(segment['documents']) - set(segment['deleted'])
+                segment['deleted'].extend(document_name for document_name in document_names if document_name in old_documents)
+            self.manifest['segments'].append({ 'name': name, 'level': 0, 'documents': document_names, 'deleted': [] })
+            self.write_manifest()
+        self.schedule_merge()
+
+    def add_files(self, file_paths: list[str]):
+        """Add a batch of files (one word per line, like the alphabetically folder) as a new segment."""
+        self.add_documents({ file_path.split('/')[-1]: count_file_postings(file_path) for file_path in file_paths })
+
+    def remove_documents(self, document_names: list[str]):
+        with self.lock:
+            for segment in self.manifest['segments']:
+                old_documents = set(segment['documents']) - set(segment['deleted'])
+                segment['deleted'].extend(document_name for document_name in document_names if document_name in old_documents)
+            self.write_manifest()
+
+    def get_merge_candidates(self) -> list[dict[str, any]]:
+        """Get the oldest MERGE_FACTOR segments of the lowest level that has enough segments, the lock has to be taken."""
+        levels: dict[int, list[dict[str, any]]] = {}
+        for segment in self.manifest['segments']:
+            levels.setdefault(segment['level'], []).append(segment)
+        for level in sorted(levels.keys()):
+            if len(levels[level]) >= MERGE_FACTOR:
+                return levels[level][:MERGE_FACTOR]
+        return []
+
+    def merge_segments(self, segments: list[dict[str, any]], level: int):
+        """Merge segments into a new one without their deleted documents."""
+        with self.lock:
+            name = self.new_segment_name()
+            deleted_before = { segment['name']: set(segment['deleted']) for segment in segments }
+        documents: dict[str, list[tuple[str, int]]] = {}
+        for segment in segments:
+            deleted = deleted_before[segment['name']]
+            with QueryEngine(*self.get_segment_paths(segment['name'])) as engine:
+                for document_name in engine.document_names:
+                    if not document_name in deleted:
+                        documents[document_name] = []
+                for term, doc_ids, frecs in engine.iter_terms():
+                    for doc_id, frec in zip(doc_ids, frecs):
+                        document_name = engine.document_names[doc_id]
+                        if not document_name in deleted:
+                            documents[document_name].append((term, frec))
+        document_names = self.write_segment(name, documents) if documents else []
+        with self.lock:
+            # Documents deleted while the merge was running stay deleted
+            deleted_after = [document_name for segment in segments for document_name in segment['deleted'] if not document_name in deleted_before[segment['name']]]
+            merged_names = set(segment['name'] for segment in segments)
+            position = max(index for index, segment in enumerate(self.manifest['segments']) if segment['name'] in merged_names)
+            new_segments = [segment for segment in self.manifest['segments'][:position + 1] if not segment['name'] in merged_names]
+            if document_names:
+                new_segments.append({ 'name': name, 'level': level, 'documents': document_names, 'deleted': [document_name for document_name in deleted_after if document_name in set(document_names)] })
+            new_segments.extend(self.manifest['segments'][position + 1:])
+            self.manifest['segments'] = new_segments
+            self.write_manifest()
+        for segment in segments:
+            for path in self.get_segment_paths(segment['name']):
+                os.remove(path) # Open readers keep their mmap until they refresh
+
+    def run_merges(self):
+        while True:
+            with self.lock:
+                segments = self.get_merge_candidates()
+            if not segments:
+                return
+            self.merge_segments(segments, segments[0]['level'] + 1)
+
+    def schedule_merge(self):
+        if not self.background_merge:
+            self.run_merges()
+            return
+        with self.lock:
+            if self.merge_thread != None and self.merge_thread.is_alive():
+                return # The running thread checks the candidates again when it ends a merge
+            self.merge_thread = threading.Thread(target=self.run_merges, daemon=True)
+            self.merge_thread.start()
+
+    def wait_merges(self):
+        while self.merge_thread != None and self.merge_thread.is_alive():
+            self.merge_thread.join()
+            with self.lock:
+                pending = bool(self.get_merge_candidates())
+            if pending:
+                self.schedule_merge()
+
+    def force_merge(self):
+        """Merge every segment into one."""
+        self.wait_merges()
+        with self.lock:
+            segments = list(self.manifest['segments'])
+        if len(segments) > 1:
+            self.merge_segments(segments, max(segment['level'] for segment in segments) + 1)
+
+    def get_live_segments(self) -> list[tuple[QueryEngine, set[str]]]:
+        """Get the engine and the deleted documents of each live segment. The engines stay open until they are
+        given back with release_segments, even if their segments are merged meanwhile.
+        The engines are opened with the lock taken, so a merge can't remove their files before they are mapped.
+        If a segment was removed by another process, the manifest is read again from the disk.
+        """
+        with self.lock:
+            while True:
+                try:
+                    live_segments = self.open_live_segments()
+                    break
+                except FileNotFoundError:
+                    manifest = self.read_manifest()
+                    if manifest == self.manifest:
+                        raise
+                    self.manifest = manifest
+            for engine, _ in live_segments:
+                self.engine_refs[engine] = self.engine_refs.get(engine, 0) + 1
+            return live_segments
+
+    def release_segments(self, live_segments: list[tuple[QueryEngine, set[str]]]):
+        """Give back the engines of get_live_segments, the ones of merged segments are closed by the last query."""
+        with self.lock:
+            for engine, _ in live_segments:
+                self.engine_refs[engine] -= 1
+                if self.engine_refs[engine] == 0:
+                    del self.engine_refs[engine]
+                    if engine in self.retired_engines:
+                        self.retired_engines.remove(engine)
+                        engine.close()
+
+    def open_live_segments(self) -> list[tuple[QueryEngine, set[str]]]:
+        """Open the engines of the segments of the manifest and retire the ones of merged segments, the lock has to be taken."""
+        live_names = set(segment['name'] for segment in self.manifest['segments'])
+        for name in list(self.engines.keys()):
+            if not name in live_names:
+                engine = self.engines.pop(name)
+                if engine in self.engine_refs:
+                    self.retired_engines.add(engine) # A query is still reading it
+                else:
+                    engine.close()
+        live_segments: list[tuple[QueryEngine, set[str]]] = []
+        for segment in self.manifest['segments']:
+            if not segment['name'] in self.engines:
+                self.engines[segment['name']] = QueryEngine(*self.get_segment_paths(segment['name']))
+            live_segments.append((self.engines[segment['name']], set(segment['deleted'])))
+        return live_segments
+
+    def lookup_segments(self, live_segments: list[tuple[QueryEngine, set[str]]], term: str) -> list[dict[str, any]]:
+        segment_postings = []
+        for engine, deleted in live_segments:
+            doc_ids, frecs = engine.postings(term)
+            segment_postings.append([(engine.document_names[doc_id], frec) for doc_id, frec in zip(doc_ids, frecs) if not engine.document_names[doc_id] in deleted])
+        # Each segment is sorted by name, a document is only live in one segment
+        return [{ "name": name, "quant": frec } for name, frec in heapq.merge(*segment_postings)]
+
+    def lookup(self, term: str) -> list[dict[str, any]]:
+        """Get the files of a term in every live segment, with the same format and order as actividad_13.get_dict_data.
+        Args:
+            term (str): the term to find.
+        Returns:
+            list[dict[str, any]]: name and quant of each file of the term.
+        """
+        live_segments = self.get_live_segments()
+        try:
+            return self.lookup_segments(live_segments, term)
+        finally:
+            self.release_segments(live_segments)
+
+    def search(self, tokens: list[str], limit: int = 10) -> list[tuple[str, int, int]]:
+        """Same ranking as QueryEngine.search across the live segments."""
+        file_data: dict[str, list[int]] = {}
+        live_segments = self.get_live_segments() # Every token is read from the same segments
+        try:
+            token_files = [self.lookup_segments(live_segments, token) for token in dict.fromkeys(tokens)]
+        finally:
+            self.release_segments(live_segments)
+        for files in token_files:
+            for file in files:
+                data = file_data.get(file["name"])
+                if data == None:
+                    file_data[file["name"]] = [1, file["quant"]]
+                else:
+                    data[0] += 1
+                    data[1] += file["quant"]
+        files_top = heapq.nlargest(limit, file_data.keys(), key=lambda x: (file_data[x][0], file_data[x][1]))
+        return [(name, file_data[name][0], file_data[name][1]) for name in files_top]
+
+    def close(self):
+        self.wait_merges()
+        with self.lock:
+            for engine in list(self.engines.values()) + list(self.retired_engines):
+                engine.close()
+            self.engines = {}
+            self.engine_refs = {}
+            self.retired_engines = set()
+
+    def __enter__(self) -> 'SegmentedIndex':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Index stored as immutable segments merged in the background')
+    parser.add_argument('action', type=str, choices=['add', 'remove', 'merge', 'search', 'status'], help='Action')
+    parser.add_argument('inputs', nargs='*', type=str, help='add: files or folders, remove: document names, search: tokens')
+    parser.add_argument('--segments', type=str, default=os.path.join(os.getcwd(), 'src/results/data/segments'), help='Folder of the segments')
+    parser.add_argument('--batch-size', type=int, default=50, help='add: documents per segment')
+    args = parser.parse_args()
+
+    with SegmentedIndex(args.segments) as segmented_index:
+        if args.action == 'add':
+            file_paths: list[str] = []
+            for input_path in args.inputs:
+                if os.path.isdir(input_path):
+                    file_paths.extend(os.path.join(input_path, file) for file in sorted(os.listdir(input_path)))
+                else:
+                    file_paths.append(input_path)
+            for start in range(0, len(file_paths), args.batch_size):
+                segmented_index.add_files(file_paths[start:start + args.batch_size])
+        elif args.action == 'remove':
+            segmented_index.remove_documents(args.inputs)
+        elif args.action == 'merge':
+            segmented_index.force_merge()
+        elif args.action == 'search':
+            for index, (file_name, word_diversity, word_quantity) in enumerate(segmented_index.search(args.inputs)):
+                print(f"{index + 1}. {file_name} - diversity: {word_diversity}  quantity: {word_quantity}")
+        segmented_index.wait_merges()
+        if args.action != 'search':
+            for segment in segmented_index.manifest['segments']:
+                print(f"{segment['name']}\tNivel: {segment['level']}\tDocs: {len(segment['documents'])}\tEliminados: {len(segment['deleted'])}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import argparse
+import bisect
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Iterable
+from binary_index import encode_varints, decode_varints
+from query_engine import QueryEngine
+
+TERMS_MAGIC = b'ATRM'
+TERMS_VERSION = 1
+TERMS_HEADER = struct.Struct('<4sHHIIII') # magic, version, flags, term count, bucket size, suffix count, strings size
+BUCKET_SIZE = 16 # Terms of each front coded bucket
+MAX_SUFFIX_POSITION = 65535 # Suffix positions are stored in 2 bytes
+# Terms file: header, byte offset of each bucket, term id and position of each suffix (sorted by suffix) and the
+# buckets. The first term of a bucket is stored whole (length and bytes), the next ones as the bytes shared with the
+# previous term, the length of the rest and the rest.
+
+def write_term_dictionary(terms: Iterable[str], terms_path: str, bucket_size: int = BUCKET_SIZE):
+    """Write the sorted, front coded term dictionary and the suffix array of its terms.
+    Args:
+        terms (Iterable[str]): the terms, the term id of each one is its position in sorted order.
+        terms_path (str): path of the terms file.
+        bucket_size (int): terms of each front coded bucket.
+    """
+    sorted_terms = sorted(set(terms))
+    bucket_offsets = array('I')
+    strings = bytearray()
+    previous = b''
+    for term_id, term in enumerate(sorted_terms):
+        term_bytes = term.encode('utf-8')
+        if term_id % bucket_size == 0:
+            bucket_offsets.append(len(strings))
+            strings += encode_varints([len(term_bytes)]) + term_bytes
+        else:
+            shared = 0
+            while shared < min(len(previous), len(term_bytes)) and previous[shared] == term_bytes[shared]:
+                shared += 1
+            strings += encode_varints([shared, len(term_bytes) - shared]) + term_bytes[shared:]
+        previous = term_bytes
+
+    # Every suffix of every term, for the *infix* queries
+    suffixes = sorted((term[position:], term_id, position) for term_id, term in enumerate(sorted_terms) for position in range(min(len(term), MAX_SUFFIX_POSITION + 1)))
+    suffix_term_ids = array('I', (term_id for _, term_id, _ in suffixes))
+    suffix_positions = array('H', (position for _, _, position in suffixes))
+    if sys.byteorder == 'big':
+        for column in (bucket_offsets, suffix_term_ids, suffix_positions):
+            column.byteswap()
+    with open(terms_path, 'wb') as file:
+        file.write(TERMS_HEADER.pack(TERMS_MAGIC, TERMS_VERSION, 0, len(sorted_terms), bucket_size, len(suffixes), len(strings)))
+        file.write(bucket_offsets.tobytes())
+        file.write(suffix_term_ids.tobytes())
+        file.write(suffix_positions.tobytes())
+        file.write(strings)
+
+class SuffixView:
+    """Sorted suffixes of the term dictionary as a sequence, so bisect can search them."""
+    term_dictionary: 'TermDictionary'
+
+    def __init__(self, term_dictionary: 'TermDictionary') -> None:
+        self.term_dictionary = term_dictionary
+
+    def __len__(self) -> int:
+        return len(self.term_dictionary.suffix_term_ids)
+
+    def __getitem__(self, index: int) -> str:
+        return self.term_dictionary.get_term(self.term_dictionary.suffix_term_ids[index])[self.term_dictionary.suffix_positions[index]:]
+
+class BucketView:
+    """First term of each bucket as a sequence, so bisect can search them."""
+    term_dictionary: 'TermDictionary'
+
+    def __init__(self, term_dictionary: 'TermDictionary') -> None:
+        self.term_dictionary = term_dictionary
+
+    def __len__(self) -> int:
+        return len(self.term_dictionary.bucket_offsets)
+
+    def __getitem__(self, index: int) -> str:
+        return self.term_dictionary.get_bucket(index)[0]
+
+class TermDictionary:
+    """Reader of the sorted term dictionary. Exact and prefix lookups are a binary search over the first term of
+    each bucket, *infix* lookups a binary search over the suffix array, then only the matching terms are read.
+    """
+    term_count: int
+    bucket_size: int
+    bucket_offsets: array
+    suffix_term_ids: array
+    suffix_positions: array
+    strings: bytes
+    bucket_cache: dict[int, list[str]] # Last buckets decoded
+    bucket_cache_size: int
+
+    def __init__(self, terms_path: str, bucket_cache_size: int = 1024) -> None:
+        with open(terms_path, 'rb') as file:
+            content = file.read()
+        magic, version, _, self.term_count, self.bucket_size, suffix_count, strings_size = TERMS_HEADER.unpack_from(content, 0)
+        if magic != TERMS_MAGIC or version != TERMS_VERSION:
+            raise Exception(f'{terms_path} is not a terms file')
+        position = TERMS_HEADER.size
+        columns: list[array] = []
+        for type_code, count in (('I', (self.term_count + self.bucket_size - 1) // self.bucket_size), ('I', suffix_count), ('H', suffix_count)):
+            column = array(type_code)
+            column.frombytes(content[position:position + count * column.itemsize])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns.append(column)
+            position += count * column.itemsize
+        self.bucket_offsets, self.suffix_term_ids, self.suffix_positions = columns
+        self.strings = content[position:position + strings_size]
+        self.bucket_cache = {}
+        self.bucket_cache_size = bucket_cache_size
+
+    def get_bucket(self, bucket: int) -> list[str]:
+        """Decode the terms of a bucket."""
+        if bucket in self.bucket_cache:
+            return self.bucket_cache[bucket]
+        terms: list[str] = []
+        position = self.bucket_offsets[bucket]
+        (length,), position = decode_varints(self.strings, position, 1, False)
+        previous = self.strings[position:position + length]
+        terms.append(previous.decode('utf-8'))
+        position += length
+        for _ in range(min(self.bucket_size, self.term_count - bucket * self.bucket_size) - 1):
+            (shared, length), position = decode_varints(self.strings, position, 2, False)
+            previous = previous[:shared] + self.strings[position:position + length]
+            terms.append(previous.decode('utf-8'))
+            position += length
+        if len(self.bucket_cache) >= self.bucket_cache_size:
+            self.bucket_cache.pop(next(iter(self.bucket_cache)))
+        self.bucket_cache[bucket] = terms
+        return terms
+
+    def get_term(self, term_id: int) -> str:
+        return self.get_bucket(term_id // self.bucket_size)[term_id % self.bucket_size]
+
+    def find(self, term: str) -> int:
+        """Get the term id of a term, None if it is not in the dictionary."""
+        term_id = self.lower_bound(term)
+        return term_id if term_id < self.term_count and self.get_term(term_id) == term else None
+
+    def lower_bound(self, term: str) -> int:
+        """Get the id of the first term >= term, term_count if every term is smaller."""
+        bucket = bisect.bisect_right(BucketView(self), term) - 1
+        if bucket < 0:
+            return 0
+        return bucket * self.bucket_size + bisect.bisect_left(self.get_bucket(bucket), term)
+
+    def prefix_ids(self, prefix: str) -> list[int]:
+        """Get the ids of the terms that start with prefix, sorted."""
+        term_ids: list[int] = []
+        term_id = self.lower_bound(prefix)
+        while term_id < self.term_count and self.get_term(term_id).startswith(prefix):
+            term_ids.append(term_id)
+            term_id += 1
+        return term_ids
+
+    def infix_ids(self, infix: str) -> list[int]:
+        """Get the ids of the terms that contain infix, sorted."""
+        suffixes = SuffixView(self)
+        term_ids: set[int] = set()
+        index = bisect.bisect_left(suffixes, infix)
+        while index < len(suffixes) and suffixes[index].startswith(infix):
+            term_ids.add(self.suffix_term_ids[index])
+            index += 1
+        return sorted(term_ids)
+
+    def expand(self, pattern: str) -> list[str]:
+        """Get the terms that match a pattern where * is any sequence of characters (prefix*, *infix*, *suffix, a*b).
+        The candidates come from the prefix before the first * or, if it is empty, from the longest piece between
+        the * as an infix, and then they are checked with the whole pattern.
+        Args:
+            pattern (str): the pattern.
+        Returns:
+            list[str]: the matching terms, sorted.
+        """
+        pieces = pattern.split('*')
+        if len(pieces) == 1:
+            return [pattern] if self.find(pattern) != None else []
+        if pieces[0]:
+            term_ids = self.prefix_ids(pieces[0])
+        elif max(pieces, key=len):
+            term_ids = self.infix_ids(max(pieces, key=len))
+        else:
+            term_ids = range(self.term_count)
+        if len(pieces) == 2 and not pieces[1]:
+            return [self.get_term(term_id) for term_id in term_ids] # prefix*, every candidate matches
+        regex = re.compile('.*'.join(re.escape(piece) for piece in pieces), re.DOTALL)
+        terms = (self.get_term(term_id) for term_id in term_ids)
+        return [term for term in terms if regex.fullmatch(term)]
+
+
+def main():
+    # Declare input parser
+    parser = argparse.ArgumentParser(description='Build the sorted term dictionary of the binary index or expand wildcard patterns')
+    parser.add_argument('patterns', nargs='*', type=str, help='Patterns with *, for example: priv* *vac* *acy')
+    parser.add_argument('--dict', type=str, default=os.path.join(os.getcwd(), 'src/results/data/token_dict.bin'), help='Binary dictionary')
+    parser.add_argument('--post', type=str, default=os.path.join(os.getcwd(), 'src/results/data/token_post.bin'), help='Binary postings')
+    parser.add_argument('--terms', type=str, default=os.path.join(os.getcwd(), 'src/results/data/token_terms.bin'), help='Sorted term dictionary')
+    parser.add_argument('--build', action='store_true', help='Build the sorted term dictionary from the binary index first')
+    args = parser.parse_args()
+
+    if args.build:
+        with QueryEngine(args.dict, args.post) as engine:
+            write_term_dictionary(engine.terms(), args.terms)
+    term_dictionary = TermDictionary(args.terms)
+    for pattern in args.patterns:
+        terms = term_dictionary.expand(pattern)
+        print(f"{pattern}: {len(terms)} terminos")
+        for term in terms:
+            print(f"\t{term}")
+
+if __name__ == "__main__":
+    main()
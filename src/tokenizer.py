@@ -0,0 +1,91 @@
+import re
+from typing import Iterator, NamedTuple
+
+CHUNK_SIZE = 65536 # Characters read from the file each time
+
+class TokenProfile(NamedTuple):
+    pattern: re.Pattern # Compiled once per process
+    mode: str # 'split' keeps the alphanumeric pieces between matches, 'findall' keeps the matches, 'whitespace' uses str.split
+    lowercase: bool # Lowercase the text before getting the tokens
+    boundaries: str # Characters that can never be inside a token, the file is only cut after them
+
+# Profiles that reproduce the tokenization of each script
+PROFILES: dict[str, TokenProfile] = {
+    # One word per line, only alphanumeric lines (actividad_7)
+    'lines': TokenProfile(re.compile('\n'), 'split', False, '\n'),
+    # Same as lines but lowercase (evidencia_1_times.get_unique_words)
+    'lines_lower': TokenProfile(re.compile('\n'), 'split', True, '\n'),
+    # Split by punctuation and spaces, only alphanumeric pieces (actividad_8, actividad_10, actividad_11, actividad_12)
+    'separators': TokenProfile(re.compile('[\n|,| |.|:|;|(|)]'), 'split', False, ' \n'),
+    # Words without digits, joined by hyphens (actividad_9, evidencia_1_times.get_unique_words_hash_table)
+    'words': TokenProfile(re.compile(r'\b(?![a-zA-Z]*\d)\w+(?:-\w+)*\b'), 'findall', False, ' \n'),
+    # Every sequence of word characters, lowercase (actividad_11 and actividad_12 create_posting_file)
+    'word_chars': TokenProfile(re.compile(r'\w+'), 'findall', True, ' \n'),
+    # Lowercase words that are not only numbers (actividad_5, actividad_6)
+    'no_numbers': TokenProfile(re.compile(r'\b(?![0-9]+\b)\w+(?:-\w+)*\b'), 'findall', True, ' \n'),
+    # Split by any whitespace (actividad_3, actividad_4)
+    'whitespace': TokenProfile(re.compile(r'\s+'), 'whitespace', False, ' \n'),
+}
+
+def get_profile(profile: str) -> TokenProfile:
+    if not profile in PROFILES:
+        raise Exception(f'The profile has to be one of: {", ".join(PROFILES.keys())}')
+    return PROFILES[profile]
+
+def tokenize_text(text: str, profile: str = 'words') -> Iterator[str]:
+    """Get the tokens of a text.
+    Args:
+        text (str): the text to tokenize.
+        profile (str): name of the tokenization profile.
+    Returns:
+        Iterator[str]: the tokens in order.
+    """
+    token_profile = get_profile(profile)
+    if token_profile.lowercase:
+        text = text.lower()
+    if token_profile.mode == 'whitespace':
+        return iter(text.split())
+    if token_profile.mode == 'findall':
+        return (match.group() for match in token_profile.pattern.finditer(text))
+    return (word for word in token_profile.pattern.split(text) if word.isalnum())
+
+def tokenize_file(file_path: str, profile: str = 'words', chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Get the tokens of a file reading it by chunks, so the memory used does not depend on the file size.
+    Args:
+        file_path (str): path of the file.
+        profile (str): name of the tokenization profile.
+        chunk_size (int): characters read each time.
+    Returns:
+        Iterator[str]: the tokens in order, the same as tokenize_text with the whole file.
+    """
+    boundaries = get_profile(profile).boundaries
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+        rest = ''
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            text = rest + chunk
+            # Cut after the last boundary so no token is split between chunks
+            cut = max(text.rfind(boundary) for boundary in boundaries) + 1
+            if cut == 0:
+                rest = text
+                continue
+            yield from tokenize_text(text[:cut], profile)
+            rest = text[cut:]
+        if rest:
+            yield from tokenize_text(rest, profile)
+
+def count_lines(file_path: str, chunk_size: int = CHUNK_SIZE) -> int:
+    """Count the lines of a file as len(re.split('\\n', content)) does.
+    Args:
+        file_path (str): path of the file.
+        chunk_size (int): characters read each time.
+    Returns:
+        int: the number of lines.
+    """
+    line_count = 1
+    with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+        while chunk := file.read(chunk_size):
+            line_count += chunk.count('\n')
+    return line_count
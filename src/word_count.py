@@ -0,0 +1,40 @@
+from collections import Counter
+from typing import Iterable
+
+def count_words(words: Iterable[str]) -> Counter[str]:
+    """Count every word in one pass.
+    Args:
+        words (Iterable[str]): the words to count.
+    Returns:
+        Counter[str]: the count of each word, in order of first appearance.
+    """
+    return Counter(words)
+
+def add_word_counts(counts: dict[str, int], words: Iterable[str]) -> dict[str, int]:
+    """Add words to an existing count, modifying it.
+    Args:
+        counts (dict[str, int]): the count that will be modified.
+        words (Iterable[str]): the words that will be added to the count.
+    Returns:
+        dict[str, int]: the same count, to chain calls.
+    """
+    if isinstance(counts, Counter):
+        counts.update(words)
+        return counts
+    get_count = counts.get
+    for word in words:
+        counts[word] = get_count(word, 0) + 1
+    return counts
+
+def merge_document_frequencies(document_frequencies: dict[str, int], document_words: Iterable[str]) -> dict[str, int]:
+    """Add one document to the global document frequency table, modifying it.
+    Args:
+        document_frequencies (dict[str, int]): number of documents where each word appears.
+        document_words (Iterable[str]): the words of the document (or its word count), each one is counted once.
+    Returns:
+        dict[str, int]: the same table, to chain calls.
+    """
+    get_frequency = document_frequencies.get
+    for word in dict.fromkeys(document_words):
+        document_frequencies[word] = get_frequency(word, 0) + 1
+    return document_frequencies